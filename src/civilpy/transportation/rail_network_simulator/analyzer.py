@@ -26,15 +26,16 @@ https://github.com/toruseo/UXsim
 
 import numpy as np
 import matplotlib.pyplot as plt
-import random, glob, os, csv, time
+from matplotlib.collections import LineCollection
+import random, os, csv, time, itertools
 import pandas as pd
-from PIL import Image, ImageDraw, ImageFont
-from PIL.Image import Resampling
+from PIL import Image, ImageDraw, ImageFont, GifImagePlugin
 from tqdm.auto import tqdm
 from collections import defaultdict as ddict
 import io
 from scipy.sparse.csgraph import floyd_warshall
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 from .utils import *
 
@@ -49,6 +50,685 @@ def load_font_data():
     return font_data
 
 
+def edie_cell_sums(xss, tss, dx, dt, nx, nt):
+    """
+    Accumulate the time spent and the distance traveled by trajectories in each time-space cell of a link.
+
+    Parameters
+    ----------
+    xss : list of list of float
+        Positions of each trajectory on the link.
+    tss : list of list of float
+        Times of each trajectory on the link.
+    dx : float
+        Cell length.
+    dt : float
+        Cell duration.
+    nx : int
+        Number of cells in space.
+    nt : int
+        Number of cells in time.
+
+    Returns
+    -------
+    tn : numpy.ndarray
+        Total time spent in each cell, shape (nt, nx). Per vehicle, not multiplied by the platoon size.
+    dn : numpy.ndarray
+        Total distance traveled in each cell, shape (nt, nx). Per vehicle, not multiplied by the platoon size.
+
+    Notes
+    -----
+    A segment between two consecutive points is assigned to the time cell of its start. Its distance is split over the space cells it crosses, and the time over those cells in proportion to the distance.
+    """
+    if len(xss) == 0:
+        return np.zeros([nt, nx]), np.zeros([nt, nx])
+    x = np.concatenate([np.asarray(xs, dtype=float) for xs in xss])
+    t = np.concatenate([np.asarray(ts, dtype=float) for ts in tss])
+    offsets = np.concatenate([[0], np.cumsum([len(xs) for xs in xss])])
+    return edie_cell_sums_flat(x, t, offsets, dx, dt, nx, nt)
+
+
+def edie_cell_sums_flat(x, t, offsets, dx, dt, nx, nt):
+    """
+    `edie_cell_sums` for trajectories stored in flat arrays.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Positions of all the trajectories, concatenated.
+    t : numpy.ndarray
+        Times of all the trajectories, concatenated.
+    offsets : numpy.ndarray of int
+        Start index of each trajectory in `x` and `t`, followed by their length.
+    dx, dt, nx, nt
+        See `edie_cell_sums`.
+
+    Returns
+    -------
+    tn, dn : numpy.ndarray
+        See `edie_cell_sums`.
+    """
+    tn = np.zeros([nt, nx])
+    dn = np.zeros([nt, nx])
+    if len(offsets) < 2:
+        return tn, dn
+
+    # segments between consecutive points of the same trajectory
+    is_start = np.ones(len(x), dtype=bool)
+    is_start[np.asarray(offsets[1:]) - 1] = False
+    i = np.flatnonzero(is_start)
+    x0, x1, t0, t1 = x[i], x[i + 1], t[i], t[i + 1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v0 = np.where(t1 != t0, (x1 - x0) / (t1 - t0), 0)
+    tt = np.floor_divide(t0, dt).astype(int)
+    xx = np.floor_divide(x0, dx).astype(int)
+    xx1 = np.floor_divide(x1, dx).astype(int)
+    inside = (0 <= tt) & (tt < nt) & (xx < nx)
+    moving = v0 > 0
+
+    # stopped, or moving within a single cell
+    single = inside & (~moving | (xx == xx1))
+    np.add.at(tn, (tt[single], xx[single]), (t1 - t0)[single])
+    np.add.at(dn, (tt[single], xx[single]), np.where(moving, x1 - x0, 0)[single])
+
+    # moving across cells: one entry per crossed cell
+    cross = np.flatnonzero(inside & moving & (xx != xx1))
+    n_cells = xx1[cross] - xx[cross] + 1
+    seg = np.repeat(cross, n_cells)
+    j = np.arange(n_cells.sum()) - np.repeat(np.cumsum(n_cells) - n_cells, n_cells)
+    d = np.full(len(seg), float(dx))
+    first = j == 0
+    last = j == np.repeat(n_cells, n_cells) - 1
+    d[first] = (dx - x0 % dx)[seg[first]]
+    d[last] = (x1 % dx)[seg[last]]
+    keep = xx[seg] + j < nx
+    cell = (tt[seg][keep], (xx[seg] + j)[keep])
+    np.add.at(dn, cell, d[keep])
+    np.add.at(tn, cell, (d / v0[seg])[keep])
+
+    return tn, dn
+
+
+def edie_cell_sums_traj(traj, dx, dt, nx, nt):
+    """
+    `edie_cell_sums` for the trajectories of a `TrajectoryStore`, whose sample points are reconstructed here.
+    """
+    t, x, offsets = traj.samples()
+    # the reconstruction errors must not move a point on a time cell boundary to the previous cell
+    cell = np.round(t / dt)
+    t = np.where(np.abs(t / dt - cell) <= traj.TOLERANCE, cell * dt, t)
+    return edie_cell_sums_flat(x, t, offsets, dx, dt, nx, nt)
+
+
+def _ranges(starts, counts):
+    """Concatenated `range(start, start + count)` for each pair."""
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(
+        counts.sum()
+    )
+
+
+class TrajectoryStore:
+    """
+    Piecewise-linear vehicle trajectories on a link, built by `Analyzer.compute_accurate_traj` and stored as `Link.traj`.
+
+    Notes
+    -----
+    Only the breakpoints of each trajectory are kept: its first and last points and the points where the speed changes.
+    They are stored in flat arrays, with the trajectory `i` at `t[offsets[i]:offsets[i+1]]` and `x[offsets[i]:offsets[i+1]]`.
+    `steps` is the number of sample intervals from each breakpoint to the next one, from which `samples` reconstructs the original sample points.
+    Since the trajectories are linear between the breakpoints, they can be plotted from the breakpoints directly.
+    The reconstructed points differ from the original ones by at most `TOLERANCE` times the larger of the time and distance steps around them, which absorbs the rounding errors of the simulation.
+    """
+
+    # maximum error of the reconstructed samples, relative to the steps
+    TOLERANCE = 1e-9
+
+    def __init__(self, t, x, steps, offsets, vehicle, lane):
+        """
+        Create a trajectory store. Use `from_samples` to build it from sample points.
+
+        Parameters
+        ----------
+        t, x : numpy.ndarray
+            Times and positions of the breakpoints.
+        steps : numpy.ndarray of int
+            Number of sample intervals to the next breakpoint, 0 for the last breakpoint of each trajectory.
+        offsets : numpy.ndarray of int
+            Start index of each trajectory in `t` and `x`, followed by their length.
+        vehicle : numpy.ndarray of int
+            `Vehicle.id` of each trajectory.
+        lane : numpy.ndarray of int
+            Lane of each trajectory.
+        """
+        self.t = t
+        self.x = x
+        self.steps = steps
+        self.offsets = offsets
+        self.vehicle = vehicle
+        self.lane = lane
+
+    @classmethod
+    def from_samples(cls, t, x, offsets, vehicle, lane):
+        """
+        Build a trajectory store from sample points, dropping the points in the middle of the linear stretches.
+
+        Parameters
+        ----------
+        t, x : numpy.ndarray
+            Times and positions of the sample points of all the trajectories, concatenated.
+        offsets : numpy.ndarray of int
+            Start index of each trajectory, followed by the number of points. Each trajectory has at least one point.
+        vehicle, lane : numpy.ndarray of int
+            See `__init__`.
+
+        Returns
+        -------
+        TrajectoryStore
+        """
+        n = len(t)
+        ends = np.zeros(n, dtype=bool)
+        ends[offsets[:-1]] = True
+        ends[offsets[1:] - 1] = True
+
+        # a point is dropped if the steps before and after it are the same
+        keep = ends.copy()
+        dt = np.diff(t)
+        dx = np.diff(x)
+        tol_t = cls.tolerance(dt, n)
+        tol_x = cls.tolerance(dx, n)
+        keep[1:-1] |= (np.abs(dt[1:] - dt[:-1]) > tol_t[1:-1]) | (
+            np.abs(dx[1:] - dx[:-1]) > tol_x[1:-1]
+        )
+        while True:
+            store = cls._select(t, x, offsets, vehicle, lane, keep)
+            t_rec, x_rec, _ = store.samples()
+            # small deviations may add up over long stretches; keep the points where they do
+            error = (np.abs(t_rec - t) > tol_t) | (np.abs(x_rec - x) > tol_x)
+            if not error.any():
+                return store
+            keep |= error
+
+    @classmethod
+    def tolerance(cls, steps, n):
+        """
+        Returns the tolerance of each of the `n` points, `TOLERANCE` times the larger of the steps before and after it.
+        """
+        steps = np.abs(steps)
+        scale = np.zeros(n)
+        scale[:-1] = steps
+        scale[1:] = np.maximum(scale[1:], steps)
+        return cls.TOLERANCE * scale
+
+    @classmethod
+    def _select(cls, t, x, offsets, vehicle, lane, keep):
+        index = np.flatnonzero(keep)
+        steps = np.diff(index, append=len(t))
+        counts = np.add.reduceat(keep, offsets[:-1]) if len(t) else []
+        breakpoint_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        steps[breakpoint_offsets[1:] - 1] = 0
+        return cls(
+            t[index],
+            x[index],
+            steps.astype(np.int32),
+            breakpoint_offsets,
+            vehicle,
+            lane,
+        )
+
+    @classmethod
+    def concatenate(cls, stores):
+        """
+        Concatenate trajectory stores.
+
+        Parameters
+        ----------
+        stores : list of TrajectoryStore
+            The stores. May be empty.
+
+        Returns
+        -------
+        TrajectoryStore
+            The trajectories of all the stores, in order.
+        """
+        if len(stores) == 1:
+            return stores[0]
+        if len(stores) == 0:
+            return cls(
+                np.empty(0),
+                np.empty(0),
+                np.empty(0, dtype=np.int32),
+                np.zeros(1, dtype=np.int64),
+                np.empty(0, dtype=np.int32),
+                np.empty(0, dtype=np.int16),
+            )
+        bases = np.cumsum([0] + [len(store.t) for store in stores[:-1]])
+        return cls(
+            np.concatenate([store.t for store in stores]),
+            np.concatenate([store.x for store in stores]),
+            np.concatenate([store.steps for store in stores]),
+            np.concatenate(
+                [[0]] + [store.offsets[1:] + base for store, base in zip(stores, bases)]
+            ).astype(np.int64),
+            np.concatenate([store.vehicle for store in stores]),
+            np.concatenate([store.lane for store in stores]),
+        )
+
+    def subset(self, start, end):
+        """
+        Returns the trajectories `start` to `end - 1` as a store sharing the arrays of this one.
+        """
+        p0, p1 = self.offsets[start], self.offsets[end]
+        return TrajectoryStore(
+            self.t[p0:p1],
+            self.x[p0:p1],
+            self.steps[p0:p1],
+            self.offsets[start : end + 1] - p0,
+            self.vehicle[start:end],
+            self.lane[start:end],
+        )
+
+    def __len__(self):
+        return len(self.vehicle)
+
+    def breakpoints(self, i):
+        """
+        Returns the breakpoints of a trajectory.
+
+        Parameters
+        ----------
+        i : int
+            The index of the trajectory.
+
+        Returns
+        -------
+        t, x : numpy.ndarray
+        """
+        return (
+            self.t[self.offsets[i] : self.offsets[i + 1]],
+            self.x[self.offsets[i] : self.offsets[i + 1]],
+        )
+
+    def samples(self):
+        """
+        Reconstruct the sample points of all the trajectories.
+
+        Returns
+        -------
+        t, x : numpy.ndarray
+            Times and positions of the sample points, concatenated.
+        offsets : numpy.ndarray of int
+            Start index of each trajectory, followed by the number of points.
+        """
+        # each breakpoint is followed by `steps - 1` interpolated points
+        repeats = np.maximum(self.steps, 1)
+        seg = np.repeat(np.arange(len(self.t)), repeats)
+        j = np.arange(len(seg)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        last = self.steps[seg] == 0
+        nxt = np.where(last, seg, seg + 1)
+        # multiplied before divided, so that the points on a grid of round numbers are exact
+        w = np.where(last, 0, j)
+        t = self.t[seg] + (self.t[nxt] - self.t[seg]) * w / repeats[seg]
+        x = self.x[seg] + (self.x[nxt] - self.x[seg]) * w / repeats[seg]
+        counts = np.add.reduceat(repeats, self.offsets[:-1]) if len(self.t) else []
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return t, x, offsets
+
+    @property
+    def nbytes(self):
+        """Size of the arrays in bytes."""
+        return sum(
+            a.nbytes
+            for a in (self.t, self.x, self.steps, self.offsets, self.vehicle, self.lane)
+        )
+
+
+class GifWriter:
+    """
+    Animated GIF file written frame by frame, so that the frames are not kept in memory.
+
+    Notes
+    -----
+    Each frame is quantized to a palette of its own with the fast octree method, which is stored as the local color table of the frame.
+    `encode` can be run in other processes, with the encoded frames written by `write_encoded` in order.
+    """
+
+    def __init__(self, fname, duration, loop=0):
+        """
+        Create an animated GIF file.
+
+        Parameters
+        ----------
+        fname : str
+            The file name.
+        duration : int
+            Display duration of each frame in milliseconds.
+        loop : int, optional
+            Number of loops, 0 for infinite. Default is 0.
+        """
+        self.duration = duration
+        self.loop = loop
+        self.n_frames = 0
+        self.file = open(fname, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def encode(img, duration):
+        """
+        Encode a frame.
+
+        Parameters
+        ----------
+        img : PIL.Image.Image
+            The frame.
+        duration : int
+            Display duration of the frame in milliseconds.
+
+        Returns
+        -------
+        tuple
+            The size of the frame and the list of bytes of the encoded frame.
+        """
+        frame = img.convert("RGB").quantize(256, method=Image.Quantize.FASTOCTREE)
+        data = GifImagePlugin.getdata(
+            frame, duration=duration, include_color_table=True
+        )
+        return frame.size, data
+
+    def write_encoded(self, encoded):
+        """
+        Append a frame encoded by `encode`.
+        """
+        size, data = encoded
+        if self.n_frames == 0:
+            header, _ = GifImagePlugin.getheader(
+                Image.new("P", size), info={"loop": self.loop}
+            )
+            self.file.write(b"".join(header))
+        self.file.writelines(data)
+        self.n_frames += 1
+
+    def append(self, img):
+        """
+        Append a frame.
+
+        Parameters
+        ----------
+        img : PIL.Image.Image
+            The frame.
+        """
+        self.write_encoded(self.encode(img, self.duration))
+
+    def close(self):
+        if self.n_frames:
+            self.file.write(b";")  # trailer
+        self.file.close()
+
+
+class NetworkCanvas:
+    """
+    Pillow canvas of the whole network for the frames of the network animations.
+
+    Notes
+    -----
+    The static parts of the frames are rendered once: `background` is drawn below and `overlay` above the per-frame contents.
+    The canvas does not refer to the World, so that it can be sent to other processes to render frames there.
+    """
+
+    def __init__(self, W, figsize, scale=2):
+        """
+        Create the canvas.
+
+        Parameters
+        ----------
+        W : object
+            The World.
+        figsize : int or tuple of int
+            The width of the image, in hundreds of pixels.
+        scale : int, optional
+            The frames are drawn at `scale` times the size of the image and downsampled by averaging for anti-aliasing. Default is 2.
+        """
+        maxx = max([n.x for n in W.NODES])
+        minx = min([n.x for n in W.NODES])
+        maxy = max([n.y for n in W.NODES])
+        miny = min([n.y for n in W.NODES])
+
+        try:
+            coef = figsize * 100 * scale / (maxx - minx)
+        except:
+            coef = figsize[0] * 100 * scale / (maxx - minx)
+        maxx *= coef
+        minx *= coef
+        maxy *= coef
+        miny *= coef
+
+        buffer = (maxx - minx) / 10
+        maxx += buffer
+        minx -= buffer
+        maxy += buffer
+        miny -= buffer
+
+        self.coef = coef
+        self.minx = minx
+        self.miny = miny
+        self.scale = scale
+        self.size = (int(maxx - minx), int(maxy - miny))
+        self.background = Image.new("RGB", self.size, (255, 255, 255))
+        self.overlay = None
+
+    def xy(self, x, y):
+        """
+        Pixel coordinates of a point in the network.
+        """
+        return x * self.coef - self.minx, self.flip(y * self.coef - self.miny)
+
+    def flip(self, y):
+        return self.size[1] - y
+
+    def new_frame(self):
+        """
+        Returns a copy of the background and its drawing context.
+        """
+        img = self.background.copy()
+        return img, ImageDraw.Draw(img)
+
+    def finish_frame(self, img, t):
+        """
+        Draw the overlay and the time on a frame and downsample it.
+        """
+        if self.overlay is not None:
+            img.paste(self.overlay, mask=self.overlay)
+        draw = ImageDraw.Draw(img)
+        draw.text((img.size[0] / 2, 20), f"t = {t :>8} (s)", fill="black", anchor="mm")
+        return img.reduce(self.scale)
+
+
+class LinkStateCanvas(NetworkCanvas):
+    """
+    Canvas of `Analyzer.network_pillow`: the links are drawn with the width of their density and the color of their speed.
+    """
+
+    def __init__(self, W, minwidth, maxwidth, left_handed, figsize, network_font_size):
+        """
+        Create the canvas. See `Analyzer.network_pillow` for the parameters.
+        """
+        super().__init__(W, figsize)
+        self.minwidth = minwidth * self.scale
+        self.maxwidth = maxwidth * self.scale
+
+        # the links are shifted to the side of their direction
+        self.lines = []
+        for l in W.LINKS:
+            x1, y1 = l.start_node.x * self.coef, l.start_node.y * self.coef
+            x2, y2 = l.end_node.x * self.coef, l.end_node.y * self.coef
+            vx, vy = (y1 - y2) * 0.05, (x2 - x1) * 0.05
+            if not left_handed:
+                vx, vy = -vx, -vy
+            xmid1, ymid1 = (2 * x1 + x2) / 3 + vx, (2 * y1 + y2) / 3 + vy
+            xmid2, ymid2 = (x1 + 2 * x2) / 3 + vx, (y1 + 2 * y2) / 3 + vy
+            self.lines.append(
+                [
+                    (x - self.minx, self.flip(y - self.miny))
+                    for x, y in [(x1, y1), (xmid1, ymid1), (xmid2, ymid2), (x2, y2)]
+                ]
+            )
+
+        if network_font_size > 0:
+            self.overlay = Image.new("RGBA", self.size, (255, 255, 255, 0))
+            draw = ImageDraw.Draw(self.overlay)
+            for l, line in zip(W.LINKS, self.lines):
+                draw.text(line[1], l.name, fill="blue", anchor="mm")
+            for n in W.NODES:
+                draw.text(self.xy(n.x, n.y), n.name, fill="green", anchor="mm")
+
+    def link_states(self, W, t):
+        """
+        Returns the widths and the colors of the links at time `t` for `render`.
+        """
+        i = int(t / W.DELTAT)
+        k = np.array(
+            [(l.cum_arrival[i] - l.cum_departure[i]) / l.length for l in W.LINKS]
+        )
+        v = np.array([l.length / l.traveltime_instant[i] for l in W.LINKS])
+        delta = np.array([l.delta for l in W.LINKS])
+        u = np.array([l.u for l in W.LINKS])
+        widths = k * delta * (self.maxwidth - self.minwidth) + self.minwidth
+        colors = (plt.colormaps["viridis"](v / u)[:, :3] * 255).astype(int)
+        return widths, colors
+
+    def render(self, t, widths, colors):
+        """
+        Render the frame at time `t`.
+
+        Parameters
+        ----------
+        t : int
+            The time.
+        widths, colors : numpy.ndarray
+            The widths and the RGB colors of the links, from `link_states`.
+
+        Returns
+        -------
+        PIL.Image.Image
+        """
+        img, draw = self.new_frame()
+        for line, width, c in zip(self.lines, widths, colors):
+            draw.line(line, fill=tuple(c), width=int(width), joint="curve")
+        return self.finish_frame(img, t)
+
+
+class TraceCanvas(NetworkCanvas):
+    """
+    Canvas of `Analyzer.network_fancy`: the traces of the vehicles are drawn on the gray links.
+    """
+
+    def __init__(self, W, figsize, network_font_size):
+        """
+        Create the canvas. See `Analyzer.network_fancy` for the parameters.
+        """
+        super().__init__(W, figsize)
+        draw = ImageDraw.Draw(self.background)
+        for l in W.LINKS:
+            x1, y1 = self.xy(l.start_node.x, l.start_node.y)
+            x2, y2 = self.xy(l.end_node.x, l.end_node.y)
+            draw.line(
+                [(x1, y1), (x2, y2)], fill=(200, 200, 200), width=int(1), joint="curve"
+            )
+            if network_font_size > 0:
+                draw.text(
+                    ((x1 + x2) / 2, (y1 + y2) / 2), l.name, fill="blue", anchor="mm"
+                )
+
+    def render(self, t, traces):
+        """
+        Render the frame at time `t`.
+
+        Parameters
+        ----------
+        t : int
+            The time.
+        traces : list of dict
+            The traces of the vehicles, with their coordinates "xs" and "ys", color "c", and normalized speed "v".
+
+        Returns
+        -------
+        PIL.Image.Image
+        """
+        img, draw = self.new_frame()
+        for trace in traces:
+            xs = trace["xs"] * self.coef - self.minx
+            ys = trace["ys"] * self.coef - self.miny
+            # the speed may exceed the free flow speed
+            size = max(3 * (1 - trace["v"]), 0)
+            c = tuple(int(ci * 255) for ci in trace["c"][:3])
+            coords = [(x, self.flip(y)) for x, y in zip(xs, ys)]
+            draw.line(coords, fill=c, width=2, joint="curve")
+            x, y = coords[-1]
+            draw.ellipse((x - size, y - size, x + size, y + size), fill=c)
+        return self.finish_frame(img, t)
+
+
+# canvas of the worker process, set by `_init_render_worker`
+_worker_canvas = None
+
+
+def _init_render_worker(canvas):
+    global _worker_canvas
+    _worker_canvas = canvas
+
+
+def _render_worker(frame, duration):
+    return GifWriter.encode(_worker_canvas.render(*frame), duration)
+
+
+def render_animation(canvas, frames, fname, duration, processes=1):
+    """
+    Render the frames of an animation and write them to an animated GIF file.
+
+    Parameters
+    ----------
+    canvas : NetworkCanvas
+        The canvas. Each frame is rendered by `canvas.render(*frame)`.
+    frames : iterable of tuple
+        The arguments of the frames. It is consumed lazily, so it can be a generator.
+    fname : str
+        The file name.
+    duration : int
+        Display duration of each frame in milliseconds.
+    processes : int or None, optional
+        Number of worker processes. Default is 1 (rendered in this process). None uses all CPUs.
+
+    Notes
+    -----
+    With multiple processes, the frames are rendered and encoded in batches of a few frames per process, so that the memory usage does not grow with the length of the animation.
+    """
+    with GifWriter(fname, duration) as writer:
+        if processes == 1:
+            for frame in frames:
+                writer.append(canvas.render(*frame))
+            return
+        batch_size = 4 * (processes or os.cpu_count())
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_render_worker,
+            initargs=(canvas,),
+        ) as executor:
+            frames = iter(frames)
+            while True:
+                batch = list(itertools.islice(frames, batch_size))
+                if len(batch) == 0:
+                    break
+                for encoded in executor.map(
+                    _render_worker, batch, [duration] * len(batch)
+                ):
+                    writer.write_encoded(encoded)
+
+
 class Analyzer:
     """
     Class for analyzing and visualizing a simulation result.
@@ -75,12 +755,79 @@ class Analyzer:
         self.total_travel_time = 0
         self.average_travel_time = 0
 
+        # travel time statistics of completed trips, {(orig id, dest id): (number of vehicles, mean, sum of squared deviations)}, updated by `record_trip`
+        self.od_tt_stats = {}
+
         # Flag
         self.flag_edie_state_computed = 0
         self.flag_trajectory_computed = 0
         self.flag_pandas_convert = 0
         self.flag_od_analysis = 0
 
+    def record_speed(self, state, v):
+        """
+        Update the average speed with a vehicle on the current timestep. Called for every living vehicle on every timestep, regardless of the logging interval.
+
+        Parameters
+        ----------
+        state : str
+            The state of the vehicle. Waiting vehicles are counted without changing the average, running vehicles are averaged with their speed, and the other states are ignored.
+        v : float
+            The speed of the vehicle.
+        """
+        if state == "wait":
+            self.average_speed_count += 1
+        elif state == "run":
+            self.average_speed_count += 1
+            self.average_speed += (v - self.average_speed) / self.average_speed_count
+
+    def record_speeds(self, v, running):
+        """
+        Vectorized `record_speed` for waiting and running vehicles in the order of update.
+
+        Parameters
+        ----------
+        v : numpy.ndarray
+            The speeds of the vehicles.
+        running : numpy.ndarray of bool
+            Whether each vehicle is running (True) or waiting (False).
+
+        Notes
+        -----
+        Each update is `average <- c * average + w`, with `c = 1 - 1/n` and `w = v/n` for a running vehicle counted `n`-th, and `c = 1`, `w = 0` for a waiting vehicle. They are composed at once with suffix products of `c`, so the result equals sequential updates up to rounding.
+        """
+        if len(v) == 0:
+            return
+        n = self.average_speed_count + np.arange(1, len(v) + 1)
+        c = np.where(running, 1 - 1 / n, 1.0)
+        w = np.where(running, v / n, 0.0)
+        # products of c over the later updates, from each update to the end
+        later = np.append(np.cumprod(c[::-1])[::-1][1:], 1.0)
+        self.average_speed = float(
+            self.average_speed * c[0] * later[0] + np.sum(w * later)
+        )
+        self.average_speed_count += len(v)
+
+    def record_trip(self, veh):
+        """
+        Update the travel time statistics of the OD pair with a vehicle that ended its trip. Aborted trips are ignored.
+
+        Parameters
+        ----------
+        veh : Vehicle object
+            The vehicle.
+        """
+        if veh.travel_time == -1 or veh.dest == None:
+            return
+        key = veh.orig.id, veh.dest.id
+        n, mean, m2 = self.od_tt_stats.get(key, (0, 0.0, 0.0))
+        # Welford's online algorithm
+        n += 1
+        delta = veh.travel_time - mean
+        mean += delta / n
+        m2 += delta * (veh.travel_time - mean)
+        self.od_tt_stats[key] = n, mean, m2
+
     def basic_analysis(self):
         """
         Analyze basic stats.
@@ -109,6 +856,10 @@ class Analyzer:
     def od_analysis(self):
         """
         Analyze OD-specific stats: number of trips, number of completed trips, free-flow travel time, average travel time, its std
+
+        Notes
+        -----
+        The travel time statistics are accumulated during the simulation by `record_trip`, so they do not depend on the vehicle logs.
         """
         if self.flag_od_analysis:
             return 0
@@ -118,7 +869,6 @@ class Analyzer:
         self.od_trips = ddict(lambda: 0)
         self.od_trips_comp = ddict(lambda: 0)
         self.od_tt_free = ddict(lambda: 0)
-        self.od_tt = ddict(lambda: [])
         self.od_tt_ave = ddict(lambda: 0)
         self.od_tt_std = ddict(lambda: 0)
         dn = self.W.DELTAN
@@ -137,16 +887,13 @@ class Analyzer:
         dist = floyd_warshall(adj_mat_time)
 
         for veh in self.W.VEHICLES.values():
-            o = veh.orig
-            d = veh.dest
-            if d != None:
-                self.od_trips[o, d] += dn
-                if veh.travel_time != -1:
-                    self.od_trips_comp[o, d] += dn
-                    self.od_tt[o, d].append(veh.travel_time)
-        for o, d in self.od_tt.keys():
-            self.od_tt_ave[o, d] = np.average(self.od_tt[o, d])
-            self.od_tt_std[o, d] = np.std(self.od_tt[o, d])
+            if veh.dest != None:
+                self.od_trips[veh.orig, veh.dest] += dn
+        for (o, d), (n, mean, m2) in self.od_tt_stats.items():
+            o, d = self.W.NODES[o], self.W.NODES[d]
+            self.od_trips_comp[o, d] = n * dn
+            self.od_tt_ave[o, d] = mean
+            self.od_tt_std[o, d] = np.sqrt(m2 / n)
             self.od_tt_free[o, d] = dist[o.id, d.id]
 
     def link_analysis_coarse(self):
@@ -164,14 +911,14 @@ class Analyzer:
             self.linkc_remain[l] = l.cum_arrival[-1] - l.cum_departure[-1]
             self.linkc_tt_free[l] = l.length / l.u
             if self.linkc_volume[l]:
-                self.linkc_tt_ave[l] = np.average(
-                    [t for t in l.traveltime_actual if t > 0]
-                )
-                self.linkc_tt_std[l] = np.std([t for t in l.traveltime_actual if t > 0])
+                tt = l.traveltime_actual[l.traveltime_actual > 0]
+                self.linkc_tt_ave[l] = np.average(tt)
+                self.linkc_tt_std[l] = np.std(tt)
 
     def compute_accurate_traj(self):
         """
         Generate more complete vehicle trajectories for each link by extrapolating recorded trajectories. It is assumed that vehicles are in free-flow travel at the end of the link.
+        The trajectories are stored in `Link.traj` as a `TrajectoryStore`.
         """
         if self.W.vehicle_logging_timestep_interval != 1:
             warnings.warn(
@@ -184,40 +931,99 @@ class Analyzer:
         else:
             self.flag_trajectory_computed = 1
 
-        for veh in self.W.VEHICLES.values():
-            l_old = None
-            for i in range(len(veh.log_t)):
-                if veh.log_link[i] != -1:
-                    l = self.W.get_link(veh.log_link[i])
-                    if l_old != l:
-                        l.tss.append([])
-                        l.xss.append([])
-                        l.ls.append(veh.log_lane[i])
-                        l.cs.append(veh.color)
-                        l.names.append(veh.name)
-
-                    l_old = l
-                    l.tss[-1].append(veh.log_t[i])
-                    l.xss[-1].append(veh.log_x[i])
+        # The log is read in batches of whole vehicles, and each batch is compressed to breakpoints before the next one is read, so that the sample points of all the vehicles are never held at once.
+        u = np.array([l.u for l in self.W.LINKS], dtype=float)
+        length = np.array([l.length for l in self.W.LINKS], dtype=float)
+        parts = [[] for l in self.W.LINKS]
+        for records in self.W.VEHICLE_LOG.iter_records():
+            store, run_link = self._traj_of_records(records, u, length)
+            bounds = np.searchsorted(run_link, np.arange(len(self.W.LINKS) + 1))
+            for part, r0, r1 in zip(parts, bounds[:-1], bounds[1:]):
+                if r1 > r0:
+                    part.append(store.subset(r0, r1))
+        for l, part in zip(self.W.LINKS, parts):
+            l.traj = TrajectoryStore.concatenate(part)
+
+    def _traj_of_records(self, records, u, length):
+        """
+        Build the trajectories on links from vehicle log records.
 
-        for l in self.W.LINKS:
-            # extrapolateEnd
-            for i in range(len(l.xss)):
-                if len(l.xss[i]):
-                    if l.xss[i][0] != 0:
-                        x_remain = l.xss[i][0]
-                        if x_remain / l.u > self.W.DELTAT * 0.01:
-                            l.xss[i].insert(0, 0)
-                            l.tss[i].insert(0, l.tss[i][0] - x_remain / l.u)
-                    if l.length - l.u * self.W.DELTAT <= l.xss[i][-1] < l.length:
-                        x_remain = l.length - l.xss[i][-1]
-                        if x_remain / l.u > self.W.DELTAT * 0.01:
-                            l.xss[i].append(l.length)
-                            l.tss[i].append(l.tss[i][-1] + x_remain / l.u)
-
-    def compute_edie_state(self):
+        Parameters
+        ----------
+        records : numpy.ndarray
+            Records of whole vehicles, ordered by vehicle and by time, as yielded by `VehicleLog.iter_records`.
+        u, length : numpy.ndarray
+            Free flow speed and length of each link.
+
+        Returns
+        -------
+        store : TrajectoryStore
+            The trajectories, grouped by link and in the order of vehicles for each link.
+        run_link : numpy.ndarray of int
+            The link of each trajectory.
+        """
+        # split the records on links into runs of the same vehicle on the same link
+        on_link = records["link"] != -1
+        vehicle = records["vehicle"][on_link]
+        link = records["link"][on_link]
+        timestep = records["timestep"][on_link].astype(np.int64)
+        position = records["x"][on_link]
+        new_run = np.ones(len(link), dtype=bool)
+        new_run[1:] = (vehicle[1:] != vehicle[:-1]) | (link[1:] != link[:-1])
+        starts = np.flatnonzero(new_run)
+        lasts = np.append(starts[1:], len(link)) - 1
+        run_link = link[starts]
+
+        # extrapolateEnd
+        u = u[run_link]
+        length = length[run_link]
+        t_first = timestep[starts] * self.W.DELTAT
+        t_last = timestep[lasts] * self.W.DELTAT
+        x_first = position[starts]
+        x_last = position[lasts]
+        add_first = (x_first != 0) & (x_first / u > self.W.DELTAT * 0.01)
+        add_last = (
+            (length - u * self.W.DELTAT <= x_last)
+            & (x_last < length)
+            & ((length - x_last) / u > self.W.DELTAT * 0.01)
+        )
+
+        # the runs grouped by link, in the order of vehicles
+        order = np.argsort(run_link, kind="stable")
+        counts = (lasts - starts + 1 + add_first + add_last)[order]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        t = np.empty(offsets[-1])
+        x = np.empty(offsets[-1])
+        first = offsets[:-1]
+        last = offsets[1:] - 1
+        n_records = (lasts - starts + 1)[order]
+        src = _ranges(starts[order], n_records)
+        dst = _ranges(first + add_first[order], n_records)
+        t[dst] = timestep[src] * self.W.DELTAT
+        x[dst] = position[src]
+        head, tail = add_first[order], add_last[order]
+        t[first[head]] = (t_first - x_first / u)[order][head]
+        x[first[head]] = 0
+        t[last[tail]] = (t_last + (length - x_last) / u)[order][tail]
+        x[last[tail]] = length[order][tail]
+
+        store = TrajectoryStore.from_samples(
+            t,
+            x,
+            offsets,
+            vehicle[starts][order],
+            records["lane"][on_link][starts][order],
+        )
+        return store, run_link[order]
+
+    def compute_edie_state(self, processes=1):
         """
         Compute Edie's traffic state for each link.
+
+        Parameters
+        ----------
+        processes : int or None, optional
+            Number of worker processes over which the links are distributed. Default is 1 (computed in this process). None uses all CPUs.
         """
         if self.flag_edie_state_computed:
             return 0
@@ -225,82 +1031,30 @@ class Analyzer:
             self.flag_edie_state_computed = 1
 
         self.compute_accurate_traj()
-        for l in self.W.LINKS:
+        args = [
+            (
+                l.traj,
+                l.edie_dx,
+                l.edie_dt,
+                int(l.length / l.edie_dx),
+                int(self.W.TMAX / l.edie_dt),
+            )
+            for l in self.W.LINKS
+        ]
+        if processes == 1:
+            results = [edie_cell_sums_traj(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(edie_cell_sums_traj, *zip(*args)))
+
+        for l, (tn, dn) in zip(self.W.LINKS, results):
             DELTAX = l.edie_dx
             DELTATE = l.edie_dt
-            MAXX = l.length
-            MAXT = self.W.TMAX
-
-            dt = DELTATE
-            dx = DELTAX
-            tn = [
-                [ddict(lambda: 0) for i in range(int(MAXX / DELTAX))]
-                for j in range(int(MAXT / DELTATE))
-            ]
-            dn = [
-                [ddict(lambda: 0) for i in range(int(MAXX / DELTAX))]
-                for j in range(int(MAXT / DELTATE))
-            ]
-
-            l.k_mat = np.zeros([int(MAXT / DELTATE), int(MAXX / DELTAX)])
-            l.q_mat = np.zeros([int(MAXT / DELTATE), int(MAXX / DELTAX)])
-            l.v_mat = np.zeros([int(MAXT / DELTATE), int(MAXX / DELTAX)])
-
-            for v in range(len(l.xss)):
-                for i in range(len(l.xss[v][:-1])):
-                    i0 = l.names[v]
-                    x0 = l.xss[v][i]
-                    x1 = l.xss[v][i + 1]
-                    t0 = l.tss[v][i]
-                    t1 = l.tss[v][i + 1]
-                    if t1 - t0 != 0:
-                        v0 = (x1 - x0) / (t1 - t0)
-                    else:
-                        # compute_accurate_traj()Since t1=t0 extremely rarely occurred during extrapolation, avoid the error (it shouldn't happen again, but just in case）
-                        v0 = 0
-
-                    tt = int(t0 // dt)
-                    xx = int(x0 // dx)
-
-                    if v0 > 0:
-                        # remaining
-                        xl0 = dx - x0 % dx
-                        xl1 = x1 % dx
-                        tl0 = xl0 / v0
-                        tl1 = xl1 / v0
-
-                        if tt < int(MAXT / DELTATE) and xx < int(MAXX / DELTAX):
-                            if xx == x1 // dx:
-                                # (x,t)
-                                dn[tt][xx][i0] += x1 - x0
-                                tn[tt][xx][i0] += t1 - t0
-                            else:
-                                # (x+n, t)
-                                jj = int(x1 // dx - xx + 1)
-                                for j in range(jj):
-                                    if xx + j < int(MAXX / DELTAX):
-                                        if j == 0:
-                                            dn[tt][xx + j][i0] += xl0
-                                            tn[tt][xx + j][i0] += tl0
-                                        elif j == jj - 1:
-                                            dn[tt][xx + j][i0] += xl1
-                                            tn[tt][xx + j][i0] += tl1
-                                        else:
-                                            dn[tt][xx + j][i0] += dx
-                                            tn[tt][xx + j][i0] += dx / v0
-                    else:
-                        if tt < int(MAXT / DELTATE) and xx < int(MAXX / DELTAX):
-                            dn[tt][xx][i0] += 0
-                            tn[tt][xx][i0] += t1 - t0
-
-            for i in range(len(tn)):
-                for j in range(len(tn[i])):
-                    t = list(tn[i][j].values()) * self.W.DELTAN
-                    d = list(dn[i][j].values()) * self.W.DELTAN
-                    l.tn_mat[i, j] = sum(t)
-                    l.dn_mat[i, j] = sum(d)
-                    l.k_mat[i, j] = l.tn_mat[i, j] / DELTATE / DELTAX
-                    l.q_mat[i, j] = l.dn_mat[i, j] / DELTATE / DELTAX
+            nt = len(tn)
+            l.tn_mat[:nt] = tn * self.W.DELTAN
+            l.dn_mat[:nt] = dn * self.W.DELTAN
+            l.k_mat = l.tn_mat[:nt] / DELTATE / DELTAX
+            l.q_mat = l.dn_mat[:nt] / DELTATE / DELTAX
             with np.errstate(invalid="ignore"):
                 l.v_mat = l.q_mat / l.k_mat
             l.v_mat = np.nan_to_num(l.v_mat, nan=l.u)
@@ -351,7 +1105,14 @@ class Analyzer:
 
     @catch_exceptions_and_warn()
     def time_space_diagram_traj(
-        self, links=None, figsize=(12, 4), plot_signal=True, xlim=None, ylim=None
+        self,
+        links=None,
+        figsize=(12, 4),
+        plot_signal=True,
+        xlim=None,
+        ylim=None,
+        mode="lines",
+        resolution=(600, 200),
     ):
         """
         Draws the time-space diagram of vehicle trajectories for vehicles on specified links.
@@ -365,6 +1126,10 @@ class Analyzer:
             The size of the figure to be plotted, default is (12,4).
         plot_signal : bool, optional
             Plot the downstream signal red light.
+        mode : str, optional
+            How the trajectories are drawn. See `time_space_diagram_traj_links`. Default is "lines".
+        resolution : tuple of int, optional
+            The number of pixels in time and space for the "density" and "speed" modes. Default is (600, 200).
         """
         if self.W.vehicle_logging_timestep_interval != 1:
             warnings.warn(
@@ -391,6 +1156,8 @@ class Analyzer:
                 plot_signal=plot_signal,
                 xlim=xlim,
                 ylim=ylim,
+                mode=mode,
+                resolution=resolution,
             )
 
     @catch_exceptions_and_warn()
@@ -484,7 +1251,14 @@ class Analyzer:
 
     @catch_exceptions_and_warn()
     def time_space_diagram_traj_links(
-        self, linkslist, figsize=(12, 4), plot_signal=True, xlim=None, ylim=None
+        self,
+        linkslist,
+        figsize=(12, 4),
+        plot_signal=True,
+        xlim=None,
+        ylim=None,
+        mode="lines",
+        resolution=(600, 200),
     ):
         """
         Draws the time-space diagram of vehicle trajectories for vehicles on concective links.
@@ -497,7 +1271,15 @@ class Analyzer:
             The size of the figure to be plotted, default is (12,4).
         plot_signal : bool, optional
             Plot the signal red light.
+        mode : str, optional
+            How the trajectories are drawn. Default is "lines".
+            "lines": each trajectory is drawn as a line in the color of its vehicle. The lines of each link are drawn as a single `LineCollection`.
+            "density" or "speed": the trajectories are rasterized into an image colored by the density (veh/m) or the average speed (m/s) in each pixel, computed like Edie's traffic state (see `edie_cell_sums`). The drawing time hardly depends on the number of vehicles.
+        resolution : tuple of int, optional
+            The number of pixels in time and space for the "density" and "speed" modes. Default is (600, 200).
         """
+        if mode not in ("lines", "density", "speed"):
+            raise ValueError(f"Unknown mode: {mode}")
         if self.W.vehicle_logging_timestep_interval != 1:
             warnings.warn(
                 "vehicle_logging_timestep_interval is not 1. The plot is not exactly accurate.",
@@ -516,6 +1298,7 @@ class Analyzer:
         except TypeError:
             linkslist = [linkslist]
 
+        vehs = list(self.W.VEHICLES.values())
         for links in linkslist:
             linkdict = {}
             d = 0
@@ -525,19 +1308,57 @@ class Analyzer:
                 d += l.length
 
             plt.figure(figsize=figsize)
+            ax = plt.gca()
+            if mode == "lines":
+                for l in linkdict:
+                    # vehicle with the same lane is plotted slightly shifted
+                    lane_shift = l.traj.lane / l.lanes * self.W.DELTAT / 2
+                    points = np.column_stack(
+                        [
+                            l.traj.t + np.repeat(lane_shift, np.diff(l.traj.offsets)),
+                            l.traj.x + linkdict[l],
+                        ]
+                    )
+                    segments = np.split(points, l.traj.offsets[1:-1])
+                    colors = [vehs[i].color for i in l.traj.vehicle]
+                    ax.add_collection(LineCollection(segments, colors=colors, lw=0.5))
+                ax.autoscale_view()
+            else:
+                t0, t1 = (0, self.W.TMAX) if xlim == None else xlim
+                nt, nx = resolution
+                dt, dx = (t1 - t0) / nt, d / nx
+                tn = np.zeros([nt, nx])
+                dn = np.zeros([nt, nx])
+                for l in linkdict:
+                    t, x, offsets = l.traj.samples()
+                    tn_l, dn_l = edie_cell_sums_flat(
+                        x + linkdict[l], t - t0, offsets, dx, dt, nx, nt
+                    )
+                    tn += tn_l
+                    dn += dn_l
+                if mode == "density":
+                    values = tn * self.W.DELTAN / dt / dx
+                    vmax = max([1 / l.delta for l in linkdict])
+                    cmap, label = "inferno", "density (veh/m)"
+                else:
+                    with np.errstate(invalid="ignore"):
+                        values = dn / tn
+                    vmax = max([l.u for l in linkdict])
+                    cmap, label = "viridis", "speed (m/s)"
+                plt.imshow(
+                    values.T,
+                    origin="lower",
+                    aspect="auto",
+                    extent=(t0, t1, 0, d),
+                    interpolation="none",
+                    vmin=0,
+                    vmax=vmax,
+                    cmap=cmap,
+                )
+                plt.colorbar().set_label(label)
+
             for ll in links:
                 l = self.W.get_link(ll)
-                for i in range(len(l.xss)):
-                    lane_shift = (
-                        l.ls[i] / l.lanes * self.W.DELTAT / 2
-                    )  # vehicle with the same lane is plotted slightly shifted
-                    plt.plot(
-                        np.array(l.tss[i]) + lane_shift,
-                        np.array(l.xss[i]) + linkdict[l],
-                        "-",
-                        c=l.cs[i],
-                        lw=0.5,
-                    )
                 if plot_signal:
                     signal_log = [
                         i * self.W.DELTAT
@@ -892,97 +1713,10 @@ class Analyzer:
         The visualization provides information on vehicle density, velocity, link names, node locations, and more.
         The plots are saved to the directory `out<W.name>` with filenames depending on the `detailed` and `t` parameters.
         """
-
-        maxx = max([n.x for n in self.W.NODES])
-        minx = min([n.x for n in self.W.NODES])
-        maxy = max([n.y for n in self.W.NODES])
-        miny = min([n.y for n in self.W.NODES])
-
-        scale = 2
-        try:
-            coef = figsize * 100 * scale / (maxx - minx)
-        except:
-            coef = figsize[0] * 100 * scale / (maxx - minx)
-        maxx *= coef
-        minx *= coef
-        maxy *= coef
-        miny *= coef
-        minwidth *= scale
-        maxwidth *= scale
-
-        buffer = (maxx - minx) / 10
-        maxx += buffer
-        minx -= buffer
-        maxy += buffer
-        miny -= buffer
-
-        img = Image.new(
-            "RGBA", (int(maxx - minx), int(maxy - miny)), (255, 255, 255, 255)
-        )
-        draw = ImageDraw.Draw(img)
-
-        # font_data = load_font_data()
-        # font_file_like = io.BytesIO(font_data)
-        # if network_font_size > 0:
-        # font = ImageFont.truetype(font_file_like, int(network_font_size))
-
-        def flip(y):
-            return img.size[1] - y
-
-        for l in self.W.LINKS:
-            x1, y1 = l.start_node.x * coef - minx, l.start_node.y * coef - miny
-            x2, y2 = l.end_node.x * coef - minx, l.end_node.y * coef - miny
-            vx, vy = (y1 - y2) * 0.05, (x2 - x1) * 0.05
-            if not left_handed:
-                vx, vy = -vx, -vy
-            k = (
-                l.cum_arrival[int(t / self.W.DELTAT)]
-                - l.cum_departure[int(t / self.W.DELTAT)]
-            ) / l.length
-            v = l.length / l.traveltime_instant[int(t / self.W.DELTAT)]
-            width = k * l.delta * (maxwidth - minwidth) + minwidth
-            c = plt.colormaps["viridis"](v / l.u)
-            xmid1, ymid1 = (2 * x1 + x2) / 3 + vx, (2 * y1 + y2) / 3 + vy
-            xmid2, ymid2 = (x1 + 2 * x2) / 3 + vx, (y1 + 2 * y2) / 3 + vy
-            draw.line(
-                [
-                    (x1, flip(y1)),
-                    (xmid1, flip(ymid1)),
-                    (xmid2, flip(ymid2)),
-                    (x2, flip(y2)),
-                ],
-                fill=(int(c[0] * 255), int(c[1] * 255), int(c[2] * 255)),
-                width=int(width),
-                joint="curve",
-            )
-
-            if network_font_size > 0:
-                draw.text((xmid1, flip(ymid1)), l.name, fill="blue", anchor="mm")
-
-        for n in self.W.NODES:
-            if network_font_size > 0:
-                draw.text(
-                    ((n.x) * coef - minx, flip((n.y) * coef - miny)),
-                    n.name,
-                    fill="green",
-                    anchor="mm",
-                )
-                draw.text(
-                    ((n.x) * coef - minx, flip((n.y) * coef - miny)),
-                    n.name,
-                    fill="green",
-                    anchor="mm",
-                )
-
-        # font_data = load_font_data()
-        # font_file_like = io.BytesIO(font_data)
-        # font = ImageFont.truetype(font_file_like, int(30))
-        draw.text((img.size[0] / 2, 20), f"t = {t :>8} (s)", fill="black", anchor="mm")
-
-        img = img.resize(
-            (int((maxx - minx) / scale), int((maxy - miny) / scale)),
-            resample=Resampling.LANCZOS,
+        canvas = LinkStateCanvas(
+            self.W, minwidth, maxwidth, left_handed, figsize, network_font_size
         )
+        img = canvas.render(t, *canvas.link_states(self.W, t))
         if image_return:
             return img
         elif tmp_anim:
@@ -994,7 +1728,7 @@ class Analyzer:
     @catch_exceptions_and_warn()
     def show_simulation_progress(self):
         """
-        Print simulation progress.
+        Print simulation progress. If the World is profiling, the shares of the phases of the main loop are printed as well.
         """
         if self.W.print_mode:
             vehs = [l.density * l.length for l in self.W.LINKS]
@@ -1010,6 +1744,8 @@ class Analyzer:
                 f"{self.W.TIME:>8.0f} s| {sum_vehs:>8.0f} vehs|  {avev:>4.1f} m/s| {time.time() - self.W.sim_start_time:8.2f} s",
                 flush=True,
             )
+            if self.W.PROFILER is not None and self.W.T > 0:
+                print(f"          | {self.W.PROFILER.summary()}", flush=True)
 
     @catch_exceptions_and_warn()
     def network_anim(
@@ -1023,6 +1759,7 @@ class Analyzer:
         node_size=2,
         timestep_skip=24,
         file_name=None,
+        processes=1,
     ):
         """
         Generates an animation of the entire transportation network and its traffic states over time.
@@ -1052,6 +1789,8 @@ class Analyzer:
             How many timesteps are skipped per frame. Large value means coarse and lightweight animation. Default is 8.
         file_name : str, optional
             The name of the file to which the animation is saved. It overrides the defauld name. Default is None.
+        processes : int or None, optional
+            Number of worker processes rendering the frames if `detailed` is 0. Default is 1 (rendered in this process). None uses all CPUs.
 
         Notes
         -----
@@ -1059,17 +1798,24 @@ class Analyzer:
         The animation provides information on vehicle density, velocity, link names, node locations, and more.
         The generated animation is saved to the directory `out<W.name>` with a filename based on the `detailed` parameter.
 
-        Temporary images used to create the animation are removed after the animation is generated.
+        The static network is rendered once, and the frames are written to the file as soon as they are rendered (see `render_animation`), so the memory usage does not depend on the length of the animation.
         """
         self.W.print(" generating animation...")
-        pics = []
-        for t in tqdm(
-            range(0, self.W.TMAX, self.W.DELTAT * timestep_skip),
-            disable=(self.W.print_mode == 0),
-        ):
-            if int(t / self.W.LINKS[0].edie_dt) < self.W.LINKS[0].k_mat.shape[0]:
-                if detailed:
-                    # todo_later: fromNowOnIWillAlsoMakeThisAPillow
+        fname = f"out{self.W.name}/anim_network{detailed}.gif"
+        if file_name != None:
+            fname = file_name
+        duration = animation_speed_inverse * timestep_skip
+        ts = [
+            t
+            for t in range(0, self.W.TMAX, self.W.DELTAT * timestep_skip)
+            if int(t / self.W.LINKS[0].edie_dt) < self.W.LINKS[0].k_mat.shape[0]
+        ]
+        ts = tqdm(ts, disable=(self.W.print_mode == 0))
+
+        if detailed:
+            # todo_later: fromNowOnIWillAlsoMakeThisAPillow
+            with GifWriter(fname, duration) as writer:
+                for t in ts:
                     self.network(
                         int(t),
                         detailed=detailed,
@@ -1080,32 +1826,15 @@ class Analyzer:
                         figsize=figsize,
                         node_size=node_size,
                     )
-                else:
-                    self.network_pillow(
-                        int(t),
-                        detailed=detailed,
-                        minwidth=minwidth,
-                        maxwidth=maxwidth,
-                        left_handed=left_handed,
-                        tmp_anim=1,
-                        figsize=figsize,
-                        node_size=node_size,
-                    )
-                pics.append(Image.open(f"out{self.W.name}/tmp_anim_{t}.png"))
-
-        fname = f"out{self.W.name}/anim_network{detailed}.gif"
-        if file_name != None:
-            fname = file_name
-        pics[0].save(
-            fname,
-            save_all=True,
-            append_images=pics[1:],
-            optimize=False,
-            duration=animation_speed_inverse * timestep_skip,
-            loop=0,
-        )
-        for f in glob.glob(f"out{self.W.name}/tmp_anim_*.png"):
-            os.remove(f)
+                    with Image.open(f"out{self.W.name}/tmp_anim_{t}.png") as img:
+                        writer.append(img)
+                    os.remove(f"out{self.W.name}/tmp_anim_{t}.png")
+        else:
+            canvas = LinkStateCanvas(
+                self.W, minwidth, maxwidth, left_handed, figsize, network_font_size=20
+            )
+            frames = ((int(t), *canvas.link_states(self.W, int(t))) for t in ts)
+            render_animation(canvas, frames, fname, duration, processes)
 
     @catch_exceptions_and_warn()
     def network_fancy(
@@ -1118,6 +1847,7 @@ class Analyzer:
         trace_length=3,
         speed_coef=2,
         file_name=None,
+        processes=1,
     ):
         """
         Generates a visually appealing animation of vehicles' trajectories across the entire transportation network over time.
@@ -1140,6 +1870,8 @@ class Analyzer:
             A coefficient that adjusts the animation speed. Default is 2.
         file_name : str, optional
             The name of the file to which the animation is saved. It overrides the defauld name. Default is None.
+        processes : int or None, optional
+            Number of worker processes rendering the frames. Default is 1 (rendered in this process). None uses all CPUs.
 
         Notes
         -----
@@ -1147,7 +1879,7 @@ class Analyzer:
         The animation provides information on vehicle positions, speeds, link names, node locations, and more, with Bezier curves used for smooth transitions.
         The generated animation is saved to the directory `out<W.name>` with a filename `anim_network_fancy.gif`.
 
-        Temporary images used to create the animation are removed after the animation is generated.
+        The static network is rendered once, and the frames are written to the file as soon as they are rendered (see `render_animation`).
         """
         if self.W.vehicle_logging_timestep_interval != 1:
             warnings.warn(
@@ -1176,21 +1908,23 @@ class Analyzer:
             vs = []
             dx = (random.random() - 0.5) * dcoef
             dy = (random.random() - 0.5) * dcoef
-            for i in range(0, len(veh.log_t), interval):
-                if veh.log_state[i] == "run":
-                    link = veh.log_link[i]
+            log_t, log_state, log_link = veh.log_t, veh.log_state, veh.log_link
+            log_x, log_v = veh.log_x, veh.log_v
+            for i in range(0, len(log_t), interval):
+                if log_state[i] == "run":
+                    link = log_link[i]
                     x0 = link.start_node.x + dx
                     y0 = link.start_node.y + dy
                     x1 = link.end_node.x + dx
                     y1 = link.end_node.y + dy
-                    alpha = veh.log_x[i] / link.length
-                    ts.append(veh.log_t[i])
+                    alpha = log_x[i] / link.length
+                    ts.append(log_t[i])
                     xs.append(x0 * (1 - alpha) + x1 * alpha)
                     ys.append(y0 * (1 - alpha) + y1 * alpha)
                     c = veh.color
-            for i in range(0, len(veh.log_t)):
-                if veh.log_state[i] == "run":
-                    vs.append(veh.log_v[i] / veh.log_link[i].u)
+            for i in range(0, len(log_t)):
+                if log_state[i] == "run":
+                    vs.append(log_v[i] / log_link[i].u)
             if len(ts) <= interval:
                 continue
 
@@ -1223,143 +1957,59 @@ class Analyzer:
                 )
 
         # visualization
-        maxx = max([n.x for n in self.W.NODES])
-        minx = min([n.x for n in self.W.NODES])
-        maxy = max([n.y for n in self.W.NODES])
-        miny = min([n.y for n in self.W.NODES])
-
-        scale = 2
-        try:
-            coef = figsize * 100 * scale / (maxx - minx)
-        except:
-            coef = figsize[0] * 100 * scale / (maxx - minx)
-        maxx *= coef
-        minx *= coef
-        maxy *= coef
-        miny *= coef
-
-        buffer = (maxx - minx) / 10
-        maxx += buffer
-        minx -= buffer
-        maxy += buffer
-        miny -= buffer
-
-        pics = []
-        for t in tqdm(
-            range(
-                int(self.W.TMAX * 0), int(self.W.TMAX * 1), self.W.DELTAT * speed_coef
-            )
-        ):
-            img = Image.new(
-                "RGBA", (int(maxx - minx), int(maxy - miny)), (255, 255, 255, 255)
-            )
-            draw = ImageDraw.Draw(img)
-            # font_data = load_font_data()
-            # font_file_like = io.BytesIO(font_data)
-            # if network_font_size > 0:
-            # font = ImageFont.truetype(font_file_like, int(network_font_size))
-
-            def flip(y):
-                return img.size[1] - y
-
-            for l in self.W.LINKS:
-                x1, y1 = l.start_node.x * coef - minx, l.start_node.y * coef - miny
-                x2, y2 = l.end_node.x * coef - minx, l.end_node.y * coef - miny
-                draw.line(
-                    [(x1, flip(y1)), (x2, flip(y2))],
-                    fill=(200, 200, 200),
-                    width=int(1),
-                    joint="curve",
-                )
-
-                if network_font_size > 0:
-                    draw.text(
-                        ((x1 + x2) / 2, flip((y1 + y2) / 2)),
-                        l.name,
-                        fill="blue",
-                        anchor="mm",
-                    )
-
-            traces = draw_dict[t]
-            for trace in traces:
-                xs = trace["xs"] * coef - minx
-                ys = trace["ys"] * coef - miny
-                size = 3 * (1 - trace["v"])
-                coords = [(l[0], flip(l[1])) for l in list(np.vstack([xs, ys]).T)]
-                draw.line(
-                    coords,
-                    fill=(
-                        int(trace["c"][0] * 255),
-                        int(trace["c"][1] * 255),
-                        int(trace["c"][2] * 255),
-                    ),
-                    width=2,
-                    joint="curve",
-                )
-                draw.ellipse(
-                    (
-                        xs[-1] - size,
-                        flip(ys[-1]) - size,
-                        xs[-1] + size,
-                        flip(ys[-1]) + size,
-                    ),
-                    fill=(
-                        int(trace["c"][0] * 255),
-                        int(trace["c"][1] * 255),
-                        int(trace["c"][2] * 255),
-                    ),
-                )
-                # draw.line([(x1, flip(y1)), (xmid1, flip(ymid1)), (xmid2, flip(ymid2)), (x2, flip(y2))]
-
-            # font_data = load_font_data()
-            # font_file_like = io.BytesIO(font_data)
-            # font = ImageFont.truetype(font_file_like, int(30))
-            draw.text(
-                (img.size[0] / 2, 20), f"t = {t :>8} (s)", fill="black", anchor="mm"
-            )
-
-            img = img.resize(
-                (int((maxx - minx) / scale), int((maxy - miny) / scale)),
-                resample=Resampling.LANCZOS,
-            )
-            img.save(f"out{self.W.name}/tmp_anim_{t}.png")
-            pics.append(Image.open(f"out{self.W.name}/tmp_anim_{t}.png"))
-
         fname = f"out{self.W.name}/anim_network_fancy.gif"
         if file_name != None:
             fname = file_name
-        pics[0].save(
-            fname,
-            save_all=True,
-            append_images=pics[1:],
-            optimize=False,
-            duration=animation_speed_inverse * speed_coef,
-            loop=0,
+        canvas = TraceCanvas(self.W, figsize, network_font_size)
+        ts = tqdm(range(0, int(self.W.TMAX), self.W.DELTAT * speed_coef))
+        frames = ((t, draw_dict.pop(t, [])) for t in ts)
+        render_animation(
+            canvas, frames, fname, animation_speed_inverse * speed_coef, processes
         )
 
-        for f in glob.glob(f"out{self.W.name}/tmp_anim_*.png"):
-            os.remove(f)
-
-    def compute_mfd(self, links=None):
+    def compute_mfd(self, links=None, edie=False):
         """
         Compute network average flow and density for MFD.
+
+        Parameters
+        ----------
+        links : list of link, optional
+            The links of the area. Default is None (all links).
+        edie : bool, optional
+            If True, compute them from Edie's traffic state of the links (see `compute_edie_state`), which requires the vehicle logs. Default is False, in which case they are computed from the time spent and the distance traveled that each link accumulates on every timestep during the simulation (`Link.area_tn` and `Link.area_dn`).
+
+        Notes
+        -----
+        The results are stored in `W.K_AREA[links]` and `W.Q_AREA[links]`, where `links` is the frozenset of the links.
+        The accumulated values count every vehicle on the link, including the vehicles waiting at the end of the link, whereas Edie's traffic state only covers the cells of length `eular_dx` within the link, so the two may differ in congestion.
         """
-        self.compute_edie_state()
         if links == None:
             links = self.W.LINKS
         links = [self.W.get_link(link) for link in links]
         links = frozenset(links)
 
-        for i in range(len(self.W.Q_AREA[links])):
-            tn = sum([l.tn_mat[i, :].sum() for l in self.W.LINKS if l in links])
-            dn = sum([l.dn_mat[i, :].sum() for l in self.W.LINKS if l in links])
-            an = sum([l.length * self.W.EULAR_DT for l in self.W.LINKS if l in links])
-            self.W.K_AREA[links][i] = tn / an
-            self.W.Q_AREA[links][i] = dn / an
+        nt = len(self.W.Q_AREA[links])
+        if edie:
+            self.compute_edie_state()
+            tn = sum([l.tn_mat[:nt].sum(axis=1) for l in links])
+            dn = sum([l.dn_mat[:nt].sum(axis=1) for l in links])
+        else:
+            tn = sum([l.area_tn[:nt] for l in links])
+            dn = sum([l.area_dn[:nt] for l in links])
+        an = sum([l.length * self.W.EULAR_DT for l in links])
+        self.W.K_AREA[links][:] = tn / an
+        self.W.Q_AREA[links][:] = dn / an
 
     @catch_exceptions_and_warn()
     def macroscopic_fundamental_diagram(
-        self, kappa=0.2, qmax=1, figtitle="", links=None, fname="", figsize=(4, 4)
+        self,
+        kappa=0.2,
+        qmax=1,
+        figtitle="",
+        links=None,
+        fname="",
+        figsize=(4, 4),
+        edie=False,
     ):
         """
         Plots the Macroscopic Fundamental Diagram (MFD) for the provided links.
@@ -1377,6 +2027,8 @@ class Analyzer:
             File name for saving (postfix). Default is "".
         figsize : tuple of int, optional
             The size of the figure to be plotted. Default is (4, 4).
+        edie : bool, optional
+            Compute the MFD from Edie's traffic state. See `compute_mfd`. Default is False.
 
         Notes
         -----
@@ -1389,7 +2041,7 @@ class Analyzer:
             links = self.W.LINKS
         links = [self.W.get_link(link) for link in links]
         links = frozenset(links)
-        self.compute_mfd(links)
+        self.compute_mfd(links, edie)
 
         plt.figure(figsize=figsize)
         plt.title(f"{figtitle} (# of links: {len(links)})")
@@ -1433,7 +2085,8 @@ class Analyzer:
 
         fig, ax1 = plt.subplots()
         plt.title(f"vehicle: {veh.name}")
-        ax1.fill_between(veh.log_t, 0, veh.log_v, color="c", zorder=10)
+        log_t, log_state = veh.log_t, veh.log_state
+        ax1.fill_between(log_t, 0, veh.log_v, color="c", zorder=10)
         ax1.set_ylabel("speed (m/s)", color="c")
         plt.ylim([0, None])
         plt.xlabel("time (s)")
@@ -1441,8 +2094,8 @@ class Analyzer:
         ax2 = ax1.twinx()
         vehlinks = [str(l.name) if l != -1 else "not in network" for l in veh.log_link]
         ax2.plot(
-            [veh.log_t[i] for i in range(len(veh.log_t)) if veh.log_state[i] != "home"],
-            [vehlinks[i] for i in range(len(vehlinks)) if veh.log_state[i] != "home"],
+            [log_t[i] for i in range(len(log_t)) if log_state[i] != "home"],
+            [vehlinks[i] for i in range(len(vehlinks)) if log_state[i] != "home"],
             "k-",
             color="g",
             zorder=20,
@@ -1485,20 +2138,13 @@ class Analyzer:
 
         plt.figure()
         for veh in vehs:
+            log_t, log_state = veh.log_t, veh.log_state
             vehlinks = [
                 str(l.name) if l != -1 else "not in network" for l in veh.log_link
             ]
             plt.plot(
-                [
-                    veh.log_t[i]
-                    for i in range(len(veh.log_t))
-                    if veh.log_state[i] != "home"
-                ],
-                [
-                    vehlinks[i]
-                    for i in range(len(vehlinks))
-                    if veh.log_state[i] != "home"
-                ],
+                [log_t[i] for i in range(len(log_t)) if log_state[i] != "home"],
+                [vehlinks[i] for i in range(len(vehlinks)) if log_state[i] != "home"],
                 c=veh.color,
                 label=veh.name,
             )
@@ -1540,36 +2186,42 @@ class Analyzer:
             )
 
         if self.flag_pandas_convert == 0:
-            out = [["name", "dn", "orig", "dest", "t", "link", "x", "s", "v"]]
-            for veh in self.W.VEHICLES.values():
-                for i in range(len(veh.log_t)):
-                    if veh.log_state[i] in ("wait", "run", "end", "abort"):
-                        if veh.log_link[i] != -1:
-                            linkname = veh.log_link[i].name
-                        else:
-                            if veh.log_state[i] == "wait":
-                                linkname = "waiting_at_origin_node"
-                            elif veh.log_state[i] == "abort":
-                                linkname = "trip_aborted"
-                            else:
-                                linkname = "trip_end"
-                        veh_dest_name = None
-                        if veh.dest != None:
-                            veh_dest_name = veh.dest.name
-                        out.append(
-                            [
-                                veh.name,
-                                self.W.DELTAN,
-                                veh.orig.name,
-                                veh_dest_name,
-                                veh.log_t[i],
-                                linkname,
-                                veh.log_x[i],
-                                veh.log_s[i],
-                                veh.log_v[i],
-                            ]
-                        )
-            self.df_vehicles = pd.DataFrame(out[1:], columns=out[0])
+            log = self.W.VEHICLE_LOG
+            records = log.records()
+            state = records["state"]
+            records = records[state != log.STATES.index("home")]
+            state = records["state"]
+            vehicle = records["vehicle"]
+            link = records["link"]
+
+            vehs = list(self.W.VEHICLES.values())
+            names = np.array([veh.name for veh in vehs], dtype=object)
+            orig_names = np.array([veh.orig.name for veh in vehs], dtype=object)
+            dest_names = np.array(
+                [veh.dest.name if veh.dest != None else None for veh in vehs],
+                dtype=object,
+            )
+
+            linkname = np.full(len(records), "trip_end", dtype=object)
+            linkname[state == log.STATES.index("wait")] = "waiting_at_origin_node"
+            linkname[state == log.STATES.index("abort")] = "trip_aborted"
+            on_link = link != -1
+            link_names = np.array([l.name for l in self.W.LINKS], dtype=object)
+            linkname[on_link] = link_names[link[on_link]]
+
+            self.df_vehicles = pd.DataFrame(
+                {
+                    "name": names[vehicle],
+                    "dn": self.W.DELTAN,
+                    "orig": orig_names[vehicle],
+                    "dest": dest_names[vehicle],
+                    "t": records["timestep"].astype(np.int64) * self.W.DELTAT,
+                    "link": linkname,
+                    "x": records["x"],
+                    "s": records["s"],
+                    "v": records["v"],
+                }
+            )
 
             self.flag_pandas_convert = 1
         return self.df_vehicles
@@ -1695,22 +2347,29 @@ class Analyzer:
         self.df_od = pd.DataFrame(out[1:], columns=out[0])
         return self.df_od
 
-    def mfd_to_pandas(self, links=None):
+    def mfd_to_pandas(self, links=None, edie=False):
         """
         Converts the MFD to a pandas DataFrame.
 
+        Parameters
+        ----------
+        links : list of link, optional
+            The links of the area. Default is None (all links).
+        edie : bool, optional
+            Compute the MFD from Edie's traffic state. See `compute_mfd`. Default is False.
+
         Returns
         -------
         pd.DataFrame
         """
         if links == None:
             links = self.W.LINKS
-        self.compute_mfd(links)
+        self.compute_mfd(links, edie)
         links = [self.W.get_link(link) for link in links]
         links = frozenset(links)
 
         out = [["t", "network_k", "network_q"]]
-        for i in range(len(self.W.K_AREA)):
+        for i in range(len(self.W.K_AREA[links])):
             out.append(
                 [i * self.W.EULAR_DT, self.W.K_AREA[links][i], self.W.Q_AREA[links][i]]
             )
@@ -1788,43 +2447,55 @@ class Analyzer:
         -------
         pd.DataFrame
         """
-        out = [
-            [
-                "link",
-                "t",
-                "arrival_count",
-                "departure_count",
-                "actual_travel_time",
-                "instantanious_travel_time",
-            ]
-        ]
-        for link in self.W.LINKS:
-            for i in range(self.W.TSIZE):
-                out.append(
-                    [
-                        link.name,
-                        i * self.W.DELTAT,
-                        link.cum_arrival[i],
-                        link.cum_departure[i],
-                        link.traveltime_actual[i],
-                        link.traveltime_instant[i],
-                    ]
-                )
-        self.df_link_cumulative = pd.DataFrame(out[1:], columns=out[0])
+        t = np.arange(self.W.TSIZE) * self.W.DELTAT
+        links = self.W.LINKS
+        self.df_link_cumulative = pd.DataFrame(
+            {
+                "link": np.repeat([link.name for link in links], len(t)),
+                "t": np.tile(t, len(links)),
+                "arrival_count": np.concatenate(
+                    [link.arrival_count(t) for link in links]
+                ),
+                "departure_count": np.concatenate(
+                    [link.departure_count(t) for link in links]
+                ),
+                "actual_travel_time": np.concatenate(
+                    [link.actual_travel_time(t) for link in links]
+                ),
+                "instantanious_travel_time": np.concatenate(
+                    [link.instant_travel_time(t) for link in links]
+                ),
+            }
+        )
         return self.df_link_cumulative
 
     @catch_exceptions_and_warn()
-    def output_data(self, fname=None):
+    def output_data(self, fname=None, file_format="csv"):
         """
-        Save all results to CSV files
+        Save all results to CSV or Parquet files
+
+        Parameters
+        ----------
+        fname : str, optional
+            The prefix of the file names, default is "out<World name>/data". The tables are saved to "<fname>_basic.csv", "<fname>_od.csv", etc.
+        file_format : str, optional
+            "csv" or "parquet", default is "csv". Parquet files are written by pandas with pyarrow or fastparquet, and are much faster to write and read for large tables such as the vehicle logs.
         """
+        if file_format not in ("csv", "parquet"):
+            raise ValueError(f"Unknown file format: {file_format}")
         if fname == None:
             fname = f"out{self.W.name}/data"
-        self.basic_to_pandas().to_csv(fname + "_basic.csv", index=False)
-        self.od_to_pandas().to_csv(fname + "_od.csv", index=False)
-        self.mfd_to_pandas().to_csv(fname + "_mfd.csv", index=False)
-        self.link_to_pandas().to_csv(fname + "_link.csv", index=False)
-        self.link_traffic_state_to_pandas().to_csv(
-            fname + "_link_traffic_state.csv", index=False
-        )
-        self.vehicles_to_pandas().to_csv(fname + "_vehicles.csv", index=False)
+        tables = {
+            "basic": self.basic_to_pandas,
+            "od": self.od_to_pandas,
+            "mfd": self.mfd_to_pandas,
+            "link": self.link_to_pandas,
+            "link_traffic_state": self.link_traffic_state_to_pandas,
+            "vehicles": self.vehicles_to_pandas,
+        }
+        for name, to_pandas in tables.items():
+            df = to_pandas()
+            if file_format == "parquet":
+                df.to_parquet(f"{fname}_{name}.parquet", index=False)
+            else:
+                df.to_csv(f"{fname}_{name}.csv", index=False)
@@ -0,0 +1,499 @@
+"""
+CivilPy
+Copyright (C) 2019 - Dane Parks
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Performance benchmarks of the rail network simulator.
+Synthetic networks (grid, corridor with passing sidings, random planar) and the interlockings of the Streamlit visualizer are simulated, and the time of each stage and the peak memory are written to JSON so that runs can be compared across commits.
+
+Run from the command line with
+    python -m civilpy.transportation.rail_network_simulator.benchmark -o results.json
+"""
+
+import json, time, platform, subprocess, tracemalloc, argparse, os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import Delaunay
+
+from .rail_simulator import World
+from .interlockings import build_RO, build_AF, build_Slaters
+
+# exporters of the analyzer timed by `benchmark_scenario`
+EXPORTERS = (
+    "basic_to_pandas",
+    "od_to_pandas",
+    "mfd_to_pandas",
+    "link_to_pandas",
+    "link_traffic_state_to_pandas",
+    "link_cumulative_to_pandas",
+    "vehicles_to_pandas",
+    "vehicle_trip_to_pandas",
+)
+
+
+def _world(name, random_seed, tmax, kwargs):
+    params = dict(
+        name=name,
+        deltan=5,
+        tmax=tmax,
+        print_mode=0,
+        save_mode=0,
+        show_mode=0,
+        random_seed=random_seed,
+    )
+    params.update(kwargs)
+    return World(**params)
+
+
+def grid_network(size=5, demand=0.2, tmax=3600, random_seed=0, **kwargs):
+    """
+    Square grid of stations joined by one track in each direction.
+
+    Parameters
+    ----------
+    size : int, optional
+        The number of stations on each side, default is 5.
+    demand : float, optional
+        The flow (veh/s) of each OD pair, default is 0.2.
+    tmax : float, optional
+        The simulation duration, default is 3600 s. The demand lasts for the first half.
+    random_seed : int, optional
+        The random seed, default is 0.
+    **kwargs
+        Other parameters of `World`.
+
+    Returns
+    -------
+    World
+        The scenario, not simulated yet. The trips go from each station on the west edge to the opposite station on the east edge, and from the north edge to the south edge.
+    """
+    W = _world(f"grid{size}", random_seed, tmax, kwargs)
+    for i in range(size):
+        for j in range(size):
+            W.addNode(f"{i}_{j}", i, j)
+    for i in range(size):
+        for j in range(size):
+            for di, dj in ((1, 0), (0, 1)):
+                if i + di < size and j + dj < size:
+                    a, b = f"{i}_{j}", f"{i + di}_{j + dj}"
+                    W.addLink(f"{a}-{b}", a, b, length=1000, free_flow_speed=20)
+                    W.addLink(f"{b}-{a}", b, a, length=1000, free_flow_speed=20)
+    for k in range(size):
+        W.adddemand(f"0_{k}", f"{size - 1}_{k}", 0, tmax / 2, demand)
+        W.adddemand(f"{k}_{size - 1}", f"{k}_0", 0, tmax / 2, demand)
+    return W
+
+
+def corridor_network(n_stations=10, demand=0.2, tmax=3600, random_seed=0, **kwargs):
+    """
+    Double-track corridor with a passing siding on each track at every station.
+
+    Parameters
+    ----------
+    n_stations : int, optional
+        The number of stations, default is 10.
+    demand : float, optional
+        The flow (veh/s) of each OD pair, default is 0.2.
+    tmax : float, optional
+        The simulation duration, default is 3600 s. The demand lasts for the first half.
+    random_seed : int, optional
+        The random seed, default is 0.
+    **kwargs
+        Other parameters of `World`.
+
+    Returns
+    -------
+    World
+        The scenario, not simulated yet. The trips go from end to end in both directions, and from each station to the next but one.
+    """
+    W = _world(f"corridor{n_stations}", random_seed, tmax, kwargs)
+    # track 1 runs eastward, track 2 westward
+    for track, y in ((1, 1), (2, 0)):
+        for i in range(n_stations):
+            W.addNode(f"W{i}_{track}", 3 * i, y)
+            W.addNode(f"E{i}_{track}", 3 * i + 1, y)
+            W.addNode(f"Sd{i}_{track}", 3 * i + 0.5, 3 * y - 1)
+    for i in range(n_stations):
+        for a, b in ((f"W{i}_1", f"E{i}_1"), (f"E{i}_2", f"W{i}_2")):
+            track = a[-1]
+            W.addLink(f"{a}-{b}", a, b, length=500, free_flow_speed=20)
+            W.addLink(f"{a}-Sd{i}", a, f"Sd{i}_{track}", length=300, free_flow_speed=10)
+            W.addLink(f"Sd{i}-{b}", f"Sd{i}_{track}", b, length=300, free_flow_speed=10)
+        if i + 1 < n_stations:
+            W.addLink(
+                f"E{i}_1-W{i + 1}_1",
+                f"E{i}_1",
+                f"W{i + 1}_1",
+                length=3000,
+                free_flow_speed=30,
+            )
+            W.addLink(
+                f"W{i + 1}_2-E{i}_2",
+                f"W{i + 1}_2",
+                f"E{i}_2",
+                length=3000,
+                free_flow_speed=30,
+            )
+    last = n_stations - 1
+    W.adddemand("W0_1", f"E{last}_1", 0, tmax / 2, demand)
+    W.adddemand(f"E{last}_2", "W0_2", 0, tmax / 2, demand)
+    for i in range(n_stations - 2):
+        W.adddemand(f"W{i}_1", f"E{i + 2}_1", 0, tmax / 2, demand / 2)
+        W.adddemand(f"E{i + 2}_2", f"W{i}_2", 0, tmax / 2, demand / 2)
+    return W
+
+
+def random_planar_network(n_nodes=50, demand=0.1, tmax=3600, random_seed=0, **kwargs):
+    """
+    Random planar network given by the Delaunay triangulation of random stations.
+
+    Parameters
+    ----------
+    n_nodes : int, optional
+        The number of stations, default is 50.
+    demand : float, optional
+        The flow (veh/s) of each OD pair, default is 0.1.
+    tmax : float, optional
+        The simulation duration, default is 3600 s. The demand lasts for the first half.
+    random_seed : int, optional
+        The random seed of the layout, the demand and the simulation, default is 0.
+    **kwargs
+        Other parameters of `World`.
+
+    Returns
+    -------
+    World
+        The scenario, not simulated yet. The stations are uniformly distributed with a mean spacing of about 1 km, each edge of the triangulation is a track in both directions, and there are `n_nodes` random OD pairs.
+    """
+    rng = np.random.default_rng(random_seed)
+    xy = rng.uniform(0, np.sqrt(n_nodes) * 1000, size=(n_nodes, 2))
+    W = _world(f"planar{n_nodes}", random_seed, tmax, kwargs)
+    for i, (x, y) in enumerate(xy):
+        W.addNode(f"{i}", x, y)
+    edges = set()
+    for simplex in Delaunay(xy).simplices:
+        for k in range(3):
+            a, b = sorted((simplex[k], simplex[(k + 1) % 3]))
+            edges.add((a, b))
+    for a, b in sorted(edges):
+        length = float(np.hypot(*(xy[a] - xy[b])))
+        W.addLink(f"{a}-{b}", f"{a}", f"{b}", length=length, free_flow_speed=20)
+        W.addLink(f"{b}-{a}", f"{b}", f"{a}", length=length, free_flow_speed=20)
+    orig = rng.integers(n_nodes, size=n_nodes)
+    dest = (orig + rng.integers(1, n_nodes, size=n_nodes)) % n_nodes
+    W.adddemand_bulk(
+        orig.astype(str).tolist(), dest.astype(str).tolist(), 0, tmax / 2, demand
+    )
+    return W
+
+
+def interlocking_network(build, demand=0.05, tmax=1000, random_seed=0, **kwargs):
+    """
+    Interlocking of the Streamlit visualizer with trips between its ends.
+
+    Parameters
+    ----------
+    build : callable
+        `build_RO`, `build_AF` or `build_Slaters` of `interlockings`.
+    demand : float, optional
+        The flow (veh/s) of each OD pair, default is 0.05.
+    tmax : float, optional
+        The simulation duration, default is 1000 s. The demand lasts for the first half.
+    random_seed : int, optional
+        The random seed, default is 0.
+    **kwargs
+        Other parameters of `World`.
+
+    Returns
+    -------
+    World
+        The scenario, not simulated yet. There is a trip from every node without inbound links to every node without outbound links reachable from it.
+    """
+    params = dict(
+        tmax=tmax, print_mode=0, save_mode=0, show_mode=0, random_seed=random_seed
+    )
+    params.update(kwargs)
+    W = build(**params)
+    outlinks = {node: [] for node in W.NODES}
+    has_inlink = set()
+    for link in W.LINKS:
+        outlinks[link.start_node].append(link.end_node)
+        has_inlink.add(link.end_node)
+    for orig in W.NODES:
+        if orig in has_inlink:
+            continue
+        reached = {orig}
+        queue = deque([orig])
+        while queue:
+            for node in outlinks[queue.popleft()]:
+                if node not in reached:
+                    reached.add(node)
+                    queue.append(node)
+        for dest in W.NODES:
+            if dest in reached and not outlinks[dest]:
+                W.adddemand(orig, dest, 0, tmax / 2, demand)
+    return W
+
+
+# {name: (scenario builder, parameters)}
+SCENARIOS = {
+    "grid_small": (grid_network, dict(size=4)),
+    "grid_medium": (grid_network, dict(size=8)),
+    "grid_large": (grid_network, dict(size=12)),
+    "grid_medium_high_demand": (grid_network, dict(size=8, demand=0.5)),
+    "corridor_small": (corridor_network, dict(n_stations=5)),
+    "corridor_large": (corridor_network, dict(n_stations=20)),
+    "corridor_large_high_demand": (
+        corridor_network,
+        dict(n_stations=20, demand=0.5),
+    ),
+    "planar_small": (random_planar_network, dict(n_nodes=30)),
+    "planar_large": (random_planar_network, dict(n_nodes=150)),
+    "planar_large_high_demand": (random_planar_network, dict(n_nodes=150, demand=0.2)),
+    "RO": (interlocking_network, dict(build=build_RO)),
+    "AF": (interlocking_network, dict(build=build_AF)),
+    "Slaters": (interlocking_network, dict(build=build_Slaters)),
+}
+
+
+def _run_stages(builder, params):
+    timings = {}
+    t = time.perf_counter()
+
+    def lap(stage):
+        nonlocal t
+        t1 = time.perf_counter()
+        timings[stage] = t1 - t
+        t = t1
+
+    W = builder(**params)
+    lap("build")
+    W.finalize_scenario()
+    lap("finalize_scenario")
+    W.exec_simulation()
+    lap("exec_simulation")
+    W.analyzer.compute_edie_state()
+    lap("compute_edie_state")
+    for exporter in EXPORTERS:
+        getattr(W.analyzer, exporter)()
+        lap(exporter)
+    return W, timings
+
+
+def benchmark_scenario(name, builder, params=None, memory=True):
+    """
+    Build and simulate a scenario, and measure each stage.
+
+    Parameters
+    ----------
+    name : str
+        The name of the scenario in the results.
+    builder : callable
+        Returns the scenario World when called with `params`.
+    params : dict, optional
+        Keyword arguments for the builder, default is None (no arguments).
+    memory : bool, optional
+        Whether the peak memory is measured, default is True. It is measured by `tracemalloc` in a second run, so that the timing is not affected by tracing.
+
+    Returns
+    -------
+    dict
+        The scenario, its size (nodes, links, platoons, timesteps), the time (s) of each stage ("build", "finalize_scenario", "exec_simulation", "compute_edie_state" and each of `EXPORTERS`), the simulated timesteps per second, and the peak memory (bytes, None if not measured).
+    """
+    if params is None:
+        params = {}
+    W, timings = _run_stages(builder, params)
+    peak_memory = None
+    if memory:
+        tracemalloc.start()
+        try:
+            _run_stages(builder, params)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        "scenario": name,
+        "params": {
+            key: getattr(value, "__name__", value) for key, value in params.items()
+        },
+        "nodes": len(W.NODES),
+        "links": len(W.LINKS),
+        "platoons": len(W.VEHICLES),
+        "timesteps": W.TSIZE,
+        "time": timings,
+        "steps_per_second": W.TSIZE / timings["exec_simulation"],
+        "peak_memory": peak_memory,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scenarios=None, fname=None, memory=True, print_mode=0):
+    """
+    Benchmark scenarios and optionally save the results to JSON.
+
+    Parameters
+    ----------
+    scenarios : iterable of str, optional
+        Names of the scenarios in `SCENARIOS`. Default is None (all).
+    fname : str, optional
+        The JSON file to write the results to. Default is None (not saved).
+    memory : bool, optional
+        Whether the peak memory is measured. See `benchmark_scenario`.
+    print_mode : int, optional
+        Whether the result of each scenario is printed when it finishes, default is 0 (disabled).
+
+    Returns
+    -------
+    dict
+        {"environment": {"commit", "python", "numpy", "pandas", "platform", "timestamp"}, "results": [result of `benchmark_scenario` for each scenario]}
+    """
+    if scenarios is None:
+        scenarios = list(SCENARIOS)
+    out = {
+        "environment": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": [],
+    }
+    for name in scenarios:
+        builder, params = SCENARIOS[name]
+        result = benchmark_scenario(name, builder, params, memory)
+        out["results"].append(result)
+        if print_mode:
+            print(
+                f"{name:>28}| {result['steps_per_second']:>10.1f} steps/s| {result['time']['exec_simulation']:8.2f} s",
+                flush=True,
+            )
+    if fname is not None:
+        with open(fname, "w") as f:
+            json.dump(out, f, indent=2)
+    return out
+
+
+def results_to_pandas(results):
+    """
+    Flatten benchmark results to a DataFrame.
+
+    Parameters
+    ----------
+    results : dict or str
+        The output of `run_benchmarks`, or the JSON file it was saved to.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per scenario, with the columns "scenario", "nodes", "links", "platoons", "timesteps", "steps_per_second", "peak_memory" and "time_<stage>" for each stage.
+    """
+    if isinstance(results, str):
+        with open(results) as f:
+            results = json.load(f)
+    rows = []
+    for r in results["results"]:
+        row = {key: value for key, value in r.items() if key not in ("params", "time")}
+        row.update({f"time_{stage}": t for stage, t in r["time"].items()})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def compare_results(base, new):
+    """
+    Compare two benchmark runs, e.g., of two commits.
+
+    Parameters
+    ----------
+    base, new : dict or str
+        The outputs of `run_benchmarks`, or the JSON files they were saved to.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per scenario in both runs and per metric ("steps_per_second", "peak_memory" and "time_<stage>"), with the columns "scenario", "metric", "base", "new" and "ratio" (new / base).
+    """
+    df_base = results_to_pandas(base).set_index("scenario")
+    df_new = results_to_pandas(new).set_index("scenario")
+    metrics = [
+        c
+        for c in df_new.columns
+        if c in df_base.columns
+        and (c in ("steps_per_second", "peak_memory") or c.startswith("time_"))
+    ]
+    rows = []
+    for scenario in df_new.index.intersection(df_base.index):
+        for metric in metrics:
+            b, n = df_base.at[scenario, metric], df_new.at[scenario, metric]
+            ratio = n / b if pd.notna(b) and pd.notna(n) and b != 0 else np.nan
+            rows.append(
+                {
+                    "scenario": scenario,
+                    "metric": metric,
+                    "base": b,
+                    "new": n,
+                    "ratio": ratio,
+                }
+            )
+    return pd.DataFrame(rows, columns=["scenario", "metric", "base", "new", "ratio"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the rail network simulator."
+    )
+    parser.add_argument(
+        "-o", "--output", default="benchmark.json", help="JSON file of the results"
+    )
+    parser.add_argument(
+        "-s",
+        "--scenarios",
+        nargs="+",
+        choices=list(SCENARIOS),
+        help="scenarios to run (default: all)",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the peak memory measurement"
+    )
+    parser.add_argument("--compare", help="JSON file of a previous run to compare with")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.scenarios, args.output, memory=not args.no_memory, print_mode=1
+    )
+    if args.compare:
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(compare_results(args.compare, results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+CivilPy
+Copyright (C) 2019 - Dane Parks
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Ensemble runs of a rail network scenario.
+Each run builds and simulates its own `World` in a worker process, and only the reduced analyzer outputs are sent back.
+"""
+
+import random, itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import dill as pickle
+
+from .rail_simulator import World
+
+OUTPUTS = ("basic", "od", "link")
+
+# scenario of the worker process, set by `_init_worker`
+_worker_scenario = None
+
+
+def parameter_grid(param_grid=None):
+    """
+    Expand a parameter grid to the list of parameter sets.
+
+    Parameters
+    ----------
+    param_grid : dict or list of dict, optional
+        {name: list of values}, expanded to all the combinations of values, or a list of such dicts whose expansions are concatenated. Default is None, a single empty parameter set.
+
+    Returns
+    -------
+    list of dict
+        The parameter sets.
+    """
+    if param_grid is None:
+        return [{}]
+    if isinstance(param_grid, dict):
+        param_grid = [param_grid]
+    params = []
+    for grid in param_grid:
+        names = list(grid.keys())
+        for values in itertools.product(*[grid[name] for name in names]):
+            params.append(dict(zip(names, values)))
+    return params
+
+
+def build_scenario(scenario, params=None, random_seed=None):
+    """
+    Build a World of a scenario that has not been simulated yet.
+
+    Parameters
+    ----------
+    scenario : callable | World
+        The scenario builder or base World. See `run_ensemble`.
+    params : dict, optional
+        Keyword arguments for the scenario builder. Default is None (no parameters).
+    random_seed : int, optional
+        The random seed of the run.
+
+    Returns
+    -------
+    World
+
+    Notes
+    -----
+    A World is copied by `World.copy`, which pickles its nodes, links and vehicles with references by id, so that large networks can be copied and sent to worker processes.
+    """
+    if params is None:
+        params = {}
+    if isinstance(scenario, World):
+        if len(params):
+            raise ValueError(
+                "Parameters cannot be applied to a World. Use a scenario builder."
+            )
+        W = scenario.copy()
+        random.seed(random_seed)
+        np.random.seed(random_seed)
+        W.random_seed = random_seed
+    else:
+        W = scenario(random_seed=random_seed, **params)
+    return W
+
+
+def run_scenario(scenario, params=None, random_seed=None, outputs=OUTPUTS):
+    """
+    Simulate a scenario once and return its reduced outputs.
+
+    Parameters
+    ----------
+    scenario : callable | World
+        The scenario builder or base World. See `run_ensemble`.
+    params : dict, optional
+        Keyword arguments for the scenario builder. Default is None (no parameters).
+    random_seed : int, optional
+        The random seed of the run.
+    outputs : iterable of str, optional
+        Names of the outputs. See `run_ensemble`.
+
+    Returns
+    -------
+    dict
+        {output name: pd.DataFrame}
+    """
+    W = build_scenario(scenario, params, random_seed)
+    W.exec_simulation()
+    return {name: getattr(W.analyzer, f"{name}_to_pandas")() for name in outputs}
+
+
+def _init_worker(scenario_pickle):
+    global _worker_scenario
+    _worker_scenario = pickle.loads(scenario_pickle)
+
+
+def _run_worker(params, random_seed, outputs):
+    return run_scenario(_worker_scenario, params, random_seed, outputs)
+
+
+def run_ensemble(scenario, param_grid=None, seeds=1, processes=None, outputs=OUTPUTS):
+    """
+    Simulate a scenario for every combination of parameters and random seeds in a process pool.
+
+    Parameters
+    ----------
+    scenario : callable | World
+        The scenario builder, called as `scenario(random_seed=seed, **params)` in the worker process. It must return a World created with `random_seed=random_seed` that has not been simulated yet.
+        Alternatively, a World that has not been simulated yet. Each run simulates a copy of it (see `World.copy`) after seeding the random number generators with the seed of the run. Parameters cannot be used in this case.
+        The scenario is pickled with dill, so it can be a lambda or a locally defined function.
+    param_grid : dict or list of dict, optional
+        The parameters of the runs. See `parameter_grid`. Default is None (no parameters).
+    seeds : int or list of int, optional
+        The random seeds. Every parameter set is simulated once per seed. An int n means seeds 0, ..., n-1. Default is 1.
+    processes : int or None, optional
+        Number of worker processes. Default is None (the number of CPUs). If 1, the runs are executed one after another in this process.
+    outputs : iterable of str, optional
+        Names of the outputs, each of which is `Analyzer.<name>_to_pandas()` of the run. Default is ("basic", "od", "link").
+
+    Returns
+    -------
+    dict
+        {output name: pd.DataFrame}. Each DataFrame concatenates the output of all runs, with the columns "run" (run number), "random_seed", and one column per parameter prepended.
+
+    Notes
+    -----
+    The seed of each run is fixed by the run itself, not by the worker process that executes it, so the results do not depend on `processes`.
+
+    Examples
+    --------
+    >>> def build(random_seed, outage):
+    ...     W = World(name="", random_seed=random_seed, print_mode=0, save_mode=0)
+    ...     ...  # nodes, links, demand
+    ...     if outage:
+    ...         W.get_link("2_1").capacity_in = 0
+    ...     return W
+    >>> res = run_ensemble(build, {"outage": [False, True]}, seeds=20)
+    >>> res["basic"].groupby("outage")["average_travel_time"].mean()
+    """
+    if isinstance(seeds, int):
+        seeds = range(seeds)
+    runs = [(params, seed) for params in parameter_grid(param_grid) for seed in seeds]
+    for params, seed in runs:
+        if "random_seed" in params:
+            raise ValueError("Use `seeds` to specify the random seeds.")
+    outputs = tuple(outputs)
+
+    if processes == 1:
+        results = [
+            run_scenario(scenario, params, seed, outputs) for params, seed in runs
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(pickle.dumps(scenario),),
+        ) as executor:
+            results = list(
+                executor.map(
+                    _run_worker,
+                    [params for params, seed in runs],
+                    [seed for params, seed in runs],
+                    [outputs] * len(runs),
+                )
+            )
+
+    combined = {}
+    for name in outputs:
+        dfs = []
+        for i, ((params, seed), result) in enumerate(zip(runs, results)):
+            df = result[name]
+            meta = {"run": i, "random_seed": seed, **params}
+            for col, value in reversed(list(meta.items())):
+                df.insert(0, col, [value] * len(df))
+            dfs.append(df)
+        combined[name] = pd.concat(dfs, ignore_index=True)
+    return combined
@@ -0,0 +1,498 @@
+"""
+CivilPy
+Copyright (C) 2019 - Dane Parks
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Dynamic user equilibrium (DUE) and dynamic system optimum (DSO) route assignment.
+A scenario is simulated repeatedly with the route of every vehicle fixed through `Vehicle.links_prefer`, and the routes are updated between the runs by the method of successive averages (MSA).
+"""
+
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .rail_simulator import Route
+from .ensemble import build_scenario
+
+PRINCIPLES = ("DUE", "DSO")
+
+# network of the worker process, set by `_init_route_worker`
+_worker_network = None
+
+
+def link_externality(W, tt):
+    """
+    Approximate the externality of entering each link on each timestep.
+
+    Parameters
+    ----------
+    W : World
+        The simulated World.
+    tt : numpy.ndarray
+        The actual travel times of the links, of shape (number of links, `TSIZE`). See `Link.traveltime_actual`.
+
+    Returns
+    -------
+    numpy.ndarray
+        The externalities in seconds, of the same shape as `tt`.
+
+    Notes
+    -----
+    A vehicle entering a congested link delays every vehicle that enters after it until the congestion clears by the headway at capacity, and there are capacity times the remaining duration of such vehicles. The externality is therefore the time from entering until the end of the congested period, and 0 on an uncongested link (Ghali and Smith, 1995).
+    A timestep is congested if the travel time exceeds the free flow travel time by more than `DELTAT`.
+    """
+    free = np.array([l.length / l.u for l in W.LINKS])[:, np.newaxis]
+    steps = np.arange(tt.shape[1])
+    congested = tt > free + W.DELTAT
+    # first uncongested timestep on or after each timestep
+    clear = np.where(congested, tt.shape[1], steps)
+    clear = np.minimum.accumulate(clear[:, ::-1], axis=1)[:, ::-1]
+    return (clear - steps) * W.DELTAT
+
+
+def route_cost(route, t, tt, cost, dt):
+    """
+    Cost of a route for a vehicle that departs at time t.
+
+    Parameters
+    ----------
+    route : tuple of int
+        The link ids of the route.
+    t : float
+        The departure time in seconds.
+    tt : numpy.ndarray
+        The travel time of entering each link on each timestep, of shape (number of links, number of timesteps).
+    cost : numpy.ndarray
+        The cost of entering each link on each timestep, of the same shape as `tt`.
+    dt : float
+        The timestep width in seconds.
+
+    Returns
+    -------
+    float
+        The sum of the link costs on the times the vehicle enters the links. If `cost` is `tt`, this is `Route.actual_travel_time(t)`.
+    """
+    c = 0
+    last = tt.shape[1] - 1
+    for l in route:
+        step = min(max(int(t // dt), 0), last)
+        c += cost[l, step]
+        t += tt[l, step]
+    return c
+
+
+def time_dependent_shortest_routes(network, orig, t, tt, cost):
+    """
+    Least cost routes from a node for a vehicle that departs at time t.
+
+    Parameters
+    ----------
+    network : dict
+        The network from `route_network`.
+    orig : int
+        The origin node id.
+    t : float
+        The departure time in seconds.
+    tt, cost : numpy.ndarray
+        The travel time and cost of entering each link on each timestep. See `route_cost`.
+
+    Returns
+    -------
+    numpy.ndarray
+        The last link of the least cost route to each node, -1 if the node is the origin or unreachable.
+
+    Notes
+    -----
+    The labels are the costs, and the time a node is reached is that of its label. If the cost is the travel time, the link travel times are FIFO and the routes are the time-dependent shortest paths. Otherwise, this is a heuristic.
+    """
+    dt = network["dt"]
+    last = tt.shape[1] - 1
+    best = np.full(network["n_nodes"], np.inf)
+    arrival = np.zeros(network["n_nodes"])
+    pred = np.full(network["n_nodes"], -1)
+    best[orig] = 0
+    arrival[orig] = t
+    heap = [(0.0, orig)]
+    while heap:
+        c, n = heapq.heappop(heap)
+        if c > best[n]:
+            continue
+        step = min(max(int(arrival[n] // dt), 0), last)
+        for l, m in network["out_links"][n]:
+            c_m = c + cost[l, step]
+            if c_m < best[m]:
+                best[m] = c_m
+                arrival[m] = arrival[n] + tt[l, step]
+                pred[m] = l
+                heapq.heappush(heap, (c_m, m))
+    return pred
+
+
+def _route_to(network, pred, orig, dest):
+    route = []
+    n = dest
+    while n != orig:
+        l = pred[n]
+        if l < 0:
+            return None
+        route.append(int(l))
+        n = network["link_start"][l]
+    return tuple(route[::-1])
+
+
+def update_routes(network, tasks, tt, cost):
+    """
+    Find the least cost routes of the vehicles of some origins and extend their route sets.
+
+    Parameters
+    ----------
+    network : dict
+        The network from `route_network`.
+    tasks : list of tuple
+        (orig, dests, departure times, current route indices, {dest: list of routes}) per origin. The arrays have one element per vehicle of the origin, and a route index of -1 means no route.
+    tt, cost : numpy.ndarray
+        The travel time and cost of entering each link on each timestep. See `route_cost`.
+
+    Returns
+    -------
+    list of tuple
+        (route sets, current costs, best route indices, best costs) per task. The route sets are extended with the least cost routes from the origin on the start of each `network["bucket"]` seconds. The costs are NaN for vehicles without a route.
+    """
+    dt, bucket = network["dt"], network["bucket"]
+    results = []
+    for orig, dests, times, current, routes in tasks:
+        routes = {d: list(r) for d, r in routes.items()}
+        for b in np.unique(times // bucket):
+            pred = time_dependent_shortest_routes(network, orig, b * bucket, tt, cost)
+            for d in np.unique(dests[times // bucket == b]):
+                route = _route_to(network, pred, orig, d)
+                if route is not None and route not in routes[d]:
+                    routes[d].append(route)
+
+        costs = {}
+        current_cost = np.full(len(dests), np.nan)
+        best = np.full(len(dests), -1)
+        best_cost = np.full(len(dests), np.nan)
+        for i, (d, t, k) in enumerate(zip(dests, times, current)):
+            if len(routes[d]) == 0:
+                continue
+            if (d, t) not in costs:
+                costs[d, t] = [route_cost(r, t, tt, cost, dt) for r in routes[d]]
+            c = costs[d, t]
+            best[i] = int(np.argmin(c))
+            best_cost[i] = c[best[i]]
+            if k >= 0:
+                current_cost[i] = c[k]
+        results.append((routes, current_cost, best, best_cost))
+    return results
+
+
+def route_network(W, bucket):
+    """
+    Compact description of the network of a World for the route search.
+
+    Parameters
+    ----------
+    W : World
+        The World.
+    bucket : float
+        The interval of the departure times of the route search in seconds.
+
+    Returns
+    -------
+    dict
+        The number of nodes "n_nodes", the start node of each link "link_start", the open outgoing (link id, end node id) of each node "out_links", the timestep width "dt" and "bucket". Links with `capacity_in` of 0 are closed.
+    """
+    out_links = [[] for n in W.NODES]
+    for l in W.LINKS:
+        if l.capacity_in != 0:
+            out_links[l.start_node.id].append((l.id, l.end_node.id))
+    return {
+        "n_nodes": len(W.NODES),
+        "link_start": np.array([l.start_node.id for l in W.LINKS], dtype=int),
+        "out_links": out_links,
+        "dt": W.DELTAT,
+        "bucket": bucket,
+    }
+
+
+def _init_route_worker(network):
+    global _worker_network
+    _worker_network = network
+
+
+def _route_worker(tasks, tt, cost):
+    return update_routes(_worker_network, tasks, tt, cost)
+
+
+class EquilibriumSolver:
+    """
+    Solver of the dynamic user equilibrium (DUE) or dynamic system optimum (DSO) route assignment of a scenario.
+    """
+
+    def __init__(
+        self,
+        scenario,
+        principle="DUE",
+        random_seed=0,
+        bucket=None,
+        processes=1,
+        print_mode=1,
+    ):
+        """
+        Create a solver.
+
+        Parameters
+        ----------
+        scenario : callable | World
+            The scenario builder or a World that has not been simulated yet, as in `run_ensemble`. Every iteration simulates a new World of the scenario with the same random seed, so the vehicles must be the same in every build.
+        principle : str, optional
+            "DUE": every vehicle takes a route with the least actual travel time for its departure time.
+            "DSO": every vehicle takes a route with the least marginal travel time, which adds the externality of `link_externality` to the actual travel time. This minimizes the total travel time approximately.
+            Default is "DUE".
+        random_seed : int, optional
+            The random seed of the simulations and the route swaps. Default is 0.
+        bucket : float, optional
+            The interval of the departure times, in seconds, for which new routes are searched. Default is None, `DUO_UPDATE_TIME` of the scenario.
+        processes : int, optional
+            Number of worker processes of the route update, which is split by origin. Default is 1 (in this process).
+        print_mode : bool, optional
+            Whether to print the progress of each iteration. Default is 1.
+
+        Attributes
+        ----------
+        W : World
+            The World of the last iteration.
+        routes : dict
+            {(orig id, dest id): list of routes}, the route set of each OD pair. A route is a tuple of link ids. The route sets only grow, so a route keeps its index.
+        assignment : numpy.ndarray
+            The index of the route of each vehicle (in the order of `W.VEHICLES`) in the route set of its OD pair, -1 if the destination is unreachable.
+        history : pd.DataFrame
+            One row per iteration. See `solve`.
+        """
+        if principle not in PRINCIPLES:
+            raise ValueError(f"Unknown principle: {principle}")
+        self.scenario = scenario
+        self.principle = principle
+        self.random_seed = random_seed
+        self.bucket = bucket
+        self.processes = processes
+        self.print_mode = print_mode
+
+        self.W = None
+        self.routes = {}
+        self.assignment = None
+        self.history = pd.DataFrame()
+
+    def build(self):
+        """
+        Build a World of the scenario with the current route assignment.
+
+        Returns
+        -------
+        World
+            The World, finalized but not simulated. The `links_prefer` of each vehicle with a route is the links of the route, and its `links_avoid` is cleared, so the route overrides the link preferences of the scenario.
+        """
+        W = build_scenario(self.scenario, random_seed=self.random_seed)
+        W.finalize_scenario()
+        if self.assignment is not None:
+            names = list(W.VEHICLES)
+            if names != self.vehicle_names:
+                raise ValueError(
+                    "The vehicles of the scenario changed between iterations. The scenario must build the same vehicles for the same random seed."
+                )
+            for veh, od, k in zip(W.VEHICLES.values(), self.ods, self.assignment):
+                if k >= 0:
+                    veh.links_prefer = [W.LINKS[l] for l in self.routes[od][k]]
+                    veh.links_avoid = []
+        return W
+
+    def route_update(self, executor, tt, cost):
+        """
+        Extend the route sets with the least cost routes and find the least cost route of every vehicle.
+
+        Parameters
+        ----------
+        executor : ProcessPoolExecutor or None
+            The worker processes, or None to update in this process.
+        tt, cost : numpy.ndarray
+            The travel time and cost of entering each link on each timestep. See `route_cost`.
+
+        Returns
+        -------
+        current_cost, best, best_cost : numpy.ndarray
+            The cost of the current route, the index of the least cost route and its cost of each vehicle.
+        """
+        n = len(self.ods)
+        current = np.full(n, -1) if self.assignment is None else self.assignment
+        origs = np.array([o for o, d in self.ods], dtype=int)
+        dests = np.array([d for o, d in self.ods], dtype=int)
+        tasks, members = [], []
+        for o in np.unique(origs):
+            i = np.flatnonzero(origs == o)
+            routes = {d: self.routes[o, d] for d in np.unique(dests[i])}
+            tasks.append((o, dests[i], self.departure_times[i], current[i], routes))
+            members.append(i)
+
+        if executor is None:
+            results = update_routes(self.network, tasks, tt, cost)
+        else:
+            chunks = np.array_split(np.arange(len(tasks)), self.processes)
+            futures = [
+                executor.submit(_route_worker, [tasks[k] for k in chunk], tt, cost)
+                for chunk in chunks
+                if len(chunk)
+            ]
+            results = [r for f in futures for r in f.result()]
+
+        current_cost = np.full(n, np.nan)
+        best = np.full(n, -1)
+        best_cost = np.full(n, np.nan)
+        for (o, *_), i, (routes, c, b, bc) in zip(tasks, members, results):
+            for d, r in routes.items():
+                self.routes[o, d] = r
+            current_cost[i], best[i], best_cost[i] = c, b, bc
+        return current_cost, best, best_cost
+
+    def solve(self, max_iter=20, gap=0.0):
+        """
+        Solve the route assignment by the method of successive averages.
+
+        Parameters
+        ----------
+        max_iter : int, optional
+            The maximum number of simulations. Default is 20.
+        gap : float, optional
+            The relative gap at which the iterations stop. Default is 0.0 (run all the iterations).
+
+        Returns
+        -------
+        World
+            The World of the last iteration. It is also `self.W`.
+
+        Notes
+        -----
+        The routes start from the least cost routes under free flow. After each simulation, the link travel time profiles of that simulation (`Link.traveltime_actual`) are used to search the least cost routes on each departure time bucket, which are added to the route sets, and to evaluate the routes of every vehicle. At iteration n (from 0), each vehicle whose route is not the least cost one switches to it with probability 1/(n+2), and the next simulation is warm started from these routes.
+
+        `history` has one row per iteration, with the columns:
+        "iteration", "total_travel_time" and "average_travel_time" of the completed trips (see `Analyzer.basic_analysis`), "trip_completed", "relative_gap" (sum over the vehicles of the cost of the current route minus the least cost, divided by the sum of the costs of the current routes), "average_excess_cost" (the same sum per vehicle, in seconds), "n_switched" (vehicles that switch after the iteration) and "n_routes" (routes in all the route sets).
+
+        Examples
+        --------
+        >>> solver = EquilibriumSolver(build, principle="DUE", processes=4)
+        >>> W = solver.solve(max_iter=30, gap=0.01)
+        >>> solver.history.plot(x="iteration", y="relative_gap", logy=True)
+        """
+        rng = np.random.default_rng(self.random_seed)
+        W = self.build()
+        self.vehicle_names = list(W.VEHICLES)
+        self.ods = [(veh.orig.id, veh.dest.id) for veh in W.VEHICLES.values()]
+        self.departure_times = np.array(
+            [veh.departure_time * W.DELTAT for veh in W.VEHICLES.values()],
+            dtype=float,
+        )
+        self.routes = {od: [] for od in set(self.ods)}
+        bucket = W.DUO_UPDATE_TIME if self.bucket is None else self.bucket
+        self.network = route_network(W, bucket)
+
+        executor = None
+        if self.processes != 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                initializer=_init_route_worker,
+                initargs=(self.network,),
+            )
+        try:
+            # initial routes under free flow
+            free = np.array([l.length / l.u for l in W.LINKS])
+            tt = np.repeat(free[:, np.newaxis], W.TSIZE, axis=1)
+            current_cost, best, best_cost = self.route_update(executor, tt, tt)
+            self.assignment = best
+
+            rows = []
+            for n in range(max_iter):
+                if n:
+                    W = self.build()
+                W.exec_simulation()
+                W.analyzer.basic_analysis()
+                self.W = W
+
+                tt = np.array([l.traveltime_actual for l in W.LINKS])
+                if self.principle == "DSO":
+                    cost = tt + link_externality(W, tt)
+                else:
+                    cost = tt
+                current_cost, best, best_cost = self.route_update(executor, tt, cost)
+
+                assigned = self.assignment >= 0
+                excess = np.sum(current_cost[assigned] - best_cost[assigned])
+                total = np.sum(current_cost[assigned])
+                switch = (
+                    assigned
+                    & (best != self.assignment)
+                    & (best_cost < current_cost)
+                    & (rng.random(len(best)) < 1 / (n + 2))
+                )
+                row = {
+                    "iteration": n,
+                    "total_travel_time": W.analyzer.total_travel_time,
+                    "average_travel_time": W.analyzer.average_travel_time,
+                    "trip_completed": W.analyzer.trip_completed,
+                    "relative_gap": excess / total if total > 0 else 0.0,
+                    "average_excess_cost": excess / max(np.sum(assigned), 1),
+                    "n_switched": int(np.sum(switch)),
+                    "n_routes": sum(len(r) for r in self.routes.values()),
+                }
+                rows.append(row)
+                if self.print_mode:
+                    print(
+                        f"iteration {n}: relative gap {row['relative_gap']:.4f}, average travel time {row['average_travel_time']:.1f} s, {row['n_switched']} vehicles switch"
+                    )
+                if row["relative_gap"] <= gap:
+                    break
+                if n < max_iter - 1:
+                    self.assignment = np.where(switch, best, self.assignment)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.history = pd.DataFrame(rows)
+        return self.W
+
+    def route(self, veh):
+        """
+        The route assigned to a vehicle.
+
+        Parameters
+        ----------
+        veh : str | Vehicle
+            The name or object of the vehicle.
+
+        Returns
+        -------
+        Route or None
+            The route in the World of the last iteration, or None if the vehicle has no route.
+        """
+        if not isinstance(veh, str):
+            veh = veh.name
+        i = self.vehicle_names.index(veh)
+        k = self.assignment[i]
+        if k < 0:
+            return None
+        links = [self.W.LINKS[l] for l in self.routes[self.ods[i]][k]]
+        return Route(self.W, links, trust_input=True)
@@ -0,0 +1,568 @@
+"""
+CivilPy
+Copyright (C) 2019 - Dane Parks
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Track layouts of the RO, AF and Slaters Lane interlockings, shown by the Streamlit outage visualizer (`streamlit.py`).
+"""
+
+from .rail_simulator import World
+
+
+def build_RO(**kwargs):
+    """
+    RO interlocking (CFP 110.1, Sta. 325+00) between L'Enfant and Slaters Lane.
+
+    Parameters
+    ----------
+    **kwargs
+        Parameters of `World`, overriding the defaults of the visualizer.
+
+    Returns
+    -------
+    World
+        The World with the nodes and links of the interlocking. It has no demand.
+    """
+    params = dict(
+        name="RO",
+        deltan=1,
+        tmax=1000,
+        print_mode=1,
+        save_mode=0,
+        show_mode=1,
+        random_seed=0,
+    )
+    params.update(kwargs)
+    RO = World(**params)
+
+    # Define Southern (Low MP) Origins
+    RO.addNode("Main 0", 30, 8, label_color="white", voffset=0.4)  # 0
+    RO.addNode("Main 1", 30, 6, label_color="white", voffset=0.4)  # 1
+    RO.addNode("Main 2", 30, 4, label_color="white", voffset=0.4)  # 2
+    RO.addNode("Main 3", 30, 2, label_color="white", voffset=0.4)  # 3
+
+    # Define Northern (High MP) Origins
+    RO.addNode("Existing 2", 0, 8, label_color="white", voffset=0.4)  # 4
+    RO.addNode("Existing 3", 0, 6, label_color="white", voffset=0.4)  # 5
+    RO.addNode("Proposed_2_org", 6, 4)  # 6
+    RO.addNode("Proposed_3_org", 10, 2)  # 7
+
+    # Define Switch Points
+    RO.addNode("1_S", 10, 8)  # 8
+    RO.addNode("3_S", 12, 6)  # 9
+    RO.addNode("5_S", 16, 6)  # 10
+    RO.addNode("7_S", 18, 8)  # 11
+    RO.addNode("9_S", 4, 6)  # 12
+    RO.addNode("11_S", 20, 6)  # 13
+    RO.addNode("13_S", 22, 4)  # 14
+    RO.addNode("15_S", 8, 4)  # 15
+
+    # Define Links
+    RO.addLink("Ex 2", "Existing 2", "1_S", length=20)  # 0
+    RO.addLink("0_1", "1_S", "7_S", length=20)  # 1
+    RO.addLink("Main 0", "7_S", "Main 0", length=20)  # 2
+    RO.addLink("Ex 3", "Existing 3", "9_S", length=20)  # 3
+    RO.addLink("1_1", "9_S", "3_S", length=20)  # 4
+    RO.addLink("1_2", "3_S", "5_S", length=20)  # 5
+    RO.addLink("1_3", "5_S", "11_S", length=20)  # 6
+    RO.addLink("Main 1", "11_S", "Main 1", length=20)  # 7
+    RO.addLink("9_S", "9_S", "Proposed_2_org", length=20)  # 8
+    RO.addLink("2_1", "Proposed_2_org", "15_S", length=20)  # 9
+    RO.addLink("2_2", "15_S", "13_S", length=20)  # 10
+    RO.addLink("Main 2", "13_S", "Main 2", length=20)  # 11
+    RO.addLink("15_S", "15_S", "Proposed_3_org", length=20)  # 12
+    RO.addLink("Main 3", "Proposed_3_org", "Main 3", length=20)  # 13
+
+    # Define X-Overs
+    RO.addLink("1-3", "1_S", "3_S", length=20)  # 14
+    RO.addLink("5-7", "5_S", "7_S", length=20)  # 15
+    RO.addLink("11-13", "11_S", "13_S", length=20)  # 16
+
+    return RO
+
+
+def build_AF(**kwargs):
+    """
+    AF interlocking (CFP 104.3, Sta. 25+00) between Slaters Lane and Franconia, with the NS yard and the setoff track.
+
+    Parameters
+    ----------
+    **kwargs
+        Parameters of `World`, overriding the defaults of the visualizer.
+
+    Returns
+    -------
+    World
+        The World with the nodes and links of the interlocking. It has no demand.
+    """
+    params = dict(
+        name="AF-RO",
+        deltan=1,
+        tmax=1000,
+        print_mode=1,
+        save_mode=0,
+        show_mode=1,
+        random_seed=0,
+    )
+    params.update(kwargs)
+    AF = World(**params)
+
+    # Define Southern (Low MP) Origins
+    AF.addNode(
+        "NS Horn Track 1", 30, 1, label_color="white", voffset=0.4, hoffset=1
+    )  # 0
+    AF.addNode("y1e", 24, 1)  # 1
+    AF.addNode(
+        "NS Horn Track 2", 30, 3.5, label_color="white", voffset=0.4, hoffset=1
+    )  # 2
+    AF.addNode(
+        "NS Horn Track 3", 30, 6, label_color="white", voffset=0.4, hoffset=1
+    )  # 3
+    AF.addNode("Ex Main 3", 30, 8, label_color="white", voffset=0.4, hoffset=0.5)  # 4
+    AF.addNode("Ex Main 2", 30, 10, label_color="white", voffset=0.4, hoffset=0.5)  # 5
+    AF.addNode("Ex Main 1", 30, 12, label_color="white", voffset=0.4, hoffset=0.5)  # 6
+    AF.addNode("NS_org", 16, 14)  # 7
+    AF.addNode("NS_yard", 30, 14, label_color="white", voffset=0.4, hoffset=0.25)  # 8
+    AF.addNode("Setoff_org", 8, 14)  # 9
+    AF.addNode("Setoff Track", 1, 14, label_color="white", voffset=0.4, hoffset=1)  # 10
+
+    # Define Switches
+    AF.addNode("1_S", 26.5, 3.5)  # 11
+    AF.addNode("3_S", 24, 6)  # 12
+    AF.addNode("5_S", 22, 6)  # 13
+    AF.addNode("6_S", 19, 6)  # 14
+    AF.addNode("7_S", 20, 8)  # 15
+    AF.addNode("9_S", 20, 10)  # 16
+    AF.addNode("11_S", 18, 12)  # 17
+    AF.addNode("13_S", 18, 8)  # 18
+    AF.addNode("19_S", 16, 10)  # 19
+    AF.addNode("21_S", 15, 10)  # 20
+    AF.addNode("23_S", 13, 8)  # 21
+    AF.addNode("25_S", 14, 10)  # 22
+    AF.addNode("27_S", 14, 12)  # 23
+    AF.addNode("29_S", 12, 12)  # 24
+    AF.addNode("31_S", 11, 12)  # 25
+    AF.addNode("33_S", 9, 10)  # 26
+    AF.addNode("35_S", 10, 12)  # 27
+    AF.addNode("37_S", 8, 10)  # 28
+    AF.addNode("39_S", 6, 12)  # 29
+    AF.addNode("41_S", 10, 8)  # 30
+    AF.addNode("43_S", 8, 6)  # 31
+    AF.addNode("45_S", 7, 10)  # 32
+    AF.addNode("47_S", 5, 8)  # 33
+
+    # Add Destinations
+    AF.addNode("Main 0", 0, 12, label_color="white", voffset=0.4)  # 34
+    AF.addNode("Main 1", 0, 10, label_color="white", voffset=0.4)  # 35
+    AF.addNode("Main 2", 0, 8, label_color="white", voffset=0.4)  # 36
+    AF.addNode("Main 3", 0, 6, label_color="white", voffset=0.4)  # 37
+
+    # Define links between Values
+    # Crossovers
+    AF.addLink(
+        "1-3X", "1_S", "3_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 0
+    AF.addLink(
+        "5-7X", "5_S", "7_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 1
+    AF.addLink(
+        "9-11X", "9_S", "11_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 2
+    AF.addLink(
+        "13-19X", "13_S", "19_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 3
+    AF.addLink(
+        "21-23X", "21_S", "23_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 4
+    AF.addLink(
+        "25-29X", "25_S", "29_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 5
+    AF.addLink(
+        "31-33X", "31_S", "33_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 6
+    AF.addLink(
+        "37-39X", "37_S", "39_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 7
+    AF.addLink(
+        "41-43X", "41_S", "43_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 8
+    AF.addLink(
+        "45-47X", "45_S", "47_S", length=50, free_flow_speed=30, number_of_lanes=1
+    )  # 9
+
+    # Yard Segments
+    AF.addLink(
+        "yard1",
+        "NS Horn Track 1",
+        "y1e",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 10
+    AF.addLink(
+        "y1_2",
+        "y1e",
+        "6_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 11
+    AF.addLink(
+        "yard2",
+        "NS Horn Track 2",
+        "1_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 12
+    AF.addLink(
+        "NS",
+        "NS_org",
+        "27_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 13
+    AF.addLink(
+        "NS Yard",
+        "NS_yard",
+        "NS_org",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 14
+    AF.addLink(
+        "Setoff_Track",
+        "Setoff Track",
+        "Setoff_org",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 15
+    AF.addLink(
+        "Setoff Track",
+        "35_S",
+        "Setoff_org",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 16
+
+    # Main 0 Segments
+    AF.addLink(
+        "0_0",
+        "Ex Main 1",
+        "11_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 17
+    AF.addLink(
+        "0_1",
+        "11_S",
+        "27_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 18
+    AF.addLink(
+        "0_2", "27_S", "29_S", length=50, free_flow_speed=50, number_of_lanes=1
+    )  # 19
+    AF.addLink(
+        "0_3", "29_S", "31_S", length=50, free_flow_speed=50, number_of_lanes=1
+    )  # 20
+    AF.addLink(
+        "0_4", "31_S", "35_S", length=50, free_flow_speed=50, number_of_lanes=1
+    )  # 21
+    AF.addLink(
+        "0_5", "35_S", "39_S", length=50, free_flow_speed=50, number_of_lanes=1
+    )  # 22
+    AF.addLink(
+        "0_6", "39_S", "Main 0", length=50, free_flow_speed=50, number_of_lanes=1
+    )  # 23
+
+    # Main 1 Segments
+    AF.addLink(
+        "1_0",
+        "Ex Main 2",
+        "9_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 24
+    AF.addLink(
+        "1_1",
+        "9_S",
+        "19_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 25
+    AF.addLink(
+        "1_2",
+        "19_S",
+        "21_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 26
+    AF.addLink(
+        "1_3",
+        "21_S",
+        "25_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 27
+    AF.addLink(
+        "1_4",
+        "25_S",
+        "33_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 28
+    AF.addLink(
+        "1_5",
+        "33_S",
+        "37_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 29
+    AF.addLink(
+        "1_6",
+        "37_S",
+        "45_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 30
+    AF.addLink(
+        "1_7",
+        "45_S",
+        "Main 1",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 31
+
+    # Main 2 Segments
+    AF.addLink(
+        "2_0",
+        "Ex Main 3",
+        "7_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 32
+    AF.addLink(
+        "2_1",
+        "7_S",
+        "13_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 33
+    AF.addLink(
+        "2_2",
+        "13_S",
+        "23_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 34
+    AF.addLink(
+        "2_3",
+        "23_S",
+        "41_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 35
+    AF.addLink(
+        "2_4",
+        "41_S",
+        "47_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 36
+    AF.addLink(
+        "2_5",
+        "47_S",
+        "Main 2",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 37
+
+    # Main 3 Segments
+    AF.addLink(
+        "3_0",
+        "NS Horn Track 3",
+        "3_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 38
+    AF.addLink(
+        "3_1",
+        "3_S",
+        "5_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 39
+    AF.addLink(
+        "3_2",
+        "5_S",
+        "6_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 40
+    AF.addLink(
+        "3_3",
+        "6_S",
+        "43_S",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 41
+    AF.addLink(
+        "3_4",
+        "43_S",
+        "Main 3",
+        length=50,
+        free_flow_speed=50,
+        number_of_lanes=1,
+        merge_priority=0.1,
+    )  # 42
+
+    return AF
+
+
+def build_Slaters(**kwargs):
+    """
+    Slaters Lane interlocking (CFP 106.3, Sta. 130+00) between RO and AF.
+
+    Parameters
+    ----------
+    **kwargs
+        Parameters of `World`, overriding the defaults of the visualizer.
+
+    Returns
+    -------
+    World
+        The World with the nodes and links of the interlocking. It has no demand.
+    """
+    params = dict(
+        name="Slaters",
+        deltan=1,
+        tmax=1000,
+        print_mode=1,
+        save_mode=0,
+        show_mode=1,
+        random_seed=0,
+    )
+    params.update(kwargs)
+    Slaters = World(**params)
+
+    # Define Southern (Low MP) Origins
+    Slaters.addNode("RO-Slaters Main 0", 0, 8, label_color="white", voffset=0.4)  # 0
+    Slaters.addNode("RO-Slaters Main 1", 0, 6, label_color="white", voffset=0.4)  # 1
+    Slaters.addNode("RO-Slaters Main 2", 0, 4, label_color="white", voffset=0.4)  # 2
+    Slaters.addNode("RO-Slaters Main 3", 0, 2, label_color="white", voffset=0.4)  # 3
+
+    # Define Northern (High MP) Origins
+    Slaters.addNode(
+        "OOS_NS", 28.5, 10, label_color="white", voffset=0.4, hoffset=-0.5
+    )  # 4
+    Slaters.addNode("Slaters-AF Main 0", 30, 8, label_color="white", voffset=0.4)  # 5
+    Slaters.addNode("Slaters-AF Main 1", 30, 6, label_color="white", voffset=0.4)  # 6
+    Slaters.addNode("Slaters-AF Main 2", 30, 4, label_color="white", voffset=0.4)  # 7
+    Slaters.addNode("Slaters-AF Main 3", 30, 2, label_color="white", voffset=0.4)  # 8
+
+    # Define Switch Points
+    Slaters.addNode("NS_OOS", 24, 10)  # 9
+    Slaters.addNode("3_S", 22, 8)  # 10
+    Slaters.addNode("5_S", 24, 2)  # 11
+    Slaters.addNode("7_S", 22, 4)  # 12
+    Slaters.addNode("9_S", 15, 4)  # 13
+    Slaters.addNode("11_S", 13, 6)  # 14
+    Slaters.addNode("13_S", 20, 6)  # 15
+    Slaters.addNode("15_S", 18, 8)  # 16
+    Slaters.addNode("17_S", 8, 8)  # 17
+    Slaters.addNode("19_S", 6, 6)  # 18
+    Slaters.addNode("21_S", 8, 4)  # 19
+    Slaters.addNode("23_S", 6, 2)  # 20
+
+    # Track Segments
+    Slaters.addLink("PepCo  Lead", "OOS_NS", "NS_OOS", length=50)  # 0
+    Slaters.addLink("3_S", "NS_OOS", "3_S", length=50)  # 1
+    Slaters.addLink("0_0", "Slaters-AF Main 0", "3_S", length=50)  # 2
+    Slaters.addLink("0_1", "3_S", "15_S", length=50)  # 3
+    Slaters.addLink("0_2", "15_S", "17_S", length=50)  # 4
+    Slaters.addLink("0_3", "17_S", "RO-Slaters Main 0", length=50)  # 5
+    Slaters.addLink("1_0", "Slaters-AF Main 1", "13_S", length=50)  # 6
+    Slaters.addLink("1_1", "13_S", "11_S", length=50)  # 7
+    Slaters.addLink("1_2", "11_S", "19_S", length=50)  # 8
+    Slaters.addLink("1_3", "19_S", "RO-Slaters Main 1", length=50)  # 9
+    Slaters.addLink("2_0", "Slaters-AF Main 2", "7_S", length=50)  # 10
+    Slaters.addLink("2_1", "7_S", "9_S", length=50)  # 11
+    Slaters.addLink("2_2", "9_S", "21_S", length=50)  # 12
+    Slaters.addLink("2_3", "RO-Slaters Main 2", "21_S", length=50)  # 13
+    Slaters.addLink("3_0", "Slaters-AF Main 3", "5_S", length=50)  # 14
+    Slaters.addLink("3_1", "5_S", "23_S", length=50)  # 15
+    Slaters.addLink("3_2", "23_S", "RO-Slaters Main 3", length=50)  # 16
+
+    # Cross Overs
+    Slaters.addLink("13_15X", "13_S", "15_S", length=20)  # 17
+    Slaters.addLink("5_7X", "5_S", "7_S", length=20)  # 18
+    Slaters.addLink("9_11X", "9_S", "11_S", length=20)  # 19
+    Slaters.addLink("17_19X", "17_S", "19_S", length=20)  # 20
+    Slaters.addLink("21_23X", "21_S", "23_S", length=20)  # 21
+
+    return Slaters
@@ -0,0 +1,1090 @@
+"""
+CivilPy
+Copyright (C) 2019 - Dane Parks
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Outage scenarios of the interlockings shown by the Streamlit outage visualizer (`streamlit.py`).
+A scenario is the set of closed tracks. The closed links and nodes of each interlocking are colored red, and the rendered networks can be cached on disk so that the visualizer does not redraw them.
+
+Precompute the common scenarios from the command line with
+    python -m civilpy.transportation.rail_network_simulator.outages -o outage_cache
+"""
+
+import io, os, itertools, argparse
+
+import matplotlib.pyplot as plt
+
+from .interlockings import build_RO, build_AF, build_Slaters
+
+# names of the tracks that can be closed, which affect each interlocking
+OUTAGES = {
+    "RO": (
+        "After_RO_main2",
+        "After_RO_main3",
+        "Slaters_RO_main0",
+        "Slaters_RO_main1",
+        "Slaters_RO_main2",
+        "Slaters_RO_main3",
+    ),
+    "AF": (
+        "AF_Slaters_main0",
+        "AF_Slaters_main1",
+        "AF_Slaters_main2",
+        "AF_Slaters_main3",
+    ),
+}
+OUTAGES["Slaters"] = OUTAGES["RO"] + OUTAGES["AF"]
+
+
+def outage_key(name, closed=()):
+    """
+    Normalize the closed tracks of a scenario for an interlocking.
+
+    Parameters
+    ----------
+    name : str
+        The interlocking, "RO", "AF" or "Slaters".
+    closed : iterable of str, optional
+        Names of the closed tracks. Tracks that do not affect the interlocking are dropped.
+
+    Returns
+    -------
+    tuple of str
+        The sorted closed tracks that affect the interlocking. Scenarios that look the same share the key.
+    """
+    closed = set(closed)
+    unknown = closed - set(OUTAGES["Slaters"])
+    if unknown:
+        raise ValueError(f"Unknown outages: {sorted(unknown)}")
+    return tuple(sorted(closed & set(OUTAGES[name])))
+
+
+def outage_RO(closed=()):
+    """
+    RO interlocking with the closed tracks colored red.
+
+    Parameters
+    ----------
+    closed : iterable of str, optional
+        Names of the closed tracks. See `OUTAGES`.
+
+    Returns
+    -------
+    World
+        The World of `build_RO` with the colors, signal attributes and title of the visualizer.
+    """
+    closed = outage_key("RO", closed)
+    Main2AfterRO = "After_RO_main2" in closed
+    Main3AfterRO = "After_RO_main3" in closed
+    SlatersROMain0Closed = "Slaters_RO_main0" in closed
+    SlatersROMain1Closed = "Slaters_RO_main1" in closed
+    SlatersROMain2Closed = "Slaters_RO_main2" in closed
+    SlatersROMain3Closed = "Slaters_RO_main3" in closed
+
+    RO = build_RO()
+
+    if Main2AfterRO & Main3AfterRO:
+        for link in RO.LINKS:
+            link.color = "red"
+        for node in RO.NODES:
+            node.color = "red"
+
+    if Main2AfterRO:
+        RO.LINKS[0].color = "red"  # Existing 2
+        RO.LINKS[1].color = "red"  # 0_1
+        RO.LINKS[14].color = "red"  # 1-3
+
+        RO.NODES[4].color = "red"  # Existing 2
+        RO.NODES[8].color = "red"  # 1_S
+
+    elif Main3AfterRO:
+        RO.LINKS[3].color = "red"  # Ex 3
+        RO.LINKS[4].color = "red"  # 1_1
+        RO.LINKS[8].color = "red"  # 9_S
+        RO.LINKS[9].color = "red"  # 2_1
+        RO.LINKS[10].color = "red"  # 2_2
+        RO.LINKS[12].color = "red"  # 15_S
+        RO.LINKS[13].color = "red"  # Main 3
+
+        RO.NODES[5].color = "red"  # Existing 3
+        RO.NODES[6].color = "red"  # Proposed_2_org
+        RO.NODES[7].color = "red"  # Proposed_3_org
+        RO.NODES[12].color = "red"  # 9_S
+        RO.NODES[15].color = "red"  # 15_S
+
+    # Update the graph depending on what routes are closed
+    # 1 combination with all 4 tracks closed
+    if (
+        SlatersROMain3Closed
+        and SlatersROMain2Closed
+        and SlatersROMain1Closed
+        and SlatersROMain0Closed
+    ):
+        for link in RO.LINKS:
+            link.color = "red"
+        for node in RO.NODES:
+            node.color = "red"
+
+    # 4 combos of 3 tracks closed
+    elif SlatersROMain0Closed and SlatersROMain1Closed and SlatersROMain2Closed:
+        RO.LINKS[0].color = "red"  # Ex 2
+        RO.LINKS[1].color = "red"  # 0_1
+        RO.LINKS[2].color = "red"  # Main 0
+        RO.LINKS[4].color = "red"  # 1_1
+        RO.LINKS[5].color = "red"  # 1_2
+        RO.LINKS[6].color = "red"  # 1_3
+        RO.LINKS[7].color = "red"  # Main 1
+        RO.LINKS[10].color = "red"  # 2_2
+        RO.LINKS[11].color = "red"  # Main 2
+        RO.LINKS[14].color = "red"  # 1-3
+        RO.LINKS[15].color = "red"  # 5-7
+        RO.LINKS[16].color = "red"  # 11-13
+
+        RO.NODES[0].color = "red"  # Main 0
+        RO.NODES[1].color = "red"  # Main 1
+        RO.NODES[2].color = "red"  # Main 2
+        RO.NODES[4].color = "red"  # Exisiting 2
+        RO.NODES[8].color = "red"  # 1_S
+        RO.NODES[9].color = "red"  # 3_S
+        RO.NODES[10].color = "red"  # 5_S
+        RO.NODES[11].color = "red"  # 7_S
+        RO.NODES[13].color = "red"  # 11_S
+        RO.NODES[14].color = "red"  # 13_S
+
+    elif SlatersROMain0Closed and SlatersROMain1Closed and SlatersROMain3Closed:
+        RO.LINKS[1].color = "red"  # 0_1
+        RO.LINKS[2].color = "red"  # Main 0
+        RO.LINKS[7].color = "red"  # Main 1
+        RO.LINKS[12].color = "red"  # 15_S
+        RO.LINKS[13].color = "red"  # Main 3
+        RO.LINKS[15].color = "red"  # 5-7
+
+        RO.NODES[0].color = "red"  # Main 0
+        RO.NODES[1].color = "red"  # Main 1
+        RO.NODES[3].color = "red"  # Main 3
+        RO.NODES[7].color = "red"  # Proposed_3_org
+        RO.NODES[11].color = "red"  # 7_S
+
+    elif SlatersROMain0Closed and SlatersROMain2Closed and SlatersROMain3Closed:
+        RO.LINKS[1].color = "red"  # 0_1
+        RO.LINKS[2].color = "red"  # Main 0
+        RO.LINKS[8].color = "red"  # 9_S
+        RO.LINKS[9].color = "red"  # 2_1
+        RO.LINKS[10].color = "red"  # 2_2
+        RO.LINKS[11].color = "red"  # Main 2
+        RO.LINKS[12].color = "red"  # 15_S
+        RO.LINKS[13].color = "red"  # Main 3
+        RO.LINKS[15].color = "red"  # 5-7
+        RO.LINKS[16].color = "red"  # 11-13
+
+        RO.NODES[0].color = "red"  # Main 0
+        RO.NODES[2].color = "red"  # Main 2
+        RO.NODES[3].color = "red"  # Main 3
+        RO.NODES[6].color = "red"  # Proposed_2_org
+        RO.NODES[7].color = "red"  # Proposed_3_org
+        RO.NODES[11].color = "red"  # 7_S
+        RO.NODES[14].color = "red"  # 13_S
+        RO.NODES[15].color = "red"  # 15_S
+
+    elif SlatersROMain1Closed and SlatersROMain2Closed and SlatersROMain3Closed:
+        RO.LINKS[6].color = "red"  # 1_3
+        RO.LINKS[7].color = "red"  # Main 1
+        RO.LINKS[8].color = "red"  # 9_S
+        RO.LINKS[9].color = "red"  # 2_1
+        RO.LINKS[10].color = "red"  # 2_2
+        RO.LINKS[11].color = "red"  # Main 2
+        RO.LINKS[12].color = "red"  # 15_S
+        RO.LINKS[13].color = "red"  # Main 3
+        RO.LINKS[14].color = "red"  # 1-3
+        RO.LINKS[16].color = "red"  # 11-13
+
+        RO.NODES[1].color = "red"  # Main 1
+        RO.NODES[2].color = "red"  # Main 2
+        RO.NODES[3].color = "red"  # Main 3
+        RO.NODES[6].color = "red"  # Proposed_2_org
+        RO.NODES[7].color = "red"  # Proposed_3_org
+        RO.NODES[13].color = "red"  # 11_S
+        RO.NODES[14].color = "red"  # 13_S
+        RO.NODES[15].color = "red"  # 15_S
+
+    # 6 combos of 2 tracks closed
+    elif SlatersROMain0Closed and SlatersROMain1Closed:
+        RO.LINKS[1].color = "red"  # 0_1
+        RO.LINKS[2].color = "red"  # Main 0
+        RO.LINKS[7].color = "red"  # Main 1
+        RO.LINKS[15].color = "red"  # 5-7
+
+        RO.NODES[0].color = "red"  # Main 0
+        RO.NODES[1].color = "red"  # Main 1
+        RO.NODES[11].color = "red"  # 7_S
+
+    elif SlatersROMain0Closed and SlatersROMain2Closed:
+        RO.LINKS[1].color = "red"  # 0_1
+        RO.LINKS[2].color = "red"  # Main 0
+        RO.LINKS[10].color = "red"  # 2_2
+        RO.LINKS[11].color = "red"  # Main 2
+        RO.LINKS[15].color = "red"  # 5-7
+        RO.LINKS[16].color = "red"  # 11-13
+
+        RO.NODES[0].color = "red"  # Main 0
+        RO.NODES[2].color = "red"  # Main 2
+        RO.NODES[11].color = "red"  # 7_S
+        RO.NODES[14].color = "red"  # 13_S
+
+    elif SlatersROMain0Closed and SlatersROMain3Closed:
+        RO.LINKS[1].color = "red"  # 0_1
+        RO.LINKS[2].color = "red"  # Main 0
+        RO.LINKS[12].color = "red"  # 15_S
+        RO.LINKS[13].color = "red"  # Main 3
+        RO.LINKS[15].color = "red"  # 5-7
+
+        RO.NODES[0].color = "red"  # Main 0
+        RO.NODES[3].color = "red"  # Main 3
+        RO.NODES[7].color = "red"  # Proposed_3_org
+        RO.NODES[11].color = "red"  # 7_S
+
+    elif SlatersROMain1Closed and SlatersROMain2Closed:
+        RO.LINKS[6].color = "red"  # 1_3
+        RO.LINKS[7].color = "red"  # Main 1
+        RO.LINKS[10].color = "red"  # 2_2
+        RO.LINKS[11].color = "red"  # Main 2
+        RO.LINKS[14].color = "red"  # 1-3
+        RO.LINKS[16].color = "red"  # 11-13
+
+        RO.NODES[1].color = "red"  # Main 1
+        RO.NODES[2].color = "red"  # Main 2
+        RO.NODES[13].color = "red"  # 11_S
+        RO.NODES[14].color = "red"  # 13_S
+
+    elif SlatersROMain1Closed and SlatersROMain3Closed:
+        RO.LINKS[12].color = "red"  # 15_S
+        RO.LINKS[13].color = "red"  # Main 3
+        RO.LINKS[7].color = "red"  # Main 1
+
+        RO.NODES[1].color = "red"  # Main 1
+        RO.NODES[3].color = "red"  # Main 3
+        RO.NODES[7].color = "red"  # Proposed_3_org
+
+    elif SlatersROMain3Closed and SlatersROMain2Closed:
+        RO.LINKS[8].color = "red"  # 9_S
+        RO.LINKS[9].color = "red"  # 2_1
+        RO.LINKS[10].color = "red"  # 2_2
+        RO.LINKS[11].color = "red"  # Main 2
+        RO.LINKS[12].color = "red"  # 15_S
+        RO.LINKS[13].color = "red"  # Main 3
+        RO.LINKS[16].color = "red"  # 11-13
+
+        RO.NODES[2].color = "red"  # Main 2
+        RO.NODES[3].color = "red"  # Main 3
+        RO.NODES[6].color = "red"  # Proposed_2_org
+        RO.NODES[7].color = "red"  # Proposed_3_org
+        RO.NODES[14].color = "red"  # 13_S
+        RO.NODES[15].color = "red"  # 15_S
+
+    # 4 versions of 1 track closed (0,0,0,0 is 16th possible combo and not included since it's the default state)
+    elif SlatersROMain3Closed:
+        RO.LINKS[12].color = "red"  # 15_S
+        RO.LINKS[13].color = "red"  # Main 3
+
+        RO.NODES[3].color = "red"  # Main 3
+        RO.NODES[7].color = "red"  # Proposed_3_org
+
+    elif SlatersROMain2Closed:
+        RO.LINKS[10].color = "red"  # 2_2
+        RO.LINKS[11].color = "red"  # Main 2
+        RO.LINKS[16].color = "red"  # 11-13
+
+        RO.NODES[2].color = "red"  # Main 2
+        RO.NODES[14].color = "red"  # 13_S
+
+    elif SlatersROMain1Closed:
+        RO.LINKS[7].color = "red"  # Main 1
+
+        RO.NODES[1].color = "red"  # Main 1
+
+    elif SlatersROMain0Closed:
+        RO.LINKS[1].color = "red"  # 0_1
+        RO.LINKS[2].color = "red"  # Main 0
+        RO.LINKS[15].color = "red"  # 5-7
+
+        RO.NODES[0].color = "red"  # Main 0
+        RO.NODES[11].color = "red"  # 7_S
+
+    # Determine if the Routes are open or closed on either side of the interlocking
+    RO.signal_attributes_high = {
+        # Origin Values (color, position, opp end color)
+        "Existing 2": (RO.LINKS[0].color, (1, 6.75), RO.LINKS[2].color),
+        "Existing 3": (RO.LINKS[3].color, (1, 4.75), RO.LINKS[7].color),
+    }
+
+    RO.signal_attributes_low = {
+        # Destinations
+        "Proposed 0": (RO.LINKS[2].color, (27.5, 8.75), RO.LINKS[0].color),
+        "Proposed 1": (RO.LINKS[7].color, (27.5, 6.75), RO.LINKS[3].color),
+        "Proposed 2": (RO.LINKS[11].color, (27.5, 4.75), RO.LINKS[3].color),
+        "Proposed 3": (RO.LINKS[13].color, (27.5, 2.75), RO.LINKS[3].color),
+    }
+
+    RO.title = "←L'Enfant                       RO (CFP 110.1/Sta. 325+00)                       Slaters Lane→"
+
+    return RO
+
+
+def outage_AF(closed=()):
+    """
+    AF interlocking with the closed tracks colored red.
+
+    Parameters
+    ----------
+    closed : iterable of str, optional
+        Names of the closed tracks. See `OUTAGES`.
+
+    Returns
+    -------
+    World
+        The World of `build_AF` with the colors, signal attributes and title of the visualizer.
+    """
+    closed = outage_key("AF", closed)
+    AFSlatersMain0Closed = "AF_Slaters_main0" in closed
+    AFSlatersMain1Closed = "AF_Slaters_main1" in closed
+    AFSlatersMain2Closed = "AF_Slaters_main2" in closed
+    AFSlatersMain3Closed = "AF_Slaters_main3" in closed
+
+    AF = build_AF()
+
+    # Update the graph depending on what routes are closed
+    # 1 combination with all 4 tracks closed
+    if (
+        AFSlatersMain0Closed
+        and AFSlatersMain1Closed
+        and AFSlatersMain2Closed
+        and AFSlatersMain3Closed
+    ):
+        for link in AF.LINKS:
+            link.color = "red"
+        for node in AF.NODES:
+            node.color = "red"
+
+    # 4 combos of 3 tracks closed
+    elif AFSlatersMain0Closed and AFSlatersMain1Closed and AFSlatersMain2Closed:
+        # Example of closing main 0/1/2
+        AF.LINKS[1].color = "red"  # 25-29X
+        AF.LINKS[2].color = "red"  # 9-11X
+        AF.LINKS[3].color = "red"  # 13-19X
+        AF.LINKS[5].color = "red"  # 25-29X
+        AF.LINKS[6].color = "red"  # 31-33X
+        AF.LINKS[7].color = "red"  # 37-39X
+        AF.LINKS[9].color = "red"  # 45-47X
+        AF.LINKS[13].color = "red"  # NS
+        AF.LINKS[14].color = "red"  # NS Yard
+        AF.LINKS[17].color = "red"  # 0_0
+        AF.LINKS[18].color = "red"  # 0_1
+        AF.LINKS[19].color = "red"  # 0_2
+        AF.LINKS[20].color = "red"  # 0_3
+        AF.LINKS[21].color = "red"  # 0_4
+        AF.LINKS[22].color = "red"  # 0_5
+        AF.LINKS[23].color = "red"  # 0_6
+        AF.LINKS[28].color = "red"  # 1_4
+        AF.LINKS[29].color = "red"  # 1_5
+        AF.LINKS[30].color = "red"  # 1_6
+        AF.LINKS[31].color = "red"  # 1_7
+        AF.LINKS[37].color = "red"  # 2_5
+
+        AF.NODES[6].color = "red"  # Ex Main 1
+        AF.NODES[7].color = "red"  # NS_org
+        AF.NODES[8].color = "red"  # NS_Yard
+        AF.NODES[15].color = "red"  # 7_S
+        AF.NODES[16].color = "red"  # 9_S
+        AF.NODES[17].color = "red"  # 11_S
+        AF.NODES[18].color = "red"  # 13_S
+        AF.NODES[19].color = "red"  # 19_S
+        AF.NODES[23].color = "red"  # 27_S
+        AF.NODES[25].color = "red"  # 31_S
+        AF.NODES[26].color = "red"  # 33_S
+        AF.NODES[27].color = "red"  # 35_S
+        AF.NODES[22].color = "red"  # 25_S
+        AF.NODES[24].color = "red"  # 29_S
+        AF.NODES[28].color = "red"  # 37_S
+        AF.NODES[29].color = "red"  # 39_S
+        AF.NODES[32].color = "red"  # 45_S
+        AF.NODES[33].color = "red"  # 47_S
+        AF.NODES[34].color = "red"  # Main 0
+        AF.NODES[35].color = "red"  # Main 1
+        AF.NODES[36].color = "red"  # Main 2
+
+    elif AFSlatersMain0Closed and AFSlatersMain1Closed and AFSlatersMain3Closed:
+        # Example of closing main 0/1/3
+        AF.LINKS[7].color = "red"  # 37-39X
+        AF.LINKS[8].color = "red"  # 41-43X
+        AF.LINKS[10].color = "red"  # yard1
+        AF.LINKS[11].color = "red"  # y1_2
+        AF.LINKS[22].color = "red"  # 0_5
+        AF.LINKS[23].color = "red"  # 0_6
+        AF.LINKS[31].color = "red"  # 1_7
+        AF.LINKS[40].color = "red"  # 3_2
+        AF.LINKS[41].color = "red"  # 3_3
+        AF.LINKS[42].color = "red"  # 3_4
+
+        AF.NODES[0].color = "red"  # NS Horn Track 1
+        AF.NODES[1].color = "red"  # y1e
+        AF.NODES[14].color = "red"  # 6_S
+        AF.NODES[29].color = "red"  # 39_S
+        AF.NODES[31].color = "red"  # 43_S
+        AF.NODES[34].color = "red"  # main0_dest
+        AF.NODES[35].color = "red"  # Main1_dest
+        AF.NODES[37].color = "red"  # main3_dest
+
+    elif AFSlatersMain0Closed and AFSlatersMain2Closed and AFSlatersMain3Closed:
+        # Example of closing main 0/2/3
+        AF.LINKS[4].color = "red"  # 13-19X
+        AF.LINKS[7].color = "red"  # 37-39X
+        AF.LINKS[8].color = "red"  # 41-43X
+        AF.LINKS[9].color = "red"  # 45-47X
+        AF.LINKS[10].color = "red"  # yard1
+        AF.LINKS[11].color = "red"  # y1_2
+        AF.LINKS[22].color = "red"  # 0_5
+        AF.LINKS[23].color = "red"  # 0_6
+        AF.LINKS[34].color = "red"  # 2_2
+        AF.LINKS[35].color = "red"  # 2_4
+        AF.LINKS[36].color = "red"  # 2_5
+        AF.LINKS[37].color = "red"  # 2_6
+        AF.LINKS[40].color = "red"  # 3_2
+        AF.LINKS[41].color = "red"  # 3_3
+
+        AF.NODES[0].color = "red"  # NS Horn Track 1
+        AF.NODES[1].color = "red"  # y1e
+        AF.NODES[14].color = "red"  # 6_S
+        AF.NODES[21].color = "red"  # 23_S
+        AF.NODES[29].color = "red"  # 39_S
+        AF.NODES[30].color = "red"  # 41_S
+        AF.NODES[31].color = "red"  # 43_S
+        AF.NODES[33].color = "red"  # 47_S
+        AF.NODES[34].color = "red"  # main0_dest
+        AF.NODES[36].color = "red"  # main2_dest
+        AF.NODES[37].color = "red"  # main3_dest
+
+    elif AFSlatersMain1Closed and AFSlatersMain2Closed and AFSlatersMain3Closed:
+        # Example of closing main 1/2/3
+        AF.LINKS[4].color = "red"  # 21-23X
+        AF.LINKS[6].color = "red"  # 31-33X
+        AF.LINKS[7].color = "red"  # 37-39X
+        AF.LINKS[8].color = "red"  # 41-43X
+        AF.LINKS[9].color = "red"  # 45-47X
+        AF.LINKS[10].color = "red"  # yard1
+        AF.LINKS[11].color = "red"  # y1_2
+        AF.LINKS[28].color = "red"  # 1_4
+        AF.LINKS[29].color = "red"  # 1_5
+        AF.LINKS[30].color = "red"  # 1_6
+        AF.LINKS[31].color = "red"  # 1_7
+        AF.LINKS[34].color = "red"  # 2_2
+        AF.LINKS[35].color = "red"  # 2_4
+        AF.LINKS[36].color = "red"  # 2_5
+        AF.LINKS[37].color = "red"  # 2_6
+        AF.LINKS[40].color = "red"  # 3_2
+        AF.LINKS[41].color = "red"  # 3_3
+        AF.LINKS[42].color = "red"  # 3_4
+
+        AF.NODES[0].color = "red"  # NS Horn Track 1
+        AF.NODES[1].color = "red"  # y1e
+        AF.NODES[14].color = "red"  # 6_S
+        AF.NODES[21].color = "red"  # 23_S
+        AF.NODES[26].color = "red"  # 33_S
+        AF.NODES[28].color = "red"  # 37_S
+        AF.NODES[30].color = "red"  # 41_S
+        AF.NODES[31].color = "red"  # 43_S
+        AF.NODES[32].color = "red"  # 45_S
+        AF.NODES[33].color = "red"  # 47_S
+        AF.NODES[35].color = "red"  # Main1_dest
+        AF.NODES[36].color = "red"  # main2_dest
+        AF.NODES[37].color = "red"  # main3_dest
+
+    # 6 combos of 2 tracks closed
+    elif AFSlatersMain0Closed and AFSlatersMain1Closed:
+        # Example of closing main 0/1
+        AF.LINKS[7].color = "red"  # 37-39X
+        AF.LINKS[22].color = "red"  # 0_5
+        AF.LINKS[23].color = "red"  # 0_6
+        AF.LINKS[31].color = "red"  # 1_7
+
+        AF.NODES[29].color = "red"  # 39_S
+        AF.NODES[34].color = "red"  # main0_dest
+        AF.NODES[35].color = "red"  # Main1_dest
+
+    elif AFSlatersMain0Closed and AFSlatersMain2Closed:
+        # Example of closing main 0/2
+        AF.LINKS[7].color = "red"  # 37-39X
+        AF.LINKS[9].color = "red"  # 45-47X
+        AF.LINKS[22].color = "red"  # 0_5
+        AF.LINKS[23].color = "red"  # 0_6
+        AF.LINKS[36].color = "red"  # 2_5
+        AF.LINKS[37].color = "red"  # 2_6
+
+        AF.NODES[29].color = "red"  # 39_S
+        AF.NODES[33].color = "red"  # 47_S
+        AF.NODES[34].color = "red"  # main0_dest
+        AF.NODES[36].color = "red"  # main2_dest
+
+    elif AFSlatersMain0Closed and AFSlatersMain3Closed:
+        # Example of closing main 0/3
+        AF.LINKS[7].color = "red"  # 37-39X
+        AF.LINKS[8].color = "red"  # 41-43X
+        AF.LINKS[22].color = "red"  # 0_5
+        AF.LINKS[23].color = "red"  # 0_6
+        AF.LINKS[41].color = "red"  # 3_3
+        AF.LINKS[42].color = "red"  # 3_4
+
+        AF.NODES[29].color = "red"  # 39_S
+        AF.NODES[31].color = "red"  # 43_S
+        AF.NODES[34].color = "red"  # main0_dest
+        AF.NODES[37].color = "red"  # main3_dest
+
+    elif AFSlatersMain1Closed and AFSlatersMain2Closed:
+        # Example of closing main 1/2
+        AF.LINKS[6].color = "red"  # 31-33X
+        AF.LINKS[9].color = "red"  # 45-47X
+        AF.LINKS[30].color = "red"  # 1_6
+        AF.LINKS[31].color = "red"  # 1_7
+        AF.LINKS[36].color = "red"  # 2_5
+        AF.LINKS[37].color = "red"  # 2_6
+
+        AF.NODES[32].color = "red"  # 45_S
+        AF.NODES[33].color = "red"  # 47_S
+        AF.NODES[35].color = "red"  # Main1_dest
+        AF.NODES[36].color = "red"  # main2_dest
+
+    elif AFSlatersMain2Closed and AFSlatersMain3Closed:
+        AF.LINKS[4].color = "red"  # 21-23X
+        AF.LINKS[8].color = "red"  # 41-43X
+        AF.LINKS[9].color = "red"  # 45-47X
+        AF.LINKS[10].color = "red"  # yard1
+        AF.LINKS[11].color = "red"  # y1_2
+        AF.LINKS[34].color = "red"  # 2_2
+        AF.LINKS[35].color = "red"  # 2_3
+        AF.LINKS[36].color = "red"  # 2_4
+        AF.LINKS[37].color = "red"  # 2_5
+        AF.LINKS[40].color = "red"  # 3_2
+        AF.LINKS[41].color = "red"  # 3_3
+        AF.LINKS[42].color = "red"  # 3_4
+
+        AF.NODES[0].color = "red"  # NS Horn Track 1
+        AF.NODES[1].color = "red"  # y1e
+        AF.NODES[14].color = "red"  # 6_S
+        AF.NODES[21].color = "red"  # 23_S
+        AF.NODES[30].color = "red"  # 41_S
+        AF.NODES[31].color = "red"  # 43_S
+        AF.NODES[33].color = "red"  # 47_S
+        AF.NODES[37].color = "red"  # Main 3
+        AF.NODES[36].color = "red"  # Main 2
+
+    elif AFSlatersMain1Closed and AFSlatersMain3Closed:
+        # Example of closing main 1/3
+        AF.LINKS[8].color = "red"  # 41-43X
+        AF.LINKS[10].color = "red"  # yard1
+        AF.LINKS[11].color = "red"  # y1_2
+        AF.LINKS[31].color = "red"  # 1_7
+        AF.LINKS[40].color = "red"  # 3_2
+        AF.LINKS[41].color = "red"  # 3_3
+        AF.LINKS[42].color = "red"  # 3_4
+
+        AF.NODES[0].color = "red"  # NS Horn Track 1
+        AF.NODES[1].color = "red"  # y1e
+        AF.NODES[14].color = "red"  # 6_S
+        AF.NODES[31].color = "red"  # 43_S
+        AF.NODES[35].color = "red"  # Main1_dest
+        AF.NODES[37].color = "red"  # main3_dest
+
+    # 4 versions of 1 track closed (0,0,0,0 is 16th possible combo and not included since it's the default state)
+    elif AFSlatersMain3Closed:
+        AF.LINKS[8].color = "red"  # 41-43X
+        AF.LINKS[10].color = "red"  # yard1
+        AF.LINKS[11].color = "red"  # y1_2
+        AF.LINKS[40].color = "red"  # 3_2
+        AF.LINKS[41].color = "red"  # 3_3
+        AF.LINKS[42].color = "red"  # 3_4
+
+        AF.NODES[0].color = "red"  # NS Horn Track 1
+        AF.NODES[1].color = "red"  # y1e
+        AF.NODES[14].color = "red"  # 6_S
+        AF.NODES[31].color = "red"  # 43_S
+        AF.NODES[37].color = "red"  # Main 3
+
+    elif AFSlatersMain2Closed:
+        AF.LINKS[36].color = "red"  # Main 2
+        AF.LINKS[37].color = "red"  # Main 3
+        AF.LINKS[9].color = "red"  # 45-47X
+
+        AF.NODES[33].color = "red"  # 47_S
+        AF.NODES[36].color = "red"  # Main 2
+
+    elif AFSlatersMain1Closed:
+        AF.LINKS[31].color = "red"  # 1_7
+
+        AF.NODES[35].color = "red"  # 2_3
+
+    elif AFSlatersMain0Closed:
+        AF.LINKS[7].color = "red"  # 37-39X
+        AF.LINKS[22].color = "red"  # 0_5
+        AF.LINKS[23].color = "red"  # 0_6
+
+        AF.NODES[28].color = "red"  # 1_4
+        AF.NODES[29].color = "red"  # 1_5
+        AF.NODES[34].color = "red"  # 2_2
+
+    # Determine if the Routes are open or closed on either side of the interlocking
+    AF.signal_attributes_low = {
+        # Origin Values (color, position)
+        "NS_Yard": (AF.LINKS[14].color, (27.5, 14.75), "yard"),
+        "Main 1": (AF.LINKS[17].color, (27.5, 12.75), AF.LINKS[23].color),
+        "Main 2": (AF.LINKS[24].color, (27.5, 10.75), AF.LINKS[31].color),
+        "Main 3": (AF.LINKS[32].color, (27.5, 8.75), AF.LINKS[37].color),
+        "NS Horn Track 3": (AF.LINKS[38].color, (27.5, 6.75), AF.LINKS[41].color),
+        "NS Horn Track 2": (AF.LINKS[12].color, (27.5, 4.5), "yard"),
+        "NS Horn Track 1": (AF.LINKS[10].color, (27.5, 2), "yard"),
+    }
+
+    AF.signal_attributes_high = {
+        # Destinations
+        "Setoff Track": (AF.LINKS[16].color, (1, 12.75), "yard"),
+        "Main 0": (AF.LINKS[23].color, (1, 10.75), AF.LINKS[17].color),
+        "Main 1": (AF.LINKS[31].color, (1, 8.75), AF.LINKS[24].color),
+        "Main 2": (AF.LINKS[37].color, (1, 6.75), AF.LINKS[32].color),
+        "Main 3": (AF.LINKS[41].color, (1, 4.75), AF.LINKS[38].color),
+    }
+
+    AF.title = "←Slaters Lane         AF (CFP 104.3/Sta. 25+00)                             Franconia→"
+
+    return AF
+
+
+def outage_Slaters(closed=(), RO=None, AF=None):
+    """
+    Slaters Lane interlocking with the closed tracks colored red.
+    The tracks shared with RO and AF take their colors, so the closures on either side are shown.
+
+    Parameters
+    ----------
+    closed : iterable of str, optional
+        Names of the closed tracks. See `OUTAGES`.
+    RO, AF : World, optional
+        `outage_RO(closed)` and `outage_AF(closed)`, if already built.
+
+    Returns
+    -------
+    World
+        The World of `build_Slaters` with the colors, signal attributes and title of the visualizer.
+    """
+    closed = outage_key("Slaters", closed)
+    if RO is None:
+        RO = outage_RO(closed)
+    if AF is None:
+        AF = outage_AF(closed)
+    SlatersROMain0Closed = "Slaters_RO_main0" in closed
+    SlatersROMain1Closed = "Slaters_RO_main1" in closed
+    SlatersROMain2Closed = "Slaters_RO_main2" in closed
+    SlatersROMain3Closed = "Slaters_RO_main3" in closed
+    AFSlatersMain0Closed = "AF_Slaters_main0" in closed
+    AFSlatersMain1Closed = "AF_Slaters_main1" in closed
+    AFSlatersMain2Closed = "AF_Slaters_main2" in closed
+    AFSlatersMain3Closed = "AF_Slaters_main3" in closed
+
+    Slaters = build_Slaters()
+
+    # Match the links in slaters to their values in other areas
+    Slaters.NODES[0].color = RO.NODES[0].color  # RO-Slaters Main 0
+    Slaters.NODES[1].color = RO.NODES[1].color  # RO-Slaters Main 1
+    Slaters.NODES[2].color = RO.NODES[2].color  # RO-Slaters Main 2
+    Slaters.NODES[3].color = RO.NODES[3].color  # RO-Slaters Main 3
+
+    Slaters.LINKS[5].color = RO.LINKS[2].color  # Slaters 0_3 = RO Main 0
+    Slaters.LINKS[9].color = RO.LINKS[7].color  # Slaters 1_3 = RO Main 1
+    Slaters.LINKS[13].color = RO.LINKS[11].color  # Slaters 2_3 = RO Main 2
+    Slaters.LINKS[16].color = RO.LINKS[13].color  # Slaters 3_2 = RO Main 3
+
+    Slaters.NODES[5].color = AF.NODES[34].color  # RO-Slaters Main 0
+    Slaters.NODES[6].color = AF.NODES[35].color  # RO-Slaters Main 1
+    Slaters.NODES[7].color = AF.NODES[36].color  # RO-Slaters Main 2
+    Slaters.NODES[8].color = AF.NODES[37].color  # RO-Slaters Main 3
+
+    Slaters.LINKS[2].color = AF.LINKS[23].color  # Slaters 0_0 = AF 0_6
+    Slaters.LINKS[6].color = AF.LINKS[31].color  # Slaters 1_0 = AF 1_7
+    Slaters.LINKS[10].color = AF.LINKS[37].color  # Slaters 2_0 = AF 2_5
+    Slaters.LINKS[14].color = AF.LINKS[42].color  # Slaters 3_0 = AF 3_4
+
+    # Either of all 4 tracks closed on either side
+    if (
+        AFSlatersMain0Closed
+        and AFSlatersMain1Closed
+        and AFSlatersMain2Closed
+        and AFSlatersMain3Closed
+    ) or (
+        SlatersROMain0Closed
+        and SlatersROMain1Closed
+        and SlatersROMain2Closed
+        and SlatersROMain3Closed
+    ):
+        for link in Slaters.LINKS:
+            link.color = "red"
+        for node in Slaters.NODES:
+            node.color = "red"
+
+    # All combos of 2 closed tracks
+    elif SlatersROMain0Closed & SlatersROMain1Closed:
+        Slaters.LINKS[0].color = "red"  # Pepco Lead
+        Slaters.LINKS[1].color = "red"  # 3_S
+        Slaters.LINKS[2].color = "red"  # 0_0
+        Slaters.LINKS[3].color = "red"  # 0_1
+        Slaters.LINKS[4].color = "red"  # 0_2
+        Slaters.LINKS[6].color = "red"  # 1_0
+        Slaters.LINKS[7].color = "red"  # 1_1
+        Slaters.LINKS[8].color = "red"  # 1_2
+        Slaters.LINKS[17].color = "red"  # 13_15X
+        Slaters.LINKS[19].color = "red"  # 9_11X
+        Slaters.LINKS[20].color = "red"  # 17_19X
+
+        Slaters.NODES[4].color = "red"  # OOS_NS
+        Slaters.NODES[5].color = "red"  # Slaters-AF Main 0
+        Slaters.NODES[6].color = "red"  # Slaters-AF Main 1
+        Slaters.NODES[9].color = "red"  # NS_OOS
+        Slaters.NODES[10].color = "red"  # 3_S
+        Slaters.NODES[14].color = "red"  # 11_S
+        Slaters.NODES[15].color = "red"  # 13_S
+        Slaters.NODES[16].color = "red"  # 15_S
+        Slaters.NODES[17].color = "red"  # 17_S
+        Slaters.NODES[18].color = "red"  # 18_S
+
+    elif SlatersROMain0Closed & SlatersROMain2Closed:
+        # Comment to collapse in IDE
+        Slaters.LINKS[17].color = "red"  # 13_15X
+
+    elif SlatersROMain0Closed & SlatersROMain3Closed:
+        Slaters.NODES[20].color = "red"  # 23_S
+
+        Slaters.LINKS[17].color = "red"  # 13_15X
+        Slaters.LINKS[21].color = "red"  # 21_23X
+        Slaters.LINKS[15].color = "red"  # 3_1
+
+    elif SlatersROMain1Closed & SlatersROMain2Closed:
+        Slaters.LINKS[7].color = "red"  # 1_1
+        Slaters.LINKS[8].color = "red"  # 1_2
+        Slaters.LINKS[18].color = "red"  # 5_7X
+        Slaters.LINKS[19].color = "red"  # 9_11X
+        Slaters.LINKS[20].color = "red"  # 17_19X
+
+        Slaters.NODES[14].color = "red"  # 11_S
+        Slaters.NODES[18].color = "red"  # 19_S
+
+    elif SlatersROMain1Closed & SlatersROMain3Closed:
+        Slaters.LINKS[7].color = "red"  # 1_2
+        Slaters.LINKS[8].color = "red"  # 1_1
+        Slaters.LINKS[19].color = "red"  # 9_11X
+        Slaters.LINKS[20].color = "red"  # 17_19X
+
+        Slaters.NODES[14].color = "red"  # 11_S
+        Slaters.NODES[18].color = "red"  # 19_S
+        Slaters.NODES[20].color = "red"  # 23_S
+        Slaters.LINKS[21].color = "red"  # 21_23X
+        Slaters.LINKS[15].color = "red"  # 3_1
+
+    elif SlatersROMain2Closed & SlatersROMain3Closed:
+        Slaters.NODES[19].color = "red"  # 21_S
+        Slaters.NODES[20].color = "red"  # 23_S
+
+        Slaters.LINKS[12].color = "red"  # 2_2
+        Slaters.LINKS[15].color = "red"  # 3_1
+        Slaters.LINKS[21].color = "red"  # 21_23X
+
+    elif SlatersROMain0Closed & AFSlatersMain0Closed:
+        Slaters.LINKS[0].color = "red"  # Pepco Lead
+        Slaters.LINKS[1].color = "red"  # 3_S
+        Slaters.LINKS[3].color = "red"  # 0_1
+        Slaters.LINKS[4].color = "red"  # 0_2
+        Slaters.LINKS[20].color = "red"  # 17_19X
+        Slaters.LINKS[17].color = "red"  # 13_15X
+
+        Slaters.NODES[10].color = "red"  # 3_S
+        Slaters.NODES[16].color = "red"  # 15_S
+        Slaters.NODES[17].color = "red"  # 17_S
+        Slaters.NODES[4].color = "red"  # OOS_NS
+        Slaters.NODES[9].color = "red"  # NS_OOS
+
+    elif SlatersROMain0Closed & AFSlatersMain1Closed:
+        Slaters.LINKS[7].color = "red"  # 1_1
+        Slaters.LINKS[17].color = "red"  # 13_15X
+
+        Slaters.NODES[15].color = "red"  # 13_S
+
+    # AF/Slaters Closed
+    elif AFSlatersMain0Closed & AFSlatersMain1Closed:
+        Slaters.LINKS[0].color = "red"  # Pepco Lead
+        Slaters.LINKS[1].color = "red"  # 3_S
+        Slaters.LINKS[3].color = "red"  # 0_1
+        Slaters.LINKS[4].color = "red"  # 0_2
+        Slaters.LINKS[5].color = "red"  # 0_3
+        Slaters.LINKS[7].color = "red"  # 1_1X
+        Slaters.LINKS[17].color = "red"  # 13_15X
+        Slaters.LINKS[20].color = "red"  # 17_19X
+
+        Slaters.NODES[0].color = "red"  # RO-Slaters Main 0
+        Slaters.NODES[4].color = "red"  # OOS_NS
+        Slaters.NODES[9].color = "red"  # NS_OOS
+        Slaters.NODES[10].color = "red"  # 3_S
+        Slaters.NODES[15].color = "red"  # 13_S
+        Slaters.NODES[16].color = "red"  # 15_S
+        Slaters.NODES[17].color = "red"  # 17_S
+
+    elif AFSlatersMain0Closed & AFSlatersMain2Closed:
+        Slaters.LINKS[3].color = "red"  # 0_1
+        Slaters.LINKS[20].color = "red"  # 17_19X
+
+        Slaters.NODES[10].color = "red"  # 3_S
+        Slaters.NODES[17].color = "red"  # 17_S
+
+    elif AFSlatersMain0Closed & AFSlatersMain3Closed:
+        Slaters.LINKS[3].color = "red"  # 0_1
+        Slaters.LINKS[15].color = "red"  # 3_1
+        Slaters.LINKS[18].color = "red"  # 5_7X
+        Slaters.LINKS[20].color = "red"  # 17_19X
+
+        Slaters.NODES[10].color = "red"  # 3_S
+        Slaters.NODES[11].color = "red"  # 5_S
+        Slaters.NODES[17].color = "red"  # 17_S
+
+    elif AFSlatersMain1Closed & AFSlatersMain2Closed:
+        Slaters.LINKS[7].color = "red"  # 1_1
+        Slaters.LINKS[17].color = "red"  # 13_15X
+
+        Slaters.NODES[15].color = "red"  # 13_S
+
+    elif AFSlatersMain1Closed & AFSlatersMain3Closed:
+        Slaters.LINKS[7].color = "red"  # 1_1
+        Slaters.LINKS[15].color = "red"  # 3_1
+        Slaters.LINKS[17].color = "red"  # 13_15X
+        Slaters.LINKS[18].color = "red"  # 5_7X
+
+        Slaters.NODES[11].color = "red"  # 5_S
+        Slaters.NODES[15].color = "red"  # 13_S
+
+    elif AFSlatersMain2Closed & AFSlatersMain3Closed:
+        Slaters.LINKS[11].color = "red"  # 2_1
+        Slaters.LINKS[12].color = "red"  # 2_2
+        Slaters.LINKS[13].color = "red"  # 2_3
+        Slaters.LINKS[15].color = "red"  # 3_1
+        Slaters.LINKS[16].color = "red"  # 3_2
+        Slaters.LINKS[18].color = "red"  # 5_7X
+        Slaters.LINKS[19].color = "red"  # 9_11X
+        Slaters.LINKS[21].color = "red"  # 21_23X
+
+        Slaters.NODES[2].color = "red"  # RO-Slaters Main 2
+        Slaters.NODES[3].color = "red"  # RO-Slaters Main 3
+        Slaters.NODES[11].color = "red"  # 5_S
+        Slaters.NODES[12].color = "red"  # 7_S
+        Slaters.NODES[13].color = "red"  # 9_S
+        Slaters.NODES[19].color = "red"  # 21_S
+        Slaters.NODES[20].color = "red"  # 23_S
+
+    elif AFSlatersMain1Closed & SlatersROMain1Closed:
+        Slaters.LINKS[7].color = "red"  # 1_1
+        Slaters.LINKS[8].color = "red"  # 1_2
+        Slaters.LINKS[17].color = "red"  # 13_15X
+        Slaters.LINKS[19].color = "red"  # 9_11X
+        Slaters.LINKS[20].color = "red"  # 17_19X
+
+        Slaters.NODES[14].color = "red"  # 11_S
+        Slaters.NODES[18].color = "red"  # 19_S
+        Slaters.NODES[15].color = "red"  # 13_S
+
+    elif AFSlatersMain2Closed & SlatersROMain2Closed:
+        Slaters.LINKS[11].color = "red"  # 2_1
+        Slaters.LINKS[12].color = "red"  # 2_2
+        Slaters.LINKS[18].color = "red"  # 5_7X
+        Slaters.LINKS[19].color = "red"  # 9_11X
+        Slaters.LINKS[21].color = "red"  # 21_23X
+
+        Slaters.NODES[12].color = "red"  # 7_S
+        Slaters.NODES[13].color = "red"  # 9_S
+        Slaters.NODES[19].color = "red"  # 21_S
+
+    elif AFSlatersMain3Closed & SlatersROMain3Closed:
+        Slaters.LINKS[15].color = "red"  # 3_1
+        Slaters.LINKS[18].color = "red"  # 5_7X
+        Slaters.LINKS[21].color = "red"  # 21_23X
+
+        Slaters.NODES[11].color = "red"  # 5_S
+        Slaters.NODES[20].color = "red"  # 23_S
+
+    # 1 track of RO-Slaters Closed
+    elif SlatersROMain0Closed and not (AFSlatersMain2Closed or AFSlatersMain3Closed):
+        # Comment to make the statement collapsible in IDE
+        Slaters.LINKS[17].color = "red"  # 13_15X
+
+    elif SlatersROMain1Closed:
+        Slaters.LINKS[7].color = "red"  # 1_2
+        Slaters.LINKS[8].color = "red"  # 1_1
+        Slaters.LINKS[19].color = "red"  # 9_11X
+        Slaters.LINKS[20].color = "red"  # 17_19X
+
+        Slaters.NODES[14].color = "red"  # 11_S
+        Slaters.NODES[18].color = "red"  # 19_S
+
+    elif SlatersROMain2Closed:
+        # Handled by the associated track segment logic alone
+        pass
+
+    elif SlatersROMain3Closed:
+        Slaters.NODES[20].color = "red"  # 23_S
+        Slaters.LINKS[21].color = "red"  # 21_23X
+        Slaters.LINKS[15].color = "red"  # 3_1
+
+    # 1 Track of AF - SlatersMain closed
+    elif AFSlatersMain0Closed:
+        Slaters.LINKS[3].color = "red"  # 0_1
+        Slaters.NODES[10].color = "red"  # 3_S
+
+    elif AFSlatersMain1Closed:
+        Slaters.LINKS[7].color = "red"  # 1_1X
+        Slaters.LINKS[17].color = "red"  # 13_15X
+
+        Slaters.NODES[15].color = "red"  # 13_S
+
+    elif AFSlatersMain2Closed:
+        # Handled by the associated track segment logic alone
+        pass
+
+    elif AFSlatersMain3Closed:
+        Slaters.LINKS[15].color = "red"  # 3_1
+        Slaters.LINKS[18].color = "red"  # 5_7X
+
+        Slaters.NODES[11].color = "red"  # 5_S
+
+    # Determine if the Routes are open or closed on either side of the interlocking
+    Slaters.signal_attributes_high = {
+        # Slaters RO (color, position, opp end color)
+        "Proposed 0": (Slaters.LINKS[5].color, (1, 6.75), Slaters.LINKS[2].color),
+        "Proposed 1": (Slaters.LINKS[9].color, (1, 4.75), Slaters.LINKS[6].color),
+        "Proposed 2": (Slaters.LINKS[13].color, (1, 2.75), Slaters.LINKS[10].color),
+        "Proposed 3": (Slaters.LINKS[16].color, (1, 0.75), Slaters.LINKS[14].color),
+    }
+
+    Slaters.signal_attributes_low = {
+        # AF to Slaters
+        "OOS_NS": (Slaters.LINKS[0].color, (27.5, 10.75), "yard"),
+        "Proposed 0": (Slaters.LINKS[2].color, (27.5, 8.75), Slaters.LINKS[5].color),
+        "Proposed 1": (Slaters.LINKS[6].color, (27.5, 6.75), Slaters.LINKS[9].color),
+        "Proposed 2": (Slaters.LINKS[10].color, (27.5, 4.75), Slaters.LINKS[13].color),
+        "Proposed 3": (Slaters.LINKS[14].color, (27.5, 2.75), Slaters.LINKS[16].color),
+    }
+
+    Slaters.title = "←RO                         Slater's Lane (CFP 106.3/Sta. 130+00)                           AF→"
+
+    return Slaters
+
+
+OUTAGE_BUILDERS = {"RO": outage_RO, "AF": outage_AF, "Slaters": outage_Slaters}
+
+
+def render_outage(name, closed=(), figsize=(20, 20), cache_dir=None):
+    """
+    Render the network of an interlocking in an outage scenario.
+
+    Parameters
+    ----------
+    name : str
+        The interlocking, "RO", "AF" or "Slaters".
+    closed : iterable of str, optional
+        Names of the closed tracks. See `OUTAGES`.
+    figsize : tuple of int, optional
+        The size of the figure. Default is (20, 20).
+    cache_dir : str, optional
+        Directory of the rendered images. If the image of the scenario is there, it is read instead of rendered, and a newly rendered image is saved there. Default is None (no cache).
+
+    Returns
+    -------
+    bytes
+        The PNG image, as drawn by `World.show_network`.
+    """
+    key = outage_key(name, closed)
+    if cache_dir is not None:
+        fname = os.path.join(
+            cache_dir,
+            f"{name}_{figsize[0]}x{figsize[1]}_{'-'.join(key) or 'none'}.png",
+        )
+        if os.path.exists(fname):
+            with open(fname, "rb") as f:
+                return f.read()
+
+    W = OUTAGE_BUILDERS[name](key)
+    fig = W.show_network(figsize=figsize)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    plt.close(fig)
+    png = buf.getvalue()
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(fname, "wb") as f:
+            f.write(png)
+    return png
+
+
+def precompute_outages(cache_dir, max_closed=2, figsize=(20, 20)):
+    """
+    Render every interlocking for all the scenarios with up to `max_closed` closed tracks into a cache directory.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory of the rendered images. See `render_outage`.
+    max_closed : int, optional
+        The maximum number of closed tracks. Default is 2.
+    figsize : tuple of int, optional
+        The size of the figures. Default is (20, 20).
+
+    Returns
+    -------
+    int
+        The number of images in the cache.
+    """
+    keys = set()
+    for n in range(max_closed + 1):
+        for closed in itertools.combinations(OUTAGES["Slaters"], n):
+            for name in OUTAGE_BUILDERS:
+                keys.add((name, outage_key(name, closed)))
+    for name, key in sorted(keys):
+        render_outage(name, key, figsize, cache_dir)
+    return len(keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render the outage scenarios of the visualizer into a cache directory."
+    )
+    parser.add_argument(
+        "-o", "--output", default="outage_cache", help="cache directory"
+    )
+    parser.add_argument(
+        "-n",
+        "--max-closed",
+        type=int,
+        default=2,
+        help="maximum number of closed tracks (default: 2)",
+    )
+    args = parser.parse_args(argv)
+    print(precompute_outages(args.output, args.max_closed), "images in", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1142 @@
+"""
+CivilPy
+Copyright (C) 2019 - Dane Parks
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from civilpy.transportation.rail_network_simulator.rail_simulator import (
+    World,
+    Node,
+    Link,
+    Vehicle,
+    VehicleView,
+    RouteChoice,
+    VehicleLog,
+    Checkpoint,
+)
+
+
+@pytest.fixture(autouse=True)
+def run_in_tmp_path(tmp_path, monkeypatch):
+    # The analyzer creates an output folder in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def build_interlocking(**kwargs):
+    """Two parallel mains joined by crossovers, with a signal and a dead-end siding."""
+    params = dict(
+        name="test",
+        deltan=5,
+        tmax=2400,
+        print_mode=0,
+        save_mode=0,
+        random_seed=0,
+        duo_update_time=120,
+    )
+    params.update(kwargs)
+    W = World(**params)
+
+    W.addNode("West 1", 0, 2)
+    W.addNode("West 2", 0, 0)
+    W.addNode("1_S", 1, 2)
+    W.addNode("3_S", 1, 0, signal=[30, 30])
+    W.addNode("5_S", 2, 2)
+    W.addNode("7_S", 2, 0, flow_capacity=200)
+    W.addNode("East 1", 3, 2)
+    W.addNode("East 2", 3, 0)
+    W.addNode("Siding", 2, 3)
+
+    W.addLink("1_0", "West 1", "1_S", length=500, free_flow_speed=20)
+    W.addLink("1_1", "1_S", "5_S", length=800, free_flow_speed=20, number_of_lanes=2)
+    W.addLink("1_2", "5_S", "East 1", length=500, free_flow_speed=20)
+    W.addLink("2_0", "West 2", "3_S", length=500, free_flow_speed=15)
+    W.addLink("2_1", "3_S", "7_S", length=800, free_flow_speed=15, signal_group=1)
+    W.addLink("2_2", "7_S", "East 2", length=500, free_flow_speed=15)
+    W.addLink("1-3X", "1_S", "3_S", length=100, free_flow_speed=10, merge_priority=2)
+    W.addLink("5-7X", "5_S", "7_S", length=100, free_flow_speed=10, capacity_out=0.3)
+    W.addLink("Siding", "5_S", "Siding", length=300, free_flow_speed=10)
+
+    W.adddemand("West 1", "East 1", 0, 1200, 0.5)
+    W.adddemand("West 1", "East 2", 0, 1200, 0.3)
+    W.adddemand("West 2", "East 2", 200, 1400, 0.4)
+    W.addVehicle("West 1", "East 2", 300, links_prefer=["1-3X"], name="prefer")
+    W.addVehicle("West 1", "East 2", 320, links_avoid=["1-3X"], name="avoid")
+    return W
+
+
+def vehicle_logs(W):
+    return {
+        veh.name: (
+            veh.log_t,
+            veh.log_state,
+            [l if l == -1 else l.name for l in veh.log_link],
+            veh.log_x,
+            veh.log_v,
+            veh.log_s,
+            veh.travel_time,
+        )
+        for veh in W.VEHICLES.values()
+    }
+
+
+def test_fixed_seed_is_reproducible():
+    W1 = build_interlocking()
+    W1.exec_simulation()
+    W2 = build_interlocking()
+    W2.exec_simulation()
+    assert vehicle_logs(W1) == vehicle_logs(W2)
+
+
+@pytest.mark.parametrize("logging_interval", [1, 3, -1])
+def test_array_engine_matches_object_engine(logging_interval):
+    W_obj = build_interlocking(vehicle_logging_timestep_interval=logging_interval)
+    W_obj.exec_simulation()
+    W_arr = build_interlocking(
+        vehicle_logging_timestep_interval=logging_interval, vehicle_engine="array"
+    )
+    W_arr.exec_simulation()
+
+    assert W_arr.analyzer.trip_completed == W_obj.analyzer.trip_completed
+    assert W_arr.analyzer.total_travel_time == W_obj.analyzer.total_travel_time
+    assert vehicle_logs(W_arr) == vehicle_logs(W_obj)
+    np.testing.assert_array_equal(
+        W_arr.VEHICLE_LOG.records(), W_obj.VEHICLE_LOG.records()
+    )
+
+    def t_link(W):
+        return [[(t, str(l)) for t, l in veh.log_t_link] for veh in W.VEHICLES.values()]
+
+    assert t_link(W_arr) == t_link(W_obj)
+    for l_obj, l_arr in zip(W_obj.LINKS, W_arr.LINKS):
+        np.testing.assert_array_equal(l_obj.cum_arrival, l_arr.cum_arrival)
+        np.testing.assert_array_equal(l_obj.cum_departure, l_arr.cum_departure)
+
+
+def test_array_engine_link_parameter_change():
+    # the cached link parameters of the array engine follow the setters
+    results = []
+    for engine in ["object", "array"]:
+        W = build_interlocking(vehicle_engine=engine)
+        W.exec_simulation(until_t=600)
+        W.get_link("1_1").free_flow_speed = 8
+        W.exec_simulation()
+        results.append(vehicle_logs(W))
+    assert results[0] == results[1]
+    W_ref = build_interlocking()
+    W_ref.exec_simulation()
+    assert vehicle_logs(W_ref) != results[0]
+
+
+def test_array_engine_vehicles_are_views():
+    W = build_interlocking(vehicle_engine="array")
+    veh = W.VEHICLES["prefer"]
+    assert isinstance(veh, Vehicle) and isinstance(veh, VehicleView)
+    W.exec_simulation(until_t=1500)
+    assert W.VEHICLE_ARRAYS.x[veh.id] == veh.x
+    assert W.VEHICLE_ARRAYS.STATES[W.VEHICLE_ARRAYS.state[veh.id]] == veh.state
+
+
+def test_unknown_vehicle_engine():
+    with pytest.raises(ValueError):
+        World(vehicle_engine="gpu", print_mode=0)
+
+
+def test_route_search_matches_floyd_warshall():
+    from scipy.sparse.csgraph import floyd_warshall
+
+    W = build_interlocking()
+    W.addLink("1_1b", "1_S", "5_S", length=900, free_flow_speed=20)  # parallel track
+    W.exec_simulation(until_t=600)
+    W.get_link("2_2").capacity_in = 0  # outage
+    RC = W.ROUTECHOICE
+    RC.route_search_all(noise=0)
+
+    n = len(W.NODES)
+    adj = np.full([n, n], np.inf)
+    count = np.zeros([n, n])
+    for l in W.LINKS:
+        i, j = l.start_node.id, l.end_node.id
+        tt = l.traveltime_instant[-1] if l.capacity_in != 0 else np.inf
+        adj[i, j] = (
+            tt
+            if count[i, j] == 0
+            else (adj[i, j] * count[i, j] + tt) / (count[i, j] + 1)
+        )
+        count[i, j] += 1
+    dist = floyd_warshall(adj)
+
+    dests = {veh.dest.id for veh in W.VEHICLES_LIVING.values()}
+    assert dests
+    for k in dests:
+        np.testing.assert_allclose(RC.dist[:, k], dist[:, k])
+        for i in range(n):
+            if i == k:
+                assert RC.next[i, k] == -1
+            elif np.isinf(dist[i, k]):
+                assert RC.next[i, k] == k
+            else:
+                j = RC.next[i, k]
+                assert np.isclose(adj[i, j] + dist[j, k], dist[i, k])
+
+
+def test_route_pref_rows_are_shared_per_destination():
+    W = build_interlocking()
+    W.addVehicle("West 2", "East 2", 100, route_pref={"2_0": 1.0}, name="own")
+    assert W.VEHICLES["own"].route_pref[W.get_link("2_0").id] == 1.0
+    W.exec_simulation(until_t=900)
+
+    RC = W.ROUTECHOICE
+    assert RC.route_pref.shape == (len(W.NODES), len(W.LINKS))
+    for veh in W.VEHICLES_LIVING.values():
+        assert np.shares_memory(veh.route_pref, RC.route_pref)
+        np.testing.assert_array_equal(veh.route_pref, RC.route_pref[veh.dest.id])
+
+
+def test_duo_rows_catch_up_after_idle_destinations(monkeypatch):
+    from types import SimpleNamespace
+
+    def staged_run():
+        W = build_interlocking(tmax=4800)
+        W.exec_simulation(until_t=3000)
+        assert len(W.VEHICLES_LIVING) == 0
+        W.adddemand("West 1", "East 2", 3000, 4000, 0.3)
+        W.adddemand("West 2", "East 1", 3000, 4000, 0.3)
+        W.exec_simulation()
+        return W
+
+    W = staged_run()
+
+    # Reference: the route preference of every destination is updated at every DUO update.
+    route_search_all = RouteChoice.route_search_all
+
+    def route_search_every_destination(self, *args, **kwargs):
+        living = self.W.VEHICLES_LIVING
+        self.W.VEHICLES_LIVING = {
+            node.name: SimpleNamespace(dest=node) for node in self.W.NODES
+        }
+        try:
+            route_search_all(self, *args, **kwargs)
+        finally:
+            self.W.VEHICLES_LIVING = living
+
+    monkeypatch.setattr(RouteChoice, "route_search_all", route_search_every_destination)
+    W_ref = staged_run()
+
+    assert vehicle_logs(W) == vehicle_logs(W_ref)
+    dests = [W.get_node("East 1").id, W.get_node("East 2").id]
+    np.testing.assert_allclose(
+        W.ROUTECHOICE.route_pref[dests], W_ref.ROUTECHOICE.route_pref[dests]
+    )
+
+
+def test_vehicle_log_spills_to_disk(monkeypatch, tmp_path):
+    monkeypatch.setattr(VehicleLog, "CHUNK_SIZE", 500)
+    W_mem = build_interlocking()
+    W_mem.exec_simulation()
+    W_disk = build_interlocking(
+        vehicle_log_memory_budget=0, vehicle_log_spill_dir=str(tmp_path / "log")
+    )
+    W_disk.exec_simulation()
+
+    assert len(W_disk.VEHICLE_LOG.chunks) > 1
+    assert all(isinstance(c, str) for c in W_disk.VEHICLE_LOG.chunks)
+    assert not any(isinstance(c, str) for c in W_mem.VEHICLE_LOG.chunks)
+    assert vehicle_logs(W_disk) == vehicle_logs(W_mem)
+    pd.testing.assert_frame_equal(
+        W_disk.analyzer.vehicles_to_pandas(), W_mem.analyzer.vehicles_to_pandas()
+    )
+
+
+def test_vehicle_log_merges_chunks(monkeypatch, tmp_path):
+    W_ref = build_interlocking()
+    W_ref.exec_simulation()
+    records_ref = W_ref.VEHICLE_LOG.records()
+
+    monkeypatch.setattr(VehicleLog, "CHUNK_SIZE", 500)
+    W = build_interlocking(
+        vehicle_log_memory_budget=0, vehicle_log_spill_dir=str(tmp_path / "log")
+    )
+    W.exec_simulation(until_t=600)
+    cp = W.checkpoint()
+    veh = next(iter(W.VEHICLES_RUNNING.values()))
+    n = len(veh.log_t)
+    W.exec_simulation()
+    log = W.VEHICLE_LOG
+    assert any(isinstance(c, str) for c in log.chunks)
+    # the log of a vehicle is merged again after its records are appended
+    assert len(veh.log_t) > n
+    assert veh.log_x == W_ref.VEHICLES[veh.name].log_x
+
+    batches = list(log.iter_records(batch_size=700))
+    assert len(batches) > 1
+    assert all(len(b) <= 700 or len(np.unique(b["vehicle"])) == 1 for b in batches)
+    np.testing.assert_array_equal(np.concatenate(batches), records_ref)
+    np.testing.assert_array_equal(log.records(), records_ref)
+
+    # truncation in the middle of a completed chunk
+    W.restore(cp)
+    assert log.size == cp.vehicle_log_size and log.size % 500 != 0
+    W.exec_simulation()
+    np.testing.assert_array_equal(log.records(), records_ref)
+    assert vehicle_logs(W) == vehicle_logs(W_ref)
+
+
+def test_accurate_traj_with_spilled_log(monkeypatch, tmp_path):
+    W_ref = build_interlocking()
+    W_ref.exec_simulation()
+    W_ref.analyzer.compute_accurate_traj()
+
+    monkeypatch.setattr(VehicleLog, "CHUNK_SIZE", 500)
+    W = build_interlocking(
+        vehicle_log_memory_budget=0, vehicle_log_spill_dir=str(tmp_path / "log")
+    )
+    W.exec_simulation()
+    assert all(isinstance(c, str) for c in W.VEHICLE_LOG.chunks)
+    # the trajectories are built batch by batch
+    assert len(list(W.VEHICLE_LOG.iter_records())) > 1
+    W.analyzer.compute_accurate_traj()
+
+    for l, l_ref in zip(W.LINKS, W_ref.LINKS):
+        for attr in ["t", "x", "steps", "offsets", "vehicle", "lane"]:
+            a, a_ref = getattr(l.traj, attr), getattr(l_ref.traj, attr)
+            np.testing.assert_array_equal(a, a_ref)
+            assert a.dtype == a_ref.dtype
+    assert any(len(l.traj) == 0 for l in W.LINKS)
+
+
+def test_edie_cell_sums():
+    from civilpy.transportation.rail_network_simulator.analyzer import edie_cell_sums
+
+    # one train crossing cells (the last one beyond the link), one standing still
+    xss = [[0, 150, 350], [50, 50]]
+    tss = [[0, 10, 20], [16, 20]]
+    tn, dn = edie_cell_sums(xss, tss, dx=100, dt=15, nx=3, nt=2)
+    np.testing.assert_allclose(dn, [[100, 100, 100], [0, 0, 0]])
+    np.testing.assert_allclose(tn, [[100 / 15, 50 / 15 + 50 / 20, 100 / 20], [4, 0, 0]])
+
+
+def build_outage(random_seed, outage=False):
+    W = build_interlocking(random_seed=random_seed, tmax=1800)
+    if outage:
+        W.get_link("1-3X").capacity_in = 0
+    return W
+
+
+def test_run_ensemble():
+    from civilpy.transportation.rail_network_simulator.ensemble import run_ensemble
+
+    grid = {"outage": [False, True]}
+    res = run_ensemble(build_outage, grid, seeds=[0, 1], processes=2)
+    res_serial = run_ensemble(build_outage, grid, seeds=[0, 1], processes=1)
+    for name in ("basic", "od", "link"):
+        pd.testing.assert_frame_equal(res[name], res_serial[name])
+
+    basic = res["basic"]
+    assert list(basic.columns[:3]) == ["run", "random_seed", "outage"]
+    assert basic[["outage", "random_seed"]].values.tolist() == [
+        [False, 0],
+        [False, 1],
+        [True, 0],
+        [True, 1],
+    ]
+    link = res["link"]
+    assert len(link) == 4 * len(build_outage(0).LINKS)
+
+    # a World is copied, and seeded per run
+    res_world = run_ensemble(build_outage(0), seeds=[0, 0], processes=1)
+    assert (
+        res_world["basic"].iloc[0, 2:].tolist()
+        == res_world["basic"].iloc[1, 2:].tolist()
+    )
+
+    # a World large enough to exceed the recursion limit of pickle if its objects were pickled recursively
+    from civilpy.transportation.rail_network_simulator import benchmark
+
+    W = benchmark.grid_network(size=8, tmax=600)
+    res_grid = run_ensemble(W, seeds=[0, 1], processes=2, outputs=["basic"])
+    res_grid_serial = run_ensemble(W, seeds=[0, 1], processes=1, outputs=["basic"])
+    pd.testing.assert_frame_equal(res_grid["basic"], res_grid_serial["basic"])
+    assert W.finalized == 0
+
+
+def link_curves(W):
+    return {l.name: (l.cum_arrival.tolist(), l.cum_departure.tolist()) for l in W.LINKS}
+
+
+def transfer_unbucketed(self):
+    """`Node.transfer` scanning all the inbound vehicles for each trial, as before the requests were bucketed by link."""
+    outbound_traffic = []
+    for outlink in dict.fromkeys(
+        veh.route_next_link
+        for veh in self.inbound_vehicles
+        if veh.route_next_link != None
+    ):
+        for i in range(outlink.lanes):
+            outbound_traffic.append(outlink)
+    random.shuffle(outbound_traffic)
+
+    for outlink in outbound_traffic:
+        if (
+            (
+                len(outlink.vehicles) < outlink.lanes
+                or outlink.vehicles[-outlink.lanes].x
+                > outlink.delta_per_lane * self.W.DELTAN
+            )
+            and outlink.capacity_in_remain >= self.W.DELTAN
+            and self.flow_capacity_remain >= self.W.DELTAN
+        ):
+            vehs = [
+                veh
+                for veh in self.inbound_vehicles
+                if veh == veh.link.vehicles[0]
+                and veh.route_next_link == outlink
+                and (
+                    self.signal_phase in veh.link.signal_group or len(self.signal) <= 1
+                )
+                and veh.link.capacity_out_remain >= self.W.DELTAN
+            ]
+            if len(vehs) == 0:
+                continue
+            veh = random.choices(vehs, [veh.link.merge_priority for veh in vehs])[0]
+
+            inlink = veh.link
+            inlink._cum_departure[inlink.series_cursor] += self.W.DELTAN
+            outlink._cum_arrival[outlink.series_cursor] += self.W.DELTAN
+            inlink.record_traveltime_actual(
+                veh.link_arrival_time,
+                self.W.T * self.W.DELTAT - veh.link_arrival_time,
+            )
+            veh.link_arrival_time = self.W.T * self.W.DELTAT
+
+            inlink.capacity_out_remain -= self.W.DELTAN
+            outlink.capacity_in_remain -= self.W.DELTAN
+            if self.flow_capacity != None:
+                self.flow_capacity_remain -= self.W.DELTAN
+
+            inlink.pop_vehicle()
+            veh.link = outlink
+            veh.x = 0
+            if veh.follower != None:
+                veh.follower.leader = None
+                veh.follower = None
+            if len(outlink.vehicles) > 0:
+                veh.lane = (outlink.vehicles[-1].lane + 1) % outlink.lanes
+            else:
+                veh.lane = 0
+            veh.leader = None
+            if len(outlink.vehicles) >= outlink.lanes:
+                veh.leader = outlink.vehicles[-outlink.lanes]
+                veh.leader.follower = veh
+
+            x_next = veh.move_remain * outlink.u / inlink.u
+            if veh.leader != None:
+                x_cong = veh.leader.x_old - veh.link.delta_per_lane * veh.W.DELTAN
+                if x_cong < veh.x:
+                    x_cong = veh.x
+                if x_next > x_cong:
+                    x_next = x_cong
+                if x_next >= outlink.length:
+                    x_next = outlink.length
+            veh.x = x_next
+
+            if len(inlink.vehicles) and inlink.vehicles[0].flag_waiting_for_trip_end:
+                inlink.vehicles[0].end_trip()
+
+            outlink.add_vehicle(veh)
+            self.inbound_vehicles.remove(veh)
+
+    for link in self.inbound_traffic.values():
+        for lane in range(link.lanes):
+            if len(link.vehicles) and link.vehicles[0].flag_waiting_for_trip_end:
+                link.vehicles[0].end_trip()
+            else:
+                break
+
+    self.inbound_vehicles = []
+
+
+def build_merge():
+    """Three branches with different priorities merging onto a two-lane bottleneck."""
+    W = World(
+        name="merge",
+        deltan=5,
+        tmax=2400,
+        print_mode=0,
+        save_mode=0,
+        random_seed=42,
+    )
+    W.addNode("A", 0, 2)
+    W.addNode("B", 0, 1)
+    W.addNode("C", 0, 0)
+    W.addNode("M", 1, 1)
+    W.addNode("D", 2, 1)
+    W.addLink("a", "A", "M", length=500, free_flow_speed=20, merge_priority=1)
+    W.addLink("b", "B", "M", length=500, free_flow_speed=20, merge_priority=2)
+    W.addLink(
+        "c",
+        "C",
+        "M",
+        length=500,
+        free_flow_speed=20,
+        number_of_lanes=2,
+        merge_priority=3,
+    )
+    W.addLink(
+        "d",
+        "M",
+        "D",
+        length=1000,
+        free_flow_speed=20,
+        number_of_lanes=2,
+        capacity_in=0.8,
+    )
+    W.adddemand("A", "D", 0, 1500, 0.4)
+    W.adddemand("B", "D", 0, 1500, 0.4)
+    W.adddemand("C", "D", 0, 1500, 0.6)
+    return W
+
+
+@pytest.mark.parametrize("build", [build_merge, build_interlocking])
+def test_transfer_matches_unbucketed_order(build, monkeypatch):
+    W_ref = build()
+    with monkeypatch.context() as m:
+        m.setattr(Node, "transfer", transfer_unbucketed)
+        W_ref.exec_simulation()
+
+    W = build()
+    W.exec_simulation()
+    assert vehicle_logs(W) == vehicle_logs(W_ref)
+    assert link_curves(W) == link_curves(W_ref)
+    assert [l.traveltime_actual.tolist() for l in W.LINKS] == [
+        l.traveltime_actual.tolist() for l in W_ref.LINKS
+    ]
+    if build is build_merge:
+        # the merge is congested, so the candidates really compete for the bottleneck
+        assert all(
+            W.get_link(name).cum_arrival[-1] > W.get_link(name).cum_departure[-1]
+            for name in "ab"
+        )
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_checkpoint_restore(engine, tmp_path):
+    W_ref = build_interlocking(vehicle_engine=engine)
+    W_ref.exec_simulation()
+
+    W = build_interlocking(vehicle_engine=engine)
+    W.exec_simulation(until_t=600)
+    cp = W.checkpoint()
+    cp.save(tmp_path / "cp.pkl")
+    W.exec_simulation()
+    assert vehicle_logs(W) == vehicle_logs(W_ref)
+
+    # what-if branch, then back to the checkpoint
+    W.restore(cp)
+    W.get_link("1-3X").capacity_in = 0
+    W.get_link("1-3X").capacity_in_remain = 0
+    W.exec_simulation()
+    assert link_curves(W) != link_curves(W_ref)
+    W.restore(cp)
+    assert W.get_link("1-3X").capacity_in == W_ref.get_link("1-3X").capacity_in
+    W.exec_simulation()
+    assert vehicle_logs(W) == vehicle_logs(W_ref)
+    assert link_curves(W) == link_curves(W_ref)
+    assert W.analyzer.basic_to_pandas().equals(W_ref.analyzer.basic_to_pandas())
+
+    # resume in a fresh World of the same scenario
+    W_new = build_interlocking(vehicle_engine=engine)
+    W_new.restore(Checkpoint.load(tmp_path / "cp.pkl"))
+    W_new.exec_simulation()
+    assert link_curves(W_new) == link_curves(W_ref)
+    assert [veh.travel_time for veh in W_new.VEHICLES.values()] == [
+        veh.travel_time for veh in W_ref.VEHICLES.values()
+    ]
+
+    # a fork carries the state but not the logs
+    W.restore(cp)
+    W_fork = W.fork()
+    assert W_fork.VEHICLE_LOG.size == 0 and W.VEHICLE_LOG.size > 0
+    W_fork.restore(cp)
+    W_fork.exec_simulation()
+    assert link_curves(W_fork) == link_curves(W_ref)
+
+
+def test_fork_large_network():
+    # pickling follows node-link-node paths, which exceeded the recursion limit on this grid
+    import random
+    from civilpy.transportation.rail_network_simulator import benchmark
+
+    W = benchmark.grid_network(size=8)
+    W_copy = W.copy()
+    assert [l.name for l in W_copy.LINKS] == [l.name for l in W.LINKS]
+    assert W_copy.LINKS[0].start_node is W_copy.NODES[W.LINKS[0].start_node.id]
+
+    W.exec_simulation(until_t=1200)
+    W_fork = W.fork()
+    veh = next(iter(W_fork.VEHICLES_RUNNING.values()))
+    assert veh.W is W_fork and veh.link in W_fork.LINKS
+    assert (
+        veh.route_pref is None or veh.route_pref.base is W_fork.ROUTECHOICE.route_pref
+    )
+
+    random_state, np_random_state = random.getstate(), np.random.get_state()
+    W.exec_simulation()
+    random.setstate(random_state)
+    np.random.set_state(np_random_state)
+    W_fork.exec_simulation()
+    assert link_curves(W_fork) == link_curves(W)
+    assert W_fork.analyzer.basic_to_pandas().equals(W.analyzer.basic_to_pandas())
+
+
+def test_traveltime_actual_records():
+    W = build_interlocking()
+    W.finalize_scenario()
+    link = W.get_link("1_1")
+    expected = np.full(W.TSIZE, link.length / link.u)
+    # records out of order of the entry time, and one beyond the simulation
+    for arrival_time, tt in [(300, 50), (100, 60), (200, 70), (W.TMAX + 10, 80)]:
+        link.record_traveltime_actual(arrival_time, tt)
+        expected[int(arrival_time / W.DELTAT) :] = tt
+        np.testing.assert_array_equal(link.traveltime_actual, expected)
+    assert link.actual_travel_time(250) == 70
+    assert link.actual_travel_time(W.TMAX * 2) == 70
+
+
+def test_link_series_queries():
+    W = build_interlocking()
+    W.exec_simulation(until_t=600)
+    link = W.get_link("1_1")
+    assert len(link.cum_arrival) == len(link.traveltime_instant) == W.T
+    assert link.cum_arrival[-1] > link.cum_departure[-1] > 0
+
+    # times before the start and after the last simulated timestep are clipped
+    t = np.array([-10, 0, 300, 599, 600, 2000])
+    np.testing.assert_array_equal(
+        link.arrival_count(t), [link.arrival_count(s) for s in t]
+    )
+    np.testing.assert_array_equal(
+        link.departure_count(t)[[0, -1]],
+        [link.cum_departure[0], link.cum_departure[-1]],
+    )
+    assert link.instant_travel_time(2000) == link.traveltime_instant[-1]
+
+    W.exec_simulation()
+    df = W.analyzer.link_cumulative_to_pandas()
+    assert len(df) == W.TSIZE * len(W.LINKS)
+    df = df[df["link"] == "1_1"]
+    np.testing.assert_array_equal(df["arrival_count"], link.cum_arrival)
+    np.testing.assert_array_equal(df["actual_travel_time"], link.traveltime_actual)
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_link_aggregates_match_vehicles(engine):
+    W = build_interlocking(vehicle_engine=engine, vehicle_logging_timestep_interval=5)
+    for until_t in range(300, 1500, 300):
+        W.exec_simulation(until_t=until_t)
+        for l in W.LINKS:
+            vs = [veh.v for veh in l.vehicles]
+            assert l.num_vehicles == len(vs) * W.DELTAN
+            assert l.num_vehicles_queue == sum(v < l.u for v in vs) * W.DELTAN
+            if vs:
+                assert l.speed == pytest.approx(np.average(vs))
+                assert l.flow == pytest.approx(np.average(vs) * l.density)
+            else:
+                assert l.speed == l.u
+
+    # the queue depends on the free flow speed
+    link = max(W.LINKS, key=lambda l: len(l.vehicles))
+    link.free_flow_speed = 1000
+    assert link.num_vehicles_queue == link.num_vehicles
+
+
+def test_choose_outbound_link_matches_random_choices():
+    import random
+
+    W = build_interlocking()
+    W.exec_simulation(until_t=600)
+    node = W.get_node("5_S")
+    veh = W.VEHICLES["avoid"]
+    veh.route_pref = np.linspace(0, 1, len(W.LINKS))  # own preference
+    links = list(node.outbound_traffic.values())
+
+    for links_avoid, route_pref in [
+        ([], veh.route_pref),
+        (["Siding"], veh.route_pref),
+        ([], W.ROUTECHOICE.route_pref[veh.dest.id]),
+        ([], None),
+    ]:
+        veh.set_links_avoid(links_avoid)
+        veh.route_pref = route_pref
+        allowed = [l for l in links if l.name not in links_avoid]
+        assert node.outbound_choices(veh)[0] == allowed
+        weights = veh.route_pref_of(allowed)
+        for seed in range(20):
+            random.seed(seed)
+            chosen = node.choose_outbound_link(veh)
+            random.seed(seed)
+            if sum(weights) > 0:
+                assert chosen == random.choices(allowed, weights)[0]
+            else:
+                assert chosen == random.choices(allowed)[0]
+
+
+def test_adddemand_bulk_matches_adddemand():
+    rng = np.random.default_rng(0)
+    n = 30
+    origs = rng.choice(["West 1", "West 2"], n).tolist()
+    dests = rng.choice(["East 1", "East 2", "Siding"], n).tolist()
+    t_start = rng.uniform(0, 1000, n)
+    t_end = t_start + rng.uniform(0, 1000, n)
+    flow = rng.uniform(0, 0.5, n)
+    volume = np.where(rng.random(n) < 0.3, rng.uniform(0, 200, n), -1)
+
+    W1 = World(name="", deltan=5, print_mode=0, save_mode=0, random_seed=0)
+    W2 = World(name="", deltan=5, print_mode=0, save_mode=0, random_seed=0)
+    for W in (W1, W2):
+        for name in ["West 1", "West 2", "East 1", "East 2", "Siding"]:
+            W.addNode(name, 0, 0)
+    for row in zip(origs, dests, t_start, t_end, flow, volume):
+        W1.adddemand(*row)
+    W2.adddemand_bulk(origs, dests, t_start, t_end, flow, volume)
+
+    def trips(W):
+        return [
+            (veh.name, veh.orig.name, veh.dest.name, veh.departure_time)
+            for veh in W.VEHICLES.values()
+        ]
+
+    assert len(W1.VEHICLES) > 100
+    assert trips(W2) == trips(W1)
+
+
+def test_spatial_and_name_lookups():
+    W = build_interlocking()
+    other = build_interlocking()
+    assert W.get_node("5_S") is W.NODES[4]
+    assert W.get_node(other.get_node("5_S")) is W.NODES[4]
+    assert W.get_link(other.get_link("Siding")) is W.get_link("Siding")
+    with pytest.raises(Exception):
+        W.get_link("nowhere")
+    with pytest.raises(ValueError):
+        W.addNode("5_S", 9, 9)
+
+    def nearest(x, y):
+        d = [(n.x - x) ** 2 + (n.y - y) ** 2 for n in W.NODES]
+        return W.NODES[d.index(min(d))]
+
+    # midpoints between nodes are ties, resolved by the order of the nodes
+    xs = np.array([0.5, 1.5, 2, 2.9, -3, 1])
+    ys = np.array([1, 0, 2.5, 1.1, 7, 1])
+    assert W.get_nearest_node(xs, ys) == [nearest(x, y) for x, y in zip(xs, ys)]
+    assert W.get_nearest_node(1.5, 0) is nearest(1.5, 0)
+
+    areas = W.get_nodes_in_area(xs, ys, 1.2)
+    for x, y, area in zip(xs, ys, areas):
+        assert area == [n for n in W.NODES if (n.x - x) ** 2 + (n.y - y) ** 2 < 1.2**2]
+    assert W.get_nodes_in_area(1, 1, 1) == []  # the boundary is excluded
+
+    W.addNode("far", 100, 100)
+    assert W.get_nearest_node(90, 90).name == "far"
+
+
+@pytest.mark.parametrize(
+    "engine, logging_interval", [("object", 1), ("object", 3), ("array", 1)]
+)
+def test_skip_idle_timesteps(engine, logging_interval, monkeypatch):
+    def build(skip_idle_timesteps):
+        W = build_interlocking(
+            tmax=4000,
+            vehicle_engine=engine,
+            vehicle_logging_timestep_interval=logging_interval,
+            skip_idle_timesteps=skip_idle_timesteps,
+        )
+        W.addVehicle("West 2", "East 1", 2712.5, name="late")
+        W.get_link("2_1").capacity_in = 0.2
+        return W
+
+    W_ref = build(False)
+    W_ref.exec_simulation()
+
+    # count the timesteps simulated one by one
+    W = build(True)
+    stepped = []
+    link_update = Link.update
+    monkeypatch.setattr(
+        Link, "update", lambda self: (stepped.append(W.T), link_update(self))
+    )
+    while W.check_simulation_ongoing():
+        W.exec_simulation(duration_t=700)
+    monkeypatch.undo()
+
+    assert 0 < len(stepped) / len(W.LINKS) < W.TSIZE / 2
+    assert W.T == W_ref.T
+    assert vehicle_logs(W) == vehicle_logs(W_ref)
+    assert link_curves(W) == link_curves(W_ref)
+    for l, l_ref in zip(W.LINKS, W_ref.LINKS):
+        np.testing.assert_array_equal(l.traveltime_instant, l_ref.traveltime_instant)
+        assert l.capacity_in_remain == l_ref.capacity_in_remain
+    assert W.analyzer.basic_to_pandas().equals(W_ref.analyzer.basic_to_pandas())
+
+
+def test_profile_report():
+    W_ref = build_interlocking()
+    W_ref.exec_simulation()
+    with pytest.raises(ValueError):
+        W_ref.profile_report()
+
+    W = build_interlocking(profile=True, skip_idle_timesteps=False)
+    W.exec_simulation()
+    assert vehicle_logs(W) == vehicle_logs(W_ref)
+
+    report = W.profile_report()
+    phases = report["phases"]
+    assert phases["link_update"]["calls"] == W.TSIZE
+    assert phases["transfer"]["calls"] == W.TSIZE
+    assert phases["route_search"]["calls"] == -(-W.TSIZE // W.DELTAT_ROUTE)
+    assert phases["skip_idle"]["calls"] == 0
+    assert report["total_time"] == pytest.approx(
+        sum(stats["time"] for stats in phases.values())
+    )
+    assert list(report["nodes"]) == [n.name for n in W.NODES]
+    assert (
+        sum(stats["time"] for stats in report["nodes"].values())
+        <= phases["transfer"]["time"]
+    )
+
+    df = W.profile_report(to_pandas=True)
+    assert len(df) == len(phases) + len(W.NODES)
+    assert df["time"].tolist()[: len(phases)] == [
+        stats["time"] for stats in phases.values()
+    ]
+
+
+def test_benchmark(tmp_path):
+    from civilpy.transportation.rail_network_simulator import benchmark
+
+    result = benchmark.benchmark_scenario(
+        "grid", benchmark.grid_network, dict(size=3, tmax=600)
+    )
+    assert (result["nodes"], result["links"], result["platoons"]) == (9, 24, 72)
+    assert set(result["time"]) == {
+        "build",
+        "finalize_scenario",
+        "exec_simulation",
+        "compute_edie_state",
+        *benchmark.EXPORTERS,
+    }
+    assert result["steps_per_second"] > 0 and result["peak_memory"] > 0
+
+    for name in ["corridor_small", "planar_small", "RO", "AF", "Slaters"]:
+        builder, params = benchmark.SCENARIOS[name]
+        W = builder(**params)
+        W.exec_simulation()
+        assert W.analyzer.trip_completed > 0
+
+    fname = tmp_path / "benchmark.json"
+    results = benchmark.run_benchmarks(["RO"], fname, memory=False)
+    assert results["results"][0]["peak_memory"] is None
+    df = benchmark.compare_results(str(fname), results)
+    assert (df["scenario"] == "RO").all()
+    ratio = df.set_index("metric")["ratio"]
+    assert np.isnan(ratio["peak_memory"])
+    assert (ratio.drop("peak_memory") == 1).all()
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_stats_without_vehicle_logs(engine, capsys):
+    def results(logging_interval):
+        W = build_interlocking(
+            vehicle_engine=engine, vehicle_logging_timestep_interval=logging_interval
+        )
+        W.exec_simulation()
+        capsys.readouterr()
+        W.analyzer.print_simple_stats(force_print=True)
+        return (
+            W,
+            capsys.readouterr().out,
+            W.analyzer.od_to_pandas(),
+            W.analyzer.link_to_pandas(),
+        )
+
+    W_ref, printed_ref, od_ref, link_ref = results(1)
+    W, printed, od, link = results(-1)
+    assert W.VEHICLE_LOG.size == 0
+    assert W.analyzer.average_speed == pytest.approx(W_ref.analyzer.average_speed)
+    assert printed == printed_ref
+    pd.testing.assert_frame_equal(od, od_ref)
+    pd.testing.assert_frame_equal(link, link_ref)
+
+    # the same statistics as computed from the travel times of all the vehicles
+    for row in od_ref.itertuples():
+        tts = [
+            veh.travel_time
+            for veh in W_ref.VEHICLES.values()
+            if (veh.orig.name, veh.dest.name) == (row.orig, row.dest)
+            and veh.travel_time != -1
+        ]
+        if len(tts):
+            assert row.average_travel_time == pytest.approx(np.mean(tts))
+            assert row.stddiv_travel_time == pytest.approx(np.std(tts))
+
+
+def test_mfd_without_vehicle_logs():
+    W = build_interlocking(vehicle_logging_timestep_interval=-1)
+    links = [W.get_link(name) for name in ["1_1", "2_1", "5-7X"]]
+    nt = int(W.TMAX / W.EULAR_DT)
+    tn = np.zeros(nt)
+    dn = np.zeros(nt)
+    while not W.exec_simulation(duration_t=W.DELTAT):
+        # the vehicles on the links at the start of the next timestep
+        i = int(W.T * W.DELTAT / W.EULAR_DT)
+        if i < nt:
+            tn[i] += sum(len(l.vehicles) for l in links) * W.DELTAN * W.DELTAT
+            dn[i] += sum(v.v for l in links for v in l.vehicles) * W.DELTAN * W.DELTAT
+
+    an = sum(l.length for l in links) * W.EULAR_DT
+    df = W.analyzer.mfd_to_pandas(links)
+    assert W.VEHICLE_LOG.size == 0
+    assert len(df) == nt
+    assert df["network_k"].sum() > 0
+    np.testing.assert_allclose(df["network_k"], tn / an, atol=1e-12)
+    np.testing.assert_allclose(df["network_q"], dn / an, atol=1e-12)
+
+
+def test_trajectory_store():
+    from civilpy.transportation.rail_network_simulator.analyzer import TrajectoryStore
+
+    # accelerate, stop, then a second trajectory of two points
+    t = np.array([0.0, 1, 2, 3, 4, 10, 11])
+    x = np.array([0.0, 1, 2, 2, 2, 5, 5])
+    traj = TrajectoryStore.from_samples(t, x, np.array([0, 5, 7]), [3, 4], [0, 1])
+    np.testing.assert_array_equal(traj.t, [0, 2, 4, 10, 11])
+    np.testing.assert_array_equal(traj.steps, [2, 2, 0, 1, 0])
+    np.testing.assert_array_equal(traj.breakpoints(1)[1], [5, 5])
+    t_rec, x_rec, offsets = traj.samples()
+    np.testing.assert_array_equal(t_rec, t)
+    np.testing.assert_array_equal(x_rec, x)
+    np.testing.assert_array_equal(offsets, [0, 5, 7])
+
+    # free flow at a non-round speed, with the positions accumulated as in the simulation
+    x = np.cumsum(np.full(200, 17.3 * 5)) - 17.3 * 5
+    t = np.arange(200) * 5.0
+    traj = TrajectoryStore.from_samples(t, x, np.array([0, 200]), [0], [0])
+    np.testing.assert_array_equal(traj.steps, [199, 0])
+    t_rec, x_rec, _ = traj.samples()
+    np.testing.assert_array_equal(t_rec, t)
+    np.testing.assert_allclose(x_rec, x, rtol=0, atol=17.3 * 5 * 1e-9)
+
+    W = build_interlocking()
+    W.exec_simulation()
+    W.analyzer.compute_accurate_traj()
+    vehs = list(W.VEHICLES.values())
+    n_breakpoints = n_samples = 0
+    for l in W.LINKS:
+        t_rec, x_rec, offsets = l.traj.samples()
+        n_breakpoints += len(l.traj.t)
+        n_samples += len(t_rec)
+        # the logged points are reconstructed exactly
+        points = set(zip(t_rec, x_rec))
+        for i in set(l.traj.vehicle):
+            veh = vehs[i]
+            for t, link, x in zip(veh.log_t, veh.log_link, veh.log_x):
+                if link == l:
+                    assert (t, x) in points
+    assert n_breakpoints < n_samples / 2
+
+
+def test_network_anim(tmp_path):
+    from PIL import Image
+
+    W = build_interlocking(save_mode=1)
+    W.exec_simulation()
+    for processes in [1, 2]:
+        W.analyzer.network_anim(
+            timestep_skip=48,
+            file_name=str(tmp_path / f"anim_{processes}.gif"),
+            processes=processes,
+        )
+    assert (tmp_path / "anim_1.gif").read_bytes() == (
+        tmp_path / "anim_2.gif"
+    ).read_bytes()
+    with Image.open(tmp_path / "anim_1.gif") as img:
+        assert img.n_frames == 10
+        assert img.info["duration"] == 480
+    assert not list(tmp_path.glob("outtest/tmp_anim_*"))
+
+
+def test_time_space_diagram_modes(tmp_path):
+    W = build_interlocking(save_mode=1)
+    W.exec_simulation()
+    W.analyzer.compute_accurate_traj()
+    for mode in ["lines", "density", "speed"]:
+        W.analyzer.time_space_diagram_traj_links(
+            ["2_0", "2_1", "2_2"], mode=mode, resolution=(120, 60)
+        )
+        out = tmp_path / "outtest" / "tsd_traj_links_2_0-2_1-2_2.png"
+        assert out.exists()
+        out.unlink()
+    with pytest.warns(UserWarning, match="Unknown mode"):
+        W.analyzer.time_space_diagram_traj_links(["2_0"], mode="bogus")
+
+
+def test_outage_scenarios(tmp_path, monkeypatch):
+    import os
+    from civilpy.transportation.rail_network_simulator import outages
+
+    closed = ["AF_Slaters_main1", "Slaters_RO_main3"]
+    assert outages.outage_key("RO", closed) == ("Slaters_RO_main3",)
+    assert outages.outage_key("Slaters", closed[::-1]) == tuple(closed)
+    with pytest.raises(ValueError):
+        outages.outage_key("RO", ["Main 9"])
+
+    RO = outages.outage_RO(closed)
+    assert RO.get_link("Main 3").color == "red"
+    assert RO.get_link("Main 2").color != "red"
+    S = outages.outage_Slaters(closed)
+    assert S.NODES[3].color == "red" and S.NODES[6].color == "red"
+
+    # the railroad icons are read from the working directory
+    monkeypatch.chdir(os.path.dirname(outages.__file__))
+    png = outages.render_outage("AF", closed, figsize=(4, 4), cache_dir=tmp_path)
+    assert [p.name for p in tmp_path.iterdir()] == ["AF_4x4_AF_Slaters_main1.png"]
+    monkeypatch.setattr(outages, "OUTAGE_BUILDERS", {})
+    assert outages.render_outage("AF", closed[::-1], (4, 4), tmp_path) == png
+
+
+def test_load_scenario_tables(tmp_path):
+    nodes = pd.DataFrame({"name": ["A", "B", "1"], "x": [0, 1, 2], "y": [0, 0, 1.5]})
+    links = pd.DataFrame(
+        {
+            "name": ["A_B", "B_1"],
+            "start_node": ["A", "B"],
+            "end_node": ["B", "1"],
+            "length": [500, 800],
+            "number_of_lanes": [1, np.nan],
+            "free_flow_speed": [20, 15],
+        }
+    )
+    demand = pd.DataFrame(
+        {
+            "orig": ["A", "A", "B"],
+            "dest": ["1", "B", "1"],
+            "t_start": [0, 100, 200],
+            "t_end": [600, 700, 900],
+            "flow": [0.3, 0.2, np.nan],
+            "volume": [np.nan, np.nan, 100],
+        }
+    )
+
+    def trips(W):
+        return [
+            (veh.orig.name, veh.dest.name, veh.departure_time)
+            for veh in W.VEHICLES.values()
+        ]
+
+    W = World(name="", print_mode=0, save_mode=0, random_seed=0)
+    W.load_scenario(nodes, links, demand, tmax=1200)
+    assert W.TMAX == 1200
+    assert W.get_link("B_1").u == 15 and W.get_link("B_1").lanes == 1
+    W_ref = World(name="", print_mode=0, save_mode=0, random_seed=0)
+    for name in ["A", "B", "1"]:
+        W_ref.addNode(name, 0, 0)
+    W_ref.adddemand("A", "1", 0, 600, 0.3)
+    W_ref.adddemand("A", "B", 100, 700, 0.2)
+    W_ref.adddemand("B", "1", 200, 900, volume=100)
+    assert trips(W) == trips(W_ref)
+
+    # files, with the column names of load_scenario_from_csv
+    nodes.to_csv(tmp_path / "nodes.csv", index=False)
+    links.rename(columns={"start_node": "start", "end_node": "end"}).to_csv(
+        tmp_path / "links.csv", index=False
+    )
+    demand.rename(columns={"t_start": "start_t", "t_end": "end_t"}).to_csv(
+        tmp_path / "demand.csv", index=False
+    )
+    W_csv = World(name="", print_mode=0, save_mode=0, random_seed=0)
+    W_csv.load_scenario(
+        *[str(tmp_path / f"{t}.csv") for t in ["nodes", "links", "demand"]]
+    )
+    assert W_csv.get_node("1").y == 1.5
+    assert trips(W_csv) == trips(W)
+
+    # positional CSV files with ragged rows, e.g., a volume in some demand rows only
+    (tmp_path / "ragged.csv").write_text(
+        "orig,dest,start_t,end_t,flow\nA,1,0,600,0.3\nA,B,100,700,0.2\nB,1,200,900,0,100\n"
+    )
+    W_ragged = World(name="", print_mode=0, save_mode=0, random_seed=0)
+    for name in ["A", "B", "1"]:
+        W_ragged.addNode(name, 0, 0)
+    W_ragged.generate_demand_from_csv(str(tmp_path / "ragged.csv"))
+    assert trips(W_ragged) == trips(W_ref)
+
+    # all the problems of a table are reported at once, before anything is added
+    bad = demand.assign(orig=["A", "C", "B"], t_start=[0, "x", 200])
+    with pytest.raises(ValueError, match=r"t_start is not a valid number in rows 1\."):
+        W.generate_demand_from_table(bad)
+    bad = links.assign(end_node=["B", "C"], length=[500, -1])
+    with pytest.raises(ValueError, match="end_node in rows 1 is not a node; length"):
+        W_ref.generate_Links_from_table(bad)
+    assert len(W_ref.LINKS) == 0
+    with pytest.raises(ValueError, match="unknown columns"):
+        W_ref.generate_Nodes_from_table(nodes.assign(z=0))
+
+    # a bad link or demand table leaves the World untouched, so that it can be loaded again
+    W_new = World(name="", print_mode=0, save_mode=0, random_seed=0)
+    with pytest.raises(ValueError, match="end_node in rows 1 is not a node"):
+        W_new.load_scenario(nodes, links.assign(end_node=["B", "C"]), demand)
+    bad = demand.assign(t_end=[600, 700, 200])
+    with pytest.raises(ValueError, match="empty time window in rows 2"):
+        W_new.load_scenario(nodes, links, bad)
+    assert len(W_new.NODES) == len(W_new.LINKS) == len(W_new.VEHICLES) == 0
+    W_new.load_scenario(nodes, links, demand)
+    assert trips(W_new) == trips(W)
+
+
+def test_equilibrium_solver():
+    from civilpy.transportation.rail_network_simulator.equilibrium import (
+        EquilibriumSolver,
+        route_cost,
+    )
+
+    with pytest.raises(ValueError):
+        EquilibriumSolver(build_interlocking, principle="DTA")
+
+    histories = []
+    for processes in [1, 2]:
+        solver = EquilibriumSolver(
+            build_interlocking, processes=processes, print_mode=0
+        )
+        W = solver.solve(max_iter=3)
+        histories.append(solver.history)
+    pd.testing.assert_frame_equal(histories[0], histories[1])
+    assert list(solver.history["iteration"]) == [0, 1, 2]
+    assert (solver.history["relative_gap"] >= 0).all()
+    assert solver.history["n_routes"].iloc[-1] > len(solver.routes)
+
+    # the vehicles travel their assigned routes, evaluated like Route.actual_travel_time
+    tt = np.array([l.traveltime_actual for l in W.LINKS])
+    for veh in list(W.VEHICLES.values())[::50]:
+        route = solver.route(veh.name)
+        if veh.state == "end":
+            assert veh.traveled_route()[0] == route
+        t = veh.departure_time * W.DELTAT
+        ids = tuple(l.id for l in route)
+        assert route_cost(ids, t, tt, tt, W.DELTAT) == route.actual_travel_time(t)